@@ -0,0 +1,5 @@
+"""Benchmarks reproductibles de la plateforme CV.
+
+    python -m benchmarks.generate_data --db bench.db --users 500
+    python -m benchmarks.run_benchmarks --db bench.db --output results.json
+"""
@@ -0,0 +1,197 @@
+"""Génère une base cv_platform.db synthétique (déterministe pour une graine donnée)"""
+import argparse
+import datetime
+import json
+import os
+import random
+import time
+
+from cv_db import ConnectionManager
+from cv_services import CVService, hash_password
+
+BENCH_PASSWORD = "benchmark"
+
+FIRST_NAMES = ["Alice", "Bruno", "Chloé", "David", "Emma", "Farid", "Gaëlle", "Hugo", "Inès", "Julien",
+               "Karim", "Léa", "Marc", "Nadia", "Olivier", "Pauline", "Quentin", "Rania", "Sophie", "Thomas"]
+LAST_NAMES = ["Martin", "Bernard", "Dubois", "Thomas", "Robert", "Richard", "Petit", "Durand", "Leroy",
+              "Moreau", "Simon", "Laurent", "Lefebvre", "Michel", "Garcia", "Diallo", "Nguyen", "Mercier"]
+POSITIONS = ["Développeur Python", "Ingénieur données", "Chef de projet", "Analyste financier",
+             "Designer UX", "Administrateur systèmes", "Consultant SAP", "Responsable marketing",
+             "Technicien support", "Architecte cloud", "Data scientist", "Comptable"]
+COMPANIES = ["Orange", "Capgemini", "Société Générale", "Airbus", "Thales", "Decathlon", "Michelin",
+             "Ubisoft", "OVHcloud", "BNP Paribas", "Renault", "Atos", "Doctolib", "Leroy Merlin"]
+CITIES = ["Paris", "Lyon", "Marseille", "Toulouse", "Lille", "Nantes", "Bordeaux", "Rennes",
+          "Strasbourg", "Montpellier", "Abidjan", "Dakar", "Bruxelles", "Genève"]
+DEGREES = ["Licence informatique", "Master MIAGE", "BTS SIO", "DUT GEA", "Diplôme d'ingénieur",
+           "Master finance", "Doctorat", "Bachelor marketing"]
+SCHOOLS = ["Université Paris-Saclay", "INSA Lyon", "Université de Bordeaux", "EPITA", "HEC",
+           "Université de Lille", "Centrale Nantes", "Université Cheikh Anta Diop"]
+LANGUAGES = ["Français", "Anglais", "Espagnol", "Allemand", "Italien", "Arabe", "Portugais", "Chinois"]
+LANGUAGE_LEVELS = ["Débutant", "Intermédiaire", "Avancé", "Courant"]
+WORDS = ("conception développement maintenance application web mobile équipe client projet "
+         "livraison qualité performance architecture migration cloud données analyse reporting "
+         "automatisation tests intégration continue sécurité optimisation coûts budget planning "
+         "coordination formation support utilisateurs documentation amélioration processus").split()
+SKILLS = ["Python", "JavaScript", "Java", "C++", "PHP", "SQL", "HTML/CSS", "React", "Angular",
+          "Vue.js", "Node.js", "Django", "Flask", "Git", "Docker", "AWS", "Azure", "Machine Learning",
+          "Data Analysis", "Project Management", "Agile/Scrum", "Communication", "Leadership",
+          "Problem Solving"]
+
+
+def sentence(rng, min_words, max_words):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))]
+    return " ".join(words).capitalize() + "."
+
+
+def paragraph(rng, sentences):
+    return " ".join(sentence(rng, 8, 20) for _ in range(sentences))
+
+
+def make_cv(rng, first_name, last_name, email):
+    """Construit un CV réaliste (taille comparable à un CV saisi dans l'éditeur)"""
+    experience = []
+    year = 2025
+    for _ in range(rng.randint(2, 8)):
+        length = rng.randint(1, 5)
+        start = year - length
+        current = not experience and rng.random() < 0.6
+        experience.append({
+            "position": rng.choice(POSITIONS),
+            "company": rng.choice(COMPANIES),
+            "location": rng.choice(CITIES),
+            "start_date": f"{rng.randint(1, 12):02d}/{start}",
+            "end_date": "" if current else f"{rng.randint(1, 12):02d}/{year}",
+            "current": current,
+            "description": paragraph(rng, rng.randint(2, 6)),
+        })
+        year = start - rng.randint(0, 1)
+    education = []
+    for _ in range(rng.randint(1, 3)):
+        start = year - rng.randint(2, 5)
+        education.append({
+            "degree": rng.choice(DEGREES),
+            "school": rng.choice(SCHOOLS),
+            "location": rng.choice(CITIES),
+            "start_year": str(start),
+            "end_year": str(year),
+            "description": paragraph(rng, rng.randint(0, 2)),
+        })
+        year = start
+    return {
+        "personal": {
+            "first_name": first_name,
+            "last_name": last_name,
+            "title": rng.choice(POSITIONS),
+            "email": email,
+            "phone": f"06 {rng.randint(10, 99)} {rng.randint(10, 99)} {rng.randint(10, 99)} {rng.randint(10, 99)}",
+            "address": rng.choice(CITIES),
+            "linkedin": f"https://www.linkedin.com/in/{first_name.lower()}-{last_name.lower()}",
+            "website": "",
+            "description": paragraph(rng, rng.randint(2, 4)),
+        },
+        "experience": experience,
+        "education": education,
+        "skills": rng.sample(SKILLS, rng.randint(3, 10)),
+        "languages": [{"name": name, "level": rng.choice(LANGUAGE_LEVELS)}
+                      for name in rng.sample(LANGUAGES, rng.randint(1, 4))],
+    }
+
+
+def timestamp(rng, days_back=365):
+    moment = datetime.datetime(2026, 1, 1) - datetime.timedelta(seconds=rng.randint(0, days_back * 86400))
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def generate(db_file, users=100, cvs_per_user=3, history_per_cv=2, views=10000, seed=42, batch=1000):
+    """Remplit db_file; retourne un résumé des volumes générés"""
+    rng = random.Random(seed)
+    db = ConnectionManager(db_file)
+    service = CVService(db)
+    service.init_schema()
+    service.sync_skill_catalog()
+    password_hash = hash_password(BENCH_PASSWORD)
+    totals = {"users": 0, "cvs": 0, "history": 0, "user_skills": 0, "views": 0}
+
+    with db.read() as cursor:
+        cursor.execute('SELECT id, name FROM skills')
+        skill_ids = [row[0] for row in cursor.fetchall()]
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM users')
+        first_user = cursor.fetchone()[0] + 1
+
+    for start in range(0, users, batch):
+        with db.write() as cursor:
+            for n in range(start, min(start + batch, users)):
+                first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                email = f"user{first_user + n}@bench.example"
+                cursor.execute('INSERT INTO users (email, password_hash, first_name, last_name, role, created_at) VALUES (?, ?, ?, ?, ?, ?)',
+                               (email, password_hash, first_name, last_name, 'candidat', timestamp(rng)))
+                user_id = cursor.lastrowid
+                totals["users"] += 1
+
+                cursor.executemany('INSERT INTO user_skills (user_id, skill_id, level, experience_years) VALUES (?, ?, ?, ?)',
+                                   [(user_id, skill_id, rng.randint(1, 4), rng.randint(0, 15))
+                                    for skill_id in rng.sample(skill_ids, min(len(skill_ids), rng.randint(5, 15)))])
+                totals["user_skills"] += cursor.rowcount
+
+                for c in range(cvs_per_user):
+                    data = make_cv(rng, first_name, last_name, email)
+                    blob = service.codec.encode(data)
+                    cursor.execute('INSERT INTO cvs (user_id, title, template, data, created_at, updated_at, is_public) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                   (user_id, f"CV {data['personal']['title']} {c + 1}",
+                                    rng.choice(["classic", "modern", "creative", "professional"]),
+                                    blob, timestamp(rng), timestamp(rng, 30), int(rng.random() < 0.3)))
+                    cv_id = cursor.lastrowid
+                    cursor.executemany('INSERT INTO cv_history (cv_id, data) VALUES (?, ?)',
+                                       [(cv_id, blob)] * history_per_cv)
+                    totals["cvs"] += 1
+                    totals["history"] += history_per_cv
+
+    with db.read() as cursor:
+        cursor.execute('SELECT MIN(id), MAX(id) FROM cvs')
+        min_cv, max_cv = cursor.fetchone()
+        cursor.execute('SELECT MIN(id), MAX(id) FROM users')
+        min_user, max_user = cursor.fetchone()
+
+    if min_cv is not None:
+        for start in range(0, views, batch * 10):
+            count = min(batch * 10, views - start)
+            rows = [(rng.randint(min_cv, max_cv), rng.randint(min_user, max_user), timestamp(rng),
+                     f"10.0.{rng.randint(0, 255)}.{rng.randint(1, 254)}") for _ in range(count)]
+            with db.write() as cursor:
+                cursor.executemany('INSERT INTO cv_views (cv_id, viewer_id, viewed_at, ip_address) VALUES (?, ?, ?, ?)', rows)
+            totals["views"] += count
+
+        # Compteurs de vues cohérents avec cv_views
+        with db.write() as cursor:
+            cursor.execute('UPDATE cvs SET view_count = (SELECT COUNT(*) FROM cv_views v WHERE v.cv_id = cvs.id)')
+
+    # Frise de carrière des CVs insérés directement
+    service.rebuild_cv_index()
+    db.close()
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Génère une base de données synthétique pour les benchmarks")
+    parser.add_argument("--db", default="bench_cv_platform.db", help="fichier SQLite à remplir")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--cvs-per-user", type=int, default=3)
+    parser.add_argument("--history-per-cv", type=int, default=2)
+    parser.add_argument("--views", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--fresh", action="store_true", help="supprime la base existante avant génération")
+    args = parser.parse_args()
+
+    if args.fresh:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.db + suffix):
+                os.remove(args.db + suffix)
+
+    start = time.perf_counter()
+    totals = generate(args.db, args.users, args.cvs_per_user, args.history_per_cv, args.views, args.seed)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"db": args.db, "seconds": round(elapsed, 2), **totals}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
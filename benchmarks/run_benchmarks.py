@@ -0,0 +1,233 @@
+"""Scénarios chronométrés sur une base générée par benchmarks.generate_data.
+
+Les résultats sont écrits en JSON; avec --baseline, chaque scénario est
+comparé (p50) au résultat de référence et le code de sortie vaut 1 en cas
+de régression au-delà de la tolérance.
+"""
+import argparse
+import json
+import platform
+import random
+import sqlite3
+import sys
+import time
+
+from cv_db import ConnectionManager
+from cv_services import CVService
+from benchmarks.generate_data import BENCH_PASSWORD
+
+SCENARIOS = {}
+
+
+def scenario(name):
+    """Enregistre une fonction de benchmark sous un nom"""
+    def register(fn):
+        SCENARIOS[name] = fn
+        return fn
+    return register
+
+
+class BenchContext:
+    """Base, service et échantillons d'identifiants partagés par les scénarios"""
+
+    def __init__(self, db_file, seed=0):
+        self.db = ConnectionManager(db_file)
+        self.service = CVService(self.db)
+        self.rng = random.Random(seed)
+        with self.db.read() as cursor:
+            cursor.execute("SELECT id, email FROM users WHERE email LIKE '%@bench.example'")
+            self.users = cursor.fetchall()
+            cursor.execute('SELECT id FROM cvs')
+            self.cv_ids = [row[0] for row in cursor.fetchall()]
+            cursor.execute('SELECT name FROM skills ORDER BY name')
+            self.skill_names = [row[0] for row in cursor.fetchall()]
+        if not self.users or not self.cv_ids:
+            raise SystemExit("Base vide: lancez d'abord python -m benchmarks.generate_data")
+
+    def close(self):
+        self.db.close()
+
+
+# -----------------------
+# Scénarios
+# -----------------------
+@scenario("startup_schema")
+def bench_startup_schema(ctx):
+    # chemin de démarrage: schéma et catalogue déjà à jour
+    ctx.service.init_schema()
+    ctx.service.sync_skill_catalog()
+
+
+@scenario("login")
+def bench_login(ctx):
+    _, email = ctx.rng.choice(ctx.users)
+    user = ctx.service.authenticate(email, BENCH_PASSWORD)
+    ctx.service.touch_last_login(user['id'])
+
+
+@scenario("load_user_cvs")
+def bench_load_user_cvs(ctx):
+    user_id, _ = ctx.rng.choice(ctx.users)
+    ctx.service.list_user_cvs(user_id)
+
+
+@scenario("load_cv_data")
+def bench_load_cv_data(ctx):
+    ctx.service.get_cv(ctx.rng.choice(ctx.cv_ids))
+
+
+@scenario("flip_recent_cvs")
+def bench_flip_recent_cvs(ctx):
+    # aller-retour entre quelques CVs récents puis export (cache de CVs)
+    cv_id = ctx.rng.choice(ctx.cv_ids[:5])
+    cv = ctx.service.get_cv(cv_id)
+    ctx.service.build_text(cv['data'])
+
+
+@scenario("save_cv")
+def bench_save_cv(ctx):
+    cv_id = ctx.rng.choice(ctx.cv_ids)
+    cv = ctx.service.get_cv(cv_id)
+    cv['data'].setdefault('personal', {})['title'] = f"Titre {ctx.rng.randint(0, 10**6)}"
+    ctx.service.save_cv(cv_id, cv['data'], cv['photo_path'], cv['template'])
+
+
+@scenario("update_stats")
+def bench_update_stats(ctx):
+    ctx.service.cv_stats(ctx.rng.choice(ctx.cv_ids))
+
+
+@scenario("export_pdf")
+def bench_export_pdf(ctx):
+    cv = ctx.service.get_cv(ctx.rng.choice(ctx.cv_ids))
+    ctx.service.build_pdf(cv['data']).output(dest='S')
+
+
+@scenario("filter_skills")
+def bench_filter_skills(ctx):
+    from cv_services import filter_skill_names
+    name = ctx.rng.choice(ctx.skill_names)
+    filter_skill_names(ctx.skill_names, name[:2])
+
+
+# -----------------------
+# Exécution
+# -----------------------
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(timings_ms):
+    values = sorted(timings_ms)
+    return {
+        'iterations': len(values),
+        'mean_ms': round(sum(values) / len(values), 4) if values else 0.0,
+        'min_ms': round(values[0], 4) if values else 0.0,
+        'p50_ms': round(percentile(values, 50), 4),
+        'p95_ms': round(percentile(values, 95), 4),
+        'p99_ms': round(percentile(values, 99), 4),
+        'max_ms': round(values[-1], 4) if values else 0.0,
+    }
+
+
+def run_scenario(fn, ctx, iterations, warmup):
+    for _ in range(warmup):
+        fn(ctx)
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn(ctx)
+        timings.append((time.perf_counter() - start) * 1000)
+    return summarize(timings)
+
+
+def compare(results, baseline, tolerance):
+    """Compare les p50 à la référence; retourne (rapport, liste des régressions)"""
+    report, regressions = {}, []
+    base_results = baseline.get('results', {})
+    for name, res in results.items():
+        base = base_results.get(name)
+        if not base or not base.get('p50_ms'):
+            report[name] = {'status': 'new'}
+            continue
+        ratio = res['p50_ms'] / base['p50_ms']
+        status = 'ok'
+        if ratio > 1 + tolerance:
+            status = 'regression'
+            regressions.append(name)
+        elif ratio < 1 - tolerance:
+            status = 'improvement'
+        report[name] = {'baseline_p50_ms': base['p50_ms'], 'p50_ms': res['p50_ms'],
+                        'ratio': round(ratio, 3), 'status': status}
+    return report, regressions
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lance les benchmarks de la plateforme CV")
+    parser.add_argument("--db", default="bench_cv_platform.db")
+    parser.add_argument("--scenarios", help="liste séparée par des virgules (défaut: tous)")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="fichier JSON de résultats (défaut: sortie standard)")
+    parser.add_argument("--baseline", help="résultats de référence à comparer")
+    parser.add_argument("--save-baseline", help="enregistre aussi les résultats comme référence")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="écart p50 toléré (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    names = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        parser.error(f"scénarios inconnus: {', '.join(unknown)} (disponibles: {', '.join(SCENARIOS)})")
+
+    ctx = BenchContext(args.db, args.seed)
+    results = {}
+    try:
+        for name in names:
+            try:
+                results[name] = run_scenario(SCENARIOS[name], ctx, args.iterations, args.warmup)
+            except ImportError as e:
+                results[name] = {'skipped': str(e)}
+            print(f"{name:>20}: {results[name]}", file=sys.stderr)
+    finally:
+        ctx.close()
+
+    measured = {k: v for k, v in results.items() if 'skipped' not in v}
+    output = {'environment': environment(), 'db': args.db, 'results': results}
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            output['comparison'], regressions = compare(measured, json.load(f), args.tolerance)
+
+    text = json.dumps(output, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    if regressions:
+        print(f"Régressions: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
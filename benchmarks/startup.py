@@ -0,0 +1,89 @@
+"""Mesure le temps de démarrage: lancement du processus -> écran de connexion interactif.
+
+Chaque mesure démarre un nouvel interpréteur (dans un dossier temporaire)
+qui construit CVGeneratorApp et signale quand la boucle Tk devient
+disponible. Nécessite un affichage (DISPLAY ou Xvfb).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.run_benchmarks import summarize, compare, environment
+
+CHILD = r'''
+import sys, time
+t0 = float(sys.argv[1])
+import tkinter as tk
+import cv_platform
+
+root = tk.Tk()
+app = cv_platform.CVGeneratorApp(root)
+
+def ready():
+    root.update()
+    heavy = [name for name in ("PIL", "fpdf") if name in sys.modules]
+    print("READY", (time.time() - t0) * 1000, ",".join(heavy), flush=True)
+    app.on_close()
+
+root.after_idle(ready)
+root.mainloop()
+'''
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_once(workdir):
+    """Lance un processus et retourne (ms jusqu'à l'écran prêt, modules lourds chargés)"""
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT, CV_STALL_MS="0")
+    t0 = time.time()
+    proc = subprocess.run([sys.executable, "-c", CHILD, repr(t0)], cwd=workdir, env=env,
+                          capture_output=True, text=True, timeout=60)
+    for line in proc.stdout.splitlines():
+        if line.startswith("READY"):
+            _, elapsed, *rest = line.split(" ")
+            loaded = rest[0].split(",") if rest and rest[0] else []
+            return float(elapsed), loaded
+    raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "pas de signal READY")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark du temps de démarrage de l'application")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--output", help="fichier JSON de résultats")
+    parser.add_argument("--baseline", help="résultats de référence à comparer")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    timings, heavy = [], set()
+    with tempfile.TemporaryDirectory() as workdir:
+        try:
+            for _ in range(args.iterations):
+                elapsed, loaded = measure_once(workdir)
+                timings.append(elapsed)
+                heavy.update(loaded)
+        except (RuntimeError, subprocess.TimeoutExpired) as e:
+            print(f"Démarrage impossible (affichage disponible ?): {e}", file=sys.stderr)
+            return 2
+
+    result = summarize(timings)
+    result['heavy_modules_at_startup'] = sorted(heavy)
+    output = {'environment': environment(), 'results': {'startup_to_login': result}}
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            output['comparison'], regressions = compare(output['results'], json.load(f), args.tolerance)
+
+    text = json.dumps(output, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    print(text)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
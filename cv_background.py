@@ -0,0 +1,63 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BackgroundRunner:
+    """Exécute des tâches hors du thread Tk et applique leurs résultats dans la boucle Tk.
+
+    Les fonctions soumises tournent dans un pool de threads (elles ne
+    doivent pas toucher aux widgets); leurs callbacks on_done/on_error
+    sont appelés depuis la boucle Tk, via une file vidée par root.after
+    tant que des tâches sont en cours.
+    """
+
+    def __init__(self, root, max_workers=3, poll_ms=15):
+        self.root = root
+        self.poll_ms = poll_ms
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cv-bg")
+        self._results = queue.Queue()
+        self._outstanding = 0
+        self._polling = False
+        self._closed = False
+
+    def submit(self, fn, *args, on_done=None, on_error=None):
+        """Lance fn(*args) en arrière-plan; on_done(résultat) / on_error(exception) dans Tk"""
+        if self._closed:
+            return None
+        self._outstanding += 1
+
+        def task():
+            try:
+                result = fn(*args)
+            except Exception as e:
+                self._results.put((on_error, e))
+            else:
+                self._results.put((on_done, result))
+
+        future = self._executor.submit(task)
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_ms, self._drain)
+        return future
+
+    def _drain(self):
+        """Applique les résultats disponibles (thread Tk)"""
+        while True:
+            try:
+                callback, value = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._outstanding -= 1
+            if callback is not None and not self._closed:
+                try:
+                    callback(value)
+                except Exception as e:
+                    print(f"[DEBUG] Callback de tâche en arrière-plan: {e}")
+        if self._outstanding > 0 and not self._closed:
+            self.root.after(self.poll_ms, self._drain)
+        else:
+            self._polling = False
+
+    def shutdown(self, wait=True):
+        self._closed = True
+        self._executor.shutdown(wait=wait)
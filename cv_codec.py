@@ -0,0 +1,247 @@
+"""Compression des documents CV (cvs.data, cv_history.data).
+
+Format d'un document compressé (BLOB):
+
+    b'CVZ' + version (1 octet) + [id du dictionnaire (4 octets)] + flux zlib
+
+    version 1: zlib seul
+    version 2: zlib avec un dictionnaire partagé (table cv_dictionaries)
+
+Les anciennes lignes (TEXT JSON) restent lisibles; la migration les
+réécrit par lots:
+
+    python cv_codec.py stats --db cv_platform.db
+    python cv_codec.py train --db cv_platform.db --samples 2000
+    python cv_codec.py migrate --db cv_platform.db --vacuum
+"""
+import argparse
+import json
+import os
+import re
+import struct
+import sys
+import time
+import zlib
+from collections import Counter
+
+MAGIC = b'CVZ'
+FORMAT_ZLIB = 1
+FORMAT_ZLIB_DICT = 2
+
+# zlib ne référence que les 32 derniers Ko du dictionnaire
+MAX_DICT_SIZE = 32 * 1024
+
+_SEGMENT = re.compile(r'"(?:[^"\\]|\\.)*"\s*:\s*"?|"(?:[^"\\]|\\.)*"|[^"]+')
+
+
+class CodecError(ValueError):
+    """Document illisible (en-tête inconnu, dictionnaire manquant...)"""
+
+
+# -----------------------
+# Dictionnaire
+# -----------------------
+def train_dictionary(documents, size=MAX_DICT_SIZE):
+    """Construit un dictionnaire zlib à partir de documents JSON (str).
+
+    Les segments (clés, valeurs, fragments de texte) sont classés selon
+    le gain estimé (occurrences x longueur). Les plus rentables sont
+    placés en fin de dictionnaire, là où les références sont les moins
+    coûteuses.
+    """
+    counts = Counter()
+    for doc in documents:
+        for segment in set(_SEGMENT.findall(doc)):
+            if 4 <= len(segment) <= 256:
+                counts[segment] += 1
+
+    chosen = []
+    total = 0
+    for segment, n in sorted(counts.items(), key=lambda item: item[1] * len(item[0]), reverse=True):
+        if n < 2:
+            break
+        encoded = segment.encode('utf-8')
+        if total + len(encoded) > size:
+            continue
+        chosen.append(encoded)
+        total += len(encoded)
+    return b''.join(reversed(chosen))
+
+
+# -----------------------
+# Codec
+# -----------------------
+class CVCodec:
+    """Encode/décode les documents CV.
+
+    dictionaries: {id: bytes} des dictionnaires connus; active_dict: id
+    utilisé pour l'encodage (None = zlib seul). loader(id) est appelé pour
+    un dictionnaire inconnu (entraîné par un autre processus).
+    """
+
+    def __init__(self, dictionaries=None, active_dict=None, level=6, loader=None):
+        self.dictionaries = dict(dictionaries or {})
+        self.active_dict = active_dict
+        self.level = level
+        self.loader = loader
+
+    def _dictionary(self, dict_id):
+        zdict = self.dictionaries.get(dict_id)
+        if zdict is None and self.loader is not None:
+            zdict = self.loader(dict_id)
+            if zdict is not None:
+                self.dictionaries[dict_id] = zdict
+        if zdict is None:
+            raise CodecError(f"dictionnaire {dict_id} introuvable")
+        return zdict
+
+    def encode(self, data):
+        """dict -> BLOB compressé"""
+        return self.encode_json(json.dumps(data, ensure_ascii=False))
+
+    def encode_json(self, text):
+        """Document déjà sérialisé (str JSON) -> BLOB compressé"""
+        raw = text.encode('utf-8')
+        if self.active_dict is None:
+            return MAGIC + bytes([FORMAT_ZLIB]) + zlib.compress(raw, self.level)
+        comp = zlib.compressobj(self.level, zdict=self._dictionary(self.active_dict))
+        return (MAGIC + bytes([FORMAT_ZLIB_DICT]) + struct.pack('>I', self.active_dict)
+                + comp.compress(raw) + comp.flush())
+
+    def decode_bytes(self, value):
+        """Valeur stockée -> JSON (str); accepte l'ancien format TEXT"""
+        if isinstance(value, str):
+            return value
+        if not value.startswith(MAGIC):
+            return value.decode('utf-8')
+        version = value[3]
+        try:
+            if version == FORMAT_ZLIB:
+                return zlib.decompress(value[4:]).decode('utf-8')
+            if version == FORMAT_ZLIB_DICT:
+                (dict_id,) = struct.unpack('>I', value[4:8])
+                decomp = zlib.decompressobj(zdict=self._dictionary(dict_id))
+                return (decomp.decompress(value[8:]) + decomp.flush()).decode('utf-8')
+        except zlib.error as e:
+            raise CodecError(f"document corrompu: {e}")
+        raise CodecError(f"version de format inconnue: {version}")
+
+    def decode(self, value):
+        """Valeur stockée -> dict ({} si vide)"""
+        if not value:
+            return {}
+        return json.loads(self.decode_bytes(value))
+
+    def is_current(self, value):
+        """True si la valeur est déjà encodée avec le format/dictionnaire actif"""
+        if not isinstance(value, bytes) or not value.startswith(MAGIC):
+            return False
+        if self.active_dict is None:
+            return value[3] == FORMAT_ZLIB
+        return value[3] == FORMAT_ZLIB_DICT and struct.unpack('>I', value[4:8])[0] == self.active_dict
+
+
+# -----------------------
+# Outils en ligne de commande
+# -----------------------
+def db_size(db_file):
+    return sum(os.path.getsize(db_file + suffix) for suffix in ("", "-wal")
+               if os.path.exists(db_file + suffix))
+
+
+def table_stats(db, codec, table, sample=2000):
+    """Nombre de lignes, lignes compressées, taille stockée et taille JSON (échantillon)"""
+    with db.read() as cursor:
+        cursor.execute(f"SELECT COUNT(*), SUM(typeof(data) = 'blob'), SUM(length(CAST(data AS BLOB))) FROM {table}")
+        rows, compressed, stored = cursor.fetchone()
+        cursor.execute(f"SELECT data FROM {table} ORDER BY random() LIMIT ?", (sample,))
+        raw = stored_sample = 0
+        for (value,) in cursor.fetchall():
+            stored_sample += len(value.encode('utf-8') if isinstance(value, str) else value)
+            raw += len(codec.decode_bytes(value).encode('utf-8'))
+    return {
+        'rows': rows,
+        'compressed_rows': compressed or 0,
+        'stored_bytes': stored or 0,
+        'ratio_sample': round(stored_sample / raw, 3) if raw else None,
+    }
+
+
+def migrate_table(db, codec, table, batch_size=500, progress=None):
+    """Réencode les lignes qui ne sont pas au format actif, par lots d'ID"""
+    last_id = 0
+    converted = 0
+    while True:
+        with db.read() as cursor:
+            cursor.execute(f'SELECT id, data FROM {table} WHERE id > ? ORDER BY id LIMIT ?',
+                           (last_id, batch_size))
+            rows = cursor.fetchall()
+        if not rows:
+            return converted
+        last_id = rows[-1][0]
+        updates = [(codec.encode(codec.decode(value)), row_id)
+                   for row_id, value in rows if not codec.is_current(value)]
+        if updates:
+            with db.write() as cursor:
+                cursor.executemany(f'UPDATE {table} SET data = ? WHERE id = ?', updates)
+            converted += len(updates)
+            if progress is not None:
+                progress(table, converted)
+
+
+def main():
+    from cv_db import ConnectionManager
+    from cv_services import CVService
+
+    parser = argparse.ArgumentParser(description="Compression des documents CV")
+    parser.add_argument("command", choices=("stats", "train", "migrate"))
+    parser.add_argument("--db", default="cv_platform.db")
+    parser.add_argument("--samples", type=int, default=2000, help="documents utilisés pour l'entraînement")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM après migration (récupère l'espace)")
+    args = parser.parse_args()
+
+    db = ConnectionManager(args.db)
+    service = CVService(db)
+    service.init_schema()
+    try:
+        if args.command == "stats":
+            codec = service.codec
+            result = {'db_bytes': db_size(args.db), 'active_dict': codec.active_dict}
+            for table in ('cvs', 'cv_history'):
+                result[table] = table_stats(db, codec, table)
+
+        elif args.command == "train":
+            codec = service.codec
+            with db.read() as cursor:
+                cursor.execute('SELECT data FROM cvs ORDER BY random() LIMIT ?', (args.samples,))
+                docs = [codec.decode_bytes(value) for (value,) in cursor.fetchall()]
+            zdict = train_dictionary(docs)
+            dict_id = service.add_cv_dictionary(zdict)
+            sample = docs[:200]
+            plain = CVCodec(level=codec.level)
+            trained = CVCodec({dict_id: zdict}, dict_id, codec.level)
+            size = lambda c: sum(len(c.encode(json.loads(d))) for d in sample)
+            result = {'dict_id': dict_id, 'dict_bytes': len(zdict), 'documents': len(docs),
+                      'sample_zlib_bytes': size(plain), 'sample_dict_bytes': size(trained),
+                      'sample_json_bytes': sum(len(d.encode('utf-8')) for d in sample)}
+
+        else:
+            codec = service.codec
+            before = db_size(args.db)
+            start = time.perf_counter()
+            progress = lambda table, n: print(f"{table}: {n} lignes réencodées", file=sys.stderr)
+            result = {table: migrate_table(db, codec, table, args.batch_size, progress)
+                      for table in ('cvs', 'cv_history')}
+            result['seconds'] = round(time.perf_counter() - start, 2)
+            if args.vacuum:
+                db.vacuum()
+            result['db_bytes_before'] = before
+            result['db_bytes_after'] = db_size(args.db)
+    finally:
+        db.close()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
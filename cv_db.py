@@ -0,0 +1,432 @@
+import os
+import sqlite3
+import threading
+import queue
+import re
+import time
+import json
+from contextlib import contextmanager
+
+from cv_metrics import LatencyHistogram
+
+
+# -----------------------
+# Instrumentation des requêtes
+# -----------------------
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+_EXPLAINABLE = ('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT')
+
+
+def normalize_sql(sql):
+    """Normalise une requête SQL (littéraux remplacés, espaces réduits)"""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _WHITESPACE.sub(' ', sql).strip()
+    return _IN_LIST.sub('(?, ...)', sql)
+
+
+class StatementStats:
+    """Statistiques cumulées pour une requête normalisée"""
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.calls = 0
+        self.rows = 0
+        self.latency = LatencyHistogram()
+        self.plan = None
+
+    def to_dict(self):
+        d = {'sql': self.sql, 'calls': self.calls, 'rows': self.rows}
+        d.update(self.latency.summary())
+        if self.plan is not None:
+            d['plan'] = self.plan
+        return d
+
+
+class QueryStats:
+    """Collecte, par requête normalisée, appels, lignes et latences.
+
+    Les requêtes plus lentes que slow_ms sont expliquées une fois
+    (EXPLAIN QUERY PLAN) pour repérer les scans de table.
+    """
+
+    def __init__(self, slow_ms=50.0):
+        self.slow_ms = slow_ms
+        self._stats = {}
+        self._lock = threading.Lock()
+        self.explainer = None  # callable(sql, params) -> liste de lignes du plan
+
+    def record(self, sql, params, elapsed_ms, rows):
+        key = normalize_sql(sql)
+        with self._lock:
+            st = self._stats.get(key)
+            if st is None:
+                st = self._stats[key] = StatementStats(key)
+            st.calls += 1
+            st.rows += rows
+            need_plan = (elapsed_ms >= self.slow_ms and st.plan is None
+                         and key.split(' ', 1)[0].upper() in _EXPLAINABLE)
+            if need_plan:
+                st.plan = []  # réservé: évite plusieurs EXPLAIN concurrents
+        st.latency.observe(elapsed_ms)
+        if need_plan and self.explainer is not None:
+            try:
+                st.plan = self.explainer(sql, params)
+            except sqlite3.Error as e:
+                st.plan = [f"EXPLAIN impossible: {e}"]
+
+    def snapshot(self):
+        """Liste des statistiques, triées par temps total décroissant"""
+        with self._lock:
+            stats = list(self._stats.values())
+        stats.sort(key=lambda st: st.latency.total, reverse=True)
+        return [st.to_dict() for st in stats]
+
+    def slow_queries(self):
+        return [d for d in self.snapshot() if d.get('plan')]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def dump(self, path):
+        """Écrit les statistiques dans un fichier JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'slow_ms': self.slow_ms, 'statements': self.snapshot()},
+                      f, ensure_ascii=False, indent=2)
+
+
+class InstrumentedCursor:
+    """Curseur qui mesure chaque requête (exécution + lecture des lignes)"""
+
+    def __init__(self, cursor, stats):
+        self._cursor = cursor
+        self._stats = stats
+        self._pending = None  # [sql, params, elapsed_ms, rows]
+
+    def _finish(self):
+        if self._pending is not None:
+            sql, params, elapsed, rows = self._pending
+            self._pending = None
+            self._stats.record(sql, params, elapsed, rows)
+
+    def _timed(self, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            if self._pending is not None:
+                self._pending[2] += (time.perf_counter() - start) * 1000
+
+    def execute(self, sql, params=()):
+        self._finish()
+        self._pending = [sql, params, 0.0, 0]
+        self._timed(self._cursor.execute, sql, params)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._finish()
+        self._pending = [sql, None, 0.0, 0]
+        self._timed(self._cursor.executemany, sql, seq_of_params)
+        self._pending[3] = max(self._cursor.rowcount, 0)
+        self._finish()
+        return self
+
+    def fetchone(self):
+        row = self._timed(self._cursor.fetchone)
+        if row is None:
+            self._finish()
+        elif self._pending is not None:
+            self._pending[3] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(self._cursor.fetchmany, size or self._cursor.arraysize)
+        if self._pending is not None:
+            self._pending[3] += len(rows)
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(self._cursor.fetchall)
+        if self._pending is not None:
+            self._pending[3] += len(rows)
+        self._finish()
+        return rows
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def close(self):
+        if self._pending is not None and self._pending[3] == 0:
+            self._pending[3] = max(self._cursor.rowcount, 0)
+        self._finish()
+        self._cursor.close()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+# -----------------------
+# Gestionnaire de connexions
+# -----------------------
+def wal_enabled():
+    """Mode WAL, sauf CV_DB_WAL=0: journal classique (base sur un partage réseau)"""
+    return os.environ.get("CV_DB_WAL", "1") != "0"
+
+
+class ConnectionManager:
+    """Pool borné de connexions en lecture + une connexion unique en écriture.
+
+    En mode WAL, les lectures peuvent s'exécuter en parallèle (une connexion
+    par thread, empruntée au pool) pendant que toutes les écritures passent
+    par la connexion d'écriture, protégée par un verrou.
+    """
+
+    def __init__(self, db_file, pool_size=4, timeout=30.0, wal=True, stats=None):
+        self.db_file = db_file
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.wal = wal
+        self.stats = stats
+
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._readers = []
+        self._readers_lock = threading.Lock()
+        self._local = threading.local()
+        self._closed = False
+
+        # Connexion d'écriture (créée en premier pour fixer le mode journal)
+        self._write_lock = threading.RLock()
+        self._write_depth = 0
+        self._writer = self._connect()
+        if wal:
+            self._writer.execute('PRAGMA journal_mode=WAL')
+            self._writer.execute('PRAGMA synchronous=NORMAL')
+        else:
+            # journal classique: WAL exige une mémoire partagée, absente sur un partage réseau
+            mode = self._writer.execute('PRAGMA journal_mode=DELETE').fetchone()[0]
+            if mode != 'delete':
+                print(f"[DEBUG] Mode de journal inchangé ({mode}): base ouverte ailleurs")
+        if stats is not None:
+            stats.explainer = self.explain
+
+    def _connect(self, read_only=False):
+        """Ouvre une connexion SQLite configurée"""
+        conn = sqlite3.connect(self.db_file, timeout=self.timeout, check_same_thread=False)
+        conn.execute(f'PRAGMA busy_timeout = {int(self.timeout * 1000)}')
+        if read_only:
+            conn.execute('PRAGMA query_only = 1')
+        return conn
+
+    def _cursor(self, conn):
+        """Crée un curseur, instrumenté si des statistiques sont collectées"""
+        cursor = conn.cursor()
+        if self.stats is not None:
+            return InstrumentedCursor(cursor, self.stats)
+        return cursor
+
+    def explain(self, sql, params=None):
+        """Retourne le plan d'exécution (EXPLAIN QUERY PLAN) d'une requête"""
+        conn = self._connect(read_only=True)
+        try:
+            if params is None:
+                params = (None,) * sql.count('?')
+            rows = conn.execute('EXPLAIN QUERY PLAN ' + sql, params).fetchall()
+            return [row[-1] for row in rows]
+        finally:
+            conn.close()
+
+    # -----------------------
+    # Lectures
+    # -----------------------
+    def _acquire_reader(self):
+        """Emprunte une connexion de lecture (bloque si le pool est épuisé)"""
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            try:
+                conn = self._connect(read_only=True)
+            except sqlite3.Error:
+                self._slots.release()
+                raise
+            with self._readers_lock:
+                self._readers.append(conn)
+            return conn
+
+    def _release_reader(self, conn):
+        """Rend une connexion de lecture au pool"""
+        if self._closed:
+            conn.close()
+        else:
+            self._idle.put(conn)
+        self._slots.release()
+
+    @contextmanager
+    def read(self):
+        """Fournit un curseur de lecture propre au thread courant.
+
+        Les appels imbriqués dans un même thread réutilisent la même connexion.
+        """
+        conn = getattr(self._local, 'reader', None)
+        if conn is not None:
+            cursor = self._cursor(conn)
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+            return
+
+        conn = self._acquire_reader()
+        self._local.reader = conn
+        cursor = self._cursor(conn)
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+            # Terminer la transaction de lecture implicite pour libérer le snapshot WAL
+            if conn.in_transaction:
+                conn.rollback()
+            self._local.reader = None
+            self._release_reader(conn)
+
+    # -----------------------
+    # Écritures
+    # -----------------------
+    @contextmanager
+    def write(self):
+        """Fournit un curseur sur la connexion d'écriture.
+
+        Le bloc forme une transaction: commit à la sortie, rollback en cas
+        d'exception. Les blocs imbriqués rejoignent la transaction englobante.
+        """
+        with self._write_lock:
+            self._write_depth += 1
+            cursor = self._cursor(self._writer)
+            try:
+                yield cursor
+            except BaseException:
+                self._write_depth -= 1
+                if self._write_depth == 0:
+                    self._writer.rollback()
+                raise
+            else:
+                self._write_depth -= 1
+                if self._write_depth == 0:
+                    self._writer.commit()
+            finally:
+                cursor.close()
+
+    def vacuum(self):
+        """Reconstruit la base (VACUUM) et vide le journal WAL"""
+        with self._write_lock:
+            self._writer.commit()
+            self._writer.execute('VACUUM')
+            if self.wal:
+                self._writer.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+    # -----------------------
+    # Fermeture
+    # -----------------------
+    def close(self):
+        """Ferme toutes les connexions"""
+        if self._closed:
+            return
+        self._closed = True
+        with self._write_lock:
+            try:
+                self._writer.commit()
+            finally:
+                self._writer.close()
+        with self._readers_lock:
+            readers, self._readers = self._readers, []
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+        for conn in readers:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+
+# -----------------------
+# Écritures différées
+# -----------------------
+class DeferredWriter:
+    """Regroupe des écritures non urgentes et les applique par lots.
+
+    Chaque écriture porte une clé: une écriture plus récente avec la même
+    clé remplace celle en attente (ex: dernière connexion d'un
+    utilisateur). Un thread applique les écritures en attente toutes les
+    interval secondes (ou dès max_pending), dans une seule transaction.
+    """
+
+    def __init__(self, db, interval=2.0, max_pending=500):
+        self.db = db
+        self.interval = interval
+        self.max_pending = max_pending
+        self.flushed = 0
+        self._pending = {}  # clé -> (sql, params), dans l'ordre d'arrivée
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="cv-deferred-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, key, sql, params=()):
+        with self._lock:
+            self._pending.pop(key, None)
+            self._pending[key] = (sql, params)
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self._wakeup.set()
+
+    def flush(self):
+        """Applique les écritures en attente (groupées par requête); retourne leur nombre"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        groups = {}
+        for sql, params in pending.values():
+            groups.setdefault(sql, []).append(params)
+        try:
+            with self.db.write() as cursor:
+                for sql, rows in groups.items():
+                    cursor.executemany(sql, rows)
+        except sqlite3.Error as e:
+            print(f"[DEBUG] Écritures différées: {e}")
+            # remettre en attente ce qui n'a pas été remplacé entre-temps
+            with self._lock:
+                for key, item in pending.items():
+                    self._pending.setdefault(key, item)
+            return 0
+        self.flushed += len(pending)
+        return len(pending)
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            if not self._stopping:
+                self.flush()
+
+    def close(self):
+        """Arrête le thread et applique les dernières écritures"""
+        self._stopping = True
+        self._wakeup.set()
+        self._thread.join()
+        self.flush()
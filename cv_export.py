@@ -0,0 +1,226 @@
+"""Export de la base pour l'ETL (JSONL ou CSV, gzip optionnel).
+
+    python cv_export.py --db cv_platform.db --out etl/ --format jsonl --gzip
+    python cv_export.py --db cv_platform.db --out etl/ --state etl_state.json
+
+Les lignes sont lues par paquets (fetchmany) et écrites au fil de l'eau:
+la mémoire utilisée ne dépend pas de la taille des tables. Toutes les
+tables sont lues dans une même transaction de lecture (BEGIN explicite:
+instantané cohérent; sans WAL, les écritures attendent la fin de
+l'export). Avec --state, seules les lignes modifiées depuis le dernier
+export sont écrites, puis les nouveaux repères sont enregistrés.
+
+Les suppressions (CVs, compétences utilisateur) sont exportées dans le
+fichier deletions (table, clé primaire): à appliquer avant les lignes
+des autres fichiers du même export.
+"""
+import argparse
+import csv
+import datetime
+import gzip
+import json
+import os
+import sys
+import time
+
+from cv_codec import CVCodec
+from cv_db import ConnectionManager, wal_enabled
+from cv_services import CVService
+
+
+class TableExport:
+    """Description d'une table exportée.
+
+    watermark: expressions de tri servant de repère incrémental (les
+    dernières doivent identifier la ligne), ou None pour un export complet
+    à chaque fois. Si la première expression est une date, les lignes de la
+    seconde en cours sont laissées au prochain export (CURRENT_TIMESTAMP
+    est à la seconde près).
+    """
+
+    def __init__(self, name, columns, watermark=None, timestamp=False, json_columns=()):
+        self.name = name
+        self.columns = columns
+        self.watermark = watermark
+        self.timestamp = timestamp
+        self.json_columns = json_columns
+
+    def query(self, since=None, bounded=False):
+        sql = f"SELECT {', '.join(self.columns)}"
+        params = []
+        where = []
+        if self.watermark:
+            sql += f", {', '.join(self.watermark)}"
+            if since is not None:
+                where.append(f"({', '.join(self.watermark)}) > ({', '.join('?' * len(since))})")
+                params.extend(since)
+            if bounded and self.timestamp:
+                where.append(f"{self.watermark[0]} < datetime('now')")
+        sql += f" FROM {self.name}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        if self.watermark:
+            sql += f" ORDER BY {', '.join(self.watermark)}"
+        return sql, params
+
+
+# Colonnes exportées (jamais password_hash)
+TABLES = {
+    'users': TableExport('users', ('id', 'email', 'first_name', 'last_name', 'role',
+                                   'created_at', 'last_login', 'is_active'),
+                         watermark=('COALESCE(last_login, created_at)', 'id'), timestamp=True),
+    'cvs': TableExport('cvs', ('id', 'user_id', 'title', 'template', 'data', 'photo_path',
+                               'created_at', 'updated_at', 'is_public', 'view_count'),
+                       watermark=('updated_at', 'id'), timestamp=True, json_columns=('data',)),
+    'user_skills': TableExport('user_skills', ('user_id', 'skill_id', 'level', 'experience_years', 'last_used',
+                                               'updated_at'),
+                               watermark=('updated_at', 'user_id', 'skill_id'), timestamp=True),
+    'cv_views': TableExport('cv_views', ('id', 'cv_id', 'viewer_id', 'viewed_at', 'ip_address'),
+                            watermark=('id',)),
+    'deletions': TableExport('deletions', ('id', 'table_name', 'row_key', 'deleted_at'),
+                             watermark=('id',), json_columns=('row_key',)),
+}
+
+
+# -----------------------
+# Écriture
+# -----------------------
+def open_output(path, compress):
+    if compress:
+        return gzip.open(path, 'wt', compresslevel=6, encoding='utf-8', newline='')
+    return open(path, 'w', encoding='utf-8', newline='')
+
+
+def export_table(cursor, table, f, fmt, since=None, bounded=False, chunk_size=1000, codec=None):
+    """Écrit les lignes de table dans f; retourne (lignes, dernier repère).
+
+    Les colonnes json_columns (documents CV, éventuellement compressés)
+    sont décodées avec codec: objet JSON en JSONL, texte JSON en CSV.
+    """
+    codec = codec or CVCodec()
+    sql, params = table.query(since, bounded)
+    cursor.execute(sql, params)
+    ncols = len(table.columns)
+    json_idx = [table.columns.index(c) for c in table.json_columns]
+    writer = None
+    if fmt == 'csv':
+        writer = csv.writer(f)
+        writer.writerow(table.columns)
+
+    rows = 0
+    last = since
+    while True:
+        chunk = cursor.fetchmany(chunk_size)
+        if not chunk:
+            break
+        for row in chunk:
+            values = list(row[:ncols])
+            for i in json_idx:
+                if values[i]:
+                    text = codec.decode_bytes(values[i])
+                    values[i] = text if writer is not None else json.loads(text)
+            if writer is not None:
+                writer.writerow(values)
+            else:
+                f.write(json.dumps(dict(zip(table.columns, values)), ensure_ascii=False) + "\n")
+        rows += len(chunk)
+        if table.watermark:
+            last = list(chunk[-1][ncols:])
+    return rows, last
+
+
+def load_state(path):
+    if path and os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def save_state(path, state):
+    """Écrit l'état de façon atomique (fichier temporaire puis renommage)"""
+    tmp = path + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+def export_database(db, out_dir, tables=None, fmt='jsonl', compress=False, state_file=None, chunk_size=1000,
+                    codec=None):
+    """Exporte les tables demandées dans out_dir; retourne un résumé par table.
+
+    Les fichiers sont écrits sous un nom temporaire puis renommés; l'état
+    n'est mis à jour qu'une fois toutes les tables exportées.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    state = load_state(state_file)
+    watermarks = state.get('watermarks', {})
+    stamp = datetime.datetime.now().strftime("%Y%m%dT%H%M%S")
+    ext = fmt + (".gz" if compress else "")
+    summary = {}
+    written = []
+
+    try:
+        with db.read() as cursor:
+            # sqlite3 n'ouvre pas de transaction pour un SELECT: sans BEGIN,
+            # chaque table serait lue dans un instantané différent
+            own_transaction = not cursor.connection.in_transaction
+            if own_transaction:
+                cursor.execute('BEGIN')
+            for name in tables or TABLES:
+                table = TABLES[name]
+                since = watermarks.get(name) if table.watermark else None
+                path = os.path.join(out_dir, f"{name}-{stamp}.{ext}")
+                start = time.perf_counter()
+                written.append(path)
+                with open_output(path + ".part", compress) as f:
+                    rows, last = export_table(cursor, table, f, fmt, since, bool(state_file), chunk_size, codec)
+                elapsed = time.perf_counter() - start
+                summary[name] = {
+                    'file': path,
+                    'rows': rows,
+                    'mode': 'incremental' if since is not None else 'full',
+                    'seconds': round(elapsed, 3),
+                    'rows_per_sec': round(rows / elapsed, 1) if elapsed else 0.0,
+                }
+                if last is not None:
+                    watermarks[name] = last
+            if own_transaction:
+                cursor.execute('COMMIT')
+    except BaseException:
+        for path in written:
+            if os.path.exists(path + ".part"):
+                os.remove(path + ".part")
+        raise
+
+    for path in written:
+        os.replace(path + ".part", path)
+    if state_file:
+        save_state(state_file, {'exported_at': stamp, 'watermarks': watermarks})
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporte la base (JSONL/CSV) pour l'ETL")
+    parser.add_argument("--db", default="cv_platform.db", help="fichier SQLite source")
+    parser.add_argument("--out", default="etl", help="dossier de sortie")
+    parser.add_argument("--format", choices=("jsonl", "csv"), default="jsonl")
+    parser.add_argument("--gzip", action="store_true", help="compresse les fichiers (.gz)")
+    parser.add_argument("--tables", nargs="+", choices=list(TABLES), help="tables à exporter (toutes par défaut)")
+    parser.add_argument("--state", help="fichier d'état pour l'export incrémental")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="lignes lues par fetchmany")
+    parser.add_argument("--no-wal", action="store_true", help="journal classique (base sur un partage réseau)")
+    args = parser.parse_args()
+
+    db = ConnectionManager(args.db, wal=not args.no_wal and wal_enabled())
+    try:
+        service = CVService(db)
+        service.init_schema()
+        summary = export_database(db, args.out, args.tables, args.format, args.gzip,
+                                  args.state, args.chunk_size, service.codec)
+    finally:
+        db.close()
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
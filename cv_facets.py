@@ -0,0 +1,284 @@
+"""Index de facettes pour la recherche de candidats (onglet recruteur).
+
+Chaque CV reçoit une position; chaque valeur de facette (compétence,
+compétence+niveau, langue, langue+niveau, ville, diplôme, tranche
+d'expérience) a un bitmap (int Python) des positions qui la portent.
+Une recherche combine les bitmaps (OU dans une facette, ET entre
+facettes); les effectifs par valeur sont des popcounts.
+
+Les facettes issues du document CV (langues, ville, diplômes) sont
+enregistrées dans la table cv_facets à chaque sauvegarde; les compétences
+viennent de user_skills et l'expérience de cv_timeline. CVService tient
+l'index à jour de façon incrémentale (save_cv, compétences, suppression).
+
+    python cv_facets.py --candidates 100000
+"""
+import argparse
+import random
+import threading
+import time
+import tracemalloc
+
+FACETS = ('skill', 'skill_level', 'language', 'language_level', 'location', 'degree', 'experience')
+
+FACET_LABELS = {
+    'skill': "Compétence",
+    'skill_level': "Compétence et niveau",
+    'language': "Langue",
+    'language_level': "Langue et niveau",
+    'location': "Ville",
+    'degree': "Diplôme",
+    'experience': "Expérience",
+}
+
+# Facettes d'une même famille: les effectifs de l'une ignorent les filtres de l'autre
+FACET_GROUPS = {
+    'skill': ('skill', 'skill_level'), 'skill_level': ('skill', 'skill_level'),
+    'language': ('language', 'language_level'), 'language_level': ('language', 'language_level'),
+}
+
+# (borne basse en mois, libellé)
+EXPERIENCE_BUCKETS = ((120, "10 ans et plus"), (60, "5 à 10 ans"), (24, "2 à 5 ans"), (0, "moins de 2 ans"))
+
+try:
+    _popcount = int.bit_count
+except AttributeError:  # Python < 3.10
+    def _popcount(value):
+        return bin(value).count('1')
+
+
+def _bitmap(positions, size):
+    buf = bytearray(size)
+    for pos in positions:
+        buf[pos >> 3] |= 1 << (pos & 7)
+    return int.from_bytes(buf, 'little')
+
+
+def _clean(text):
+    return ' '.join(str(text or '').split())
+
+
+def level_value(name, level):
+    """Valeur des facettes skill_level / language_level"""
+    return f"{name}|{level}"
+
+
+def experience_bucket(months):
+    for low, label in EXPERIENCE_BUCKETS:
+        if months >= low:
+            return label
+    return EXPERIENCE_BUCKETS[-1][1]
+
+
+def document_facets(data):
+    """Facettes tirées d'un document CV (dict ou CVModel): [(facette, valeur)]"""
+    keys = set()
+    for lang in data.get('languages') or []:
+        name = _clean(lang.get('name'))
+        if name:
+            keys.add(('language', name))
+            level = _clean(lang.get('level'))
+            if level:
+                keys.add(('language_level', level_value(name, level)))
+    address = _clean((data.get('personal') or {}).get('address'))
+    if address:
+        # "12 rue X, 75001 Paris" -> "Paris"
+        city = ' '.join(w for w in address.split(',')[-1].split() if not w.isdigit())
+        if city:
+            keys.add(('location', city))
+    for ed in data.get('education') or []:
+        degree = _clean(ed.get('degree'))
+        if degree:
+            keys.add(('degree', degree))
+    return sorted(keys)
+
+
+class FacetIndex:
+    """Bitmaps de facettes sur les CVs (positions denses); accès protégé par un verrou"""
+
+    def __init__(self):
+        self.postings = {facet: {} for facet in FACETS}
+        self.positions = {}     # cv_id -> position
+        self.ids = []           # position -> cv_id (None = supprimé)
+        self.doc_keys = []      # position -> tuple des (facette, valeur)
+        self.alive = 0          # bitmap des CVs présents
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return _popcount(self.alive)
+
+    @classmethod
+    def build(cls, docs):
+        """Construction en bloc depuis [(cv_id, [(facette, valeur)])], cv_id uniques.
+
+        Les positions sont d'abord regroupées par valeur, puis chaque bitmap
+        est créé en une fois (un bytearray converti en int), au lieu d'un
+        OU par CV qui recopierait le bitmap à chaque ajout.
+        """
+        index = cls()
+        ids, positions, doc_keys = index.ids, index.positions, index.doc_keys
+        groups = {}
+        for cv_id, keys in docs:
+            pos = positions[cv_id] = len(ids)
+            ids.append(cv_id)
+            keys = tuple(keys)
+            doc_keys.append(keys)
+            for key in keys:
+                group = groups.get(key)
+                if group is None:
+                    group = groups[key] = []
+                group.append(pos)
+        size = (len(ids) + 7) // 8
+        for (facet, value), group in groups.items():
+            index.postings[facet][value] = _bitmap(group, size)
+        index.alive = _bitmap(range(len(ids)), size)
+        return index
+
+    def update(self, cv_id, keys):
+        """Remplace les facettes d'un CV (ajouté s'il est inconnu)"""
+        keys = tuple(set(keys))
+        with self._lock:
+            pos = self.positions.get(cv_id)
+            if pos is None:
+                pos = self.positions[cv_id] = len(self.ids)
+                self.ids.append(cv_id)
+                self.doc_keys.append(())
+            bit = 1 << pos
+            old = set(self.doc_keys[pos])
+            new = set(keys)
+            if old != new:
+                self._clear(old - new, bit)
+                for facet, value in new - old:
+                    values = self.postings[facet]
+                    values[value] = values.get(value, 0) | bit
+                self.doc_keys[pos] = keys
+            self.alive |= bit
+
+    def remove(self, cv_id):
+        with self._lock:
+            pos = self.positions.pop(cv_id, None)
+            if pos is None:
+                return
+            bit = 1 << pos
+            self._clear(set(self.doc_keys[pos]), bit)
+            self.doc_keys[pos] = ()
+            self.ids[pos] = None
+            self.alive &= ~bit
+
+    def _clear(self, keys, bit):
+        for facet, value in keys:
+            values = self.postings[facet]
+            remaining = values.get(value, 0) & ~bit
+            if remaining:
+                values[value] = remaining
+            else:
+                values.pop(value, None)
+
+    def _select(self, filters, skip=()):
+        """ET entre facettes, OU entre les valeurs d'une même facette"""
+        result = self.alive
+        for facet, values in filters.items():
+            if facet in skip or not values:
+                continue
+            postings = self.postings.get(facet, {})
+            union = 0
+            for value in values:
+                union |= postings.get(value, 0)
+            result &= union
+        return result
+
+    def search(self, filters, limit=50, count_facets=FACETS, top=30):
+        """Retourne (total, cv_ids[:limit], effectifs par facette).
+
+        filters: {facette: [valeurs]}. Les effectifs d'une facette sont
+        calculés sans son propre filtre ni celui de sa famille (FACET_GROUPS):
+        on voit les alternatives.
+        """
+        with self._lock:
+            selected = self._select(filters)
+            counts = {}
+            for facet in count_facets:
+                skip = FACET_GROUPS.get(facet, (facet,))
+                base = self._select(filters, skip) if any(filters.get(f) for f in skip) else selected
+                facet_counts = [(value, _popcount(base & bitmap)) for value, bitmap in self.postings[facet].items()]
+                facet_counts = [item for item in facet_counts if item[1]]
+                facet_counts.sort(key=lambda item: (-item[1], item[0]))
+                counts[facet] = facet_counts[:top]
+            ids = []
+            bits = selected
+            while bits and len(ids) < limit:
+                low = bits & -bits
+                ids.append(self.ids[low.bit_length() - 1])
+                bits ^= low
+            return _popcount(selected), ids, counts
+
+
+# -----------------------
+# Benchmark
+# -----------------------
+def synthetic_keys(rng, skills, languages, cities, degrees):
+    keys = []
+    for name in rng.sample(skills, rng.randint(5, 15)):
+        level = rng.choice((1, 1, 2, 2, 2, 3, 3, 4))
+        keys += [('skill', name), ('skill_level', level_value(name, level))]
+    for name in rng.sample(languages, rng.randint(1, 3)):
+        keys += [('language', name), ('language_level', level_value(name, rng.choice(("Débutant", "Intermédiaire", "Avancé", "Courant"))))]
+    keys.append(('location', rng.choice(cities)))
+    keys += [('degree', d) for d in rng.sample(degrees, rng.randint(1, 2))]
+    keys.append(('experience', experience_bucket(rng.randint(0, 300))))
+    return keys
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de l'index de facettes")
+    parser.add_argument("--candidates", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    skills = [f"Compétence {i}" for i in range(300)]
+    languages = ["Français", "Anglais", "Espagnol", "Allemand", "Italien", "Portugais", "Arabe", "Chinois", "Japonais", "Russe"]
+    cities = [f"Ville {i}" for i in range(40)]
+    degrees = [f"Diplôme {i}" for i in range(25)]
+    docs = [synthetic_keys(rng, skills, languages, cities, degrees) for _ in range(args.candidates)]
+
+    start = time.perf_counter()
+    index = FacetIndex.build(enumerate(docs, 1))
+    build_s = time.perf_counter() - start
+    # mémoire mesurée à part: tracemalloc ralentit fortement la construction
+    del index
+    tracemalloc.start()
+    index = FacetIndex.build(enumerate(docs, 1))
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    def timed(make_filters, n):
+        timings = []
+        for _ in range(n):
+            filters = make_filters()
+            start = time.perf_counter()
+            total, _, _ = index.search(filters)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        return {'p50_ms': round(timings[len(timings) // 2], 2), 'max_ms': round(timings[-1], 2), 'last_total': total}
+
+    print(f"candidats: {args.candidates}, construction: {build_s:.2f} s, mémoire: {memory / 2**20:.1f} Mo")
+    print("sans filtre        :", timed(lambda: {}, args.queries))
+    print("1 compétence       :", timed(lambda: {'skill': [rng.choice(skills)]}, args.queries))
+    print("compétence≥3+langue:", timed(lambda: {
+        'skill_level': [level_value(name, lvl) for name in [rng.choice(skills)] for lvl in (3, 4)],
+        'language': [rng.choice(languages)]}, args.queries))
+    print("4 facettes         :", timed(lambda: {
+        'skill': [rng.choice(skills), rng.choice(skills)], 'language': ["Anglais"],
+        'location': [rng.choice(cities)], 'experience': [EXPERIENCE_BUCKETS[1][1]]}, args.queries))
+    updates = [(rng.randint(1, args.candidates), synthetic_keys(rng, skills, languages, cities, degrees))
+               for _ in range(1000)]
+    start = time.perf_counter()
+    for cv_id, keys in updates:
+        index.update(cv_id, keys)
+    print(f"mise à jour incrémentale: {(time.perf_counter() - start) / len(updates) * 1000:.3f} ms/CV")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+"""Import en masse de CVs (JSON Resume ou JSONL).
+
+    python cv_import.py cvs.jsonl --db cv_platform.db --errors erreurs.jsonl
+    python cv_import.py resumes/ --db cv_platform.db --batch-size 2000
+
+Chaque document est soit au format JSON Resume (https://jsonresume.org),
+soit déjà au format de l'éditeur (clés personal/experience/education/
+skills/languages). Les fichiers sont lus en flux: la mémoire utilisée ne
+dépend que de la taille des lots, pas du nombre de CVs.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from cv_db import ConnectionManager, wal_enabled
+from cv_model import CVModel, InvalidCV
+from cv_services import CVService
+
+
+# Hash qui ne correspond à aucun mot de passe: le compte importé doit être réactivé
+IMPORTED_PASSWORD_HASH = "!imported"
+
+TEMPLATES = ("classic", "modern", "creative", "professional")
+JSON_EXTENSIONS = (".json", ".jsonl", ".ndjson")
+
+
+class InvalidRecord(ValueError):
+    """Record invalide (message destiné au rapport d'erreurs)"""
+
+
+# -----------------------
+# Lecture en flux
+# -----------------------
+def iter_json_values(f, chunk_size=1 << 16):
+    """Itère sur les valeurs d'un fichier JSON sans le charger entièrement.
+
+    Un tableau au premier niveau est parcouru élément par élément; sinon
+    le fichier peut contenir un ou plusieurs documents consécutifs.
+    """
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    eof = False
+    in_array = None
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    while True:
+        while pos < len(buf) and (buf[pos].isspace() or (in_array and buf[pos] == ',')):
+            pos += 1
+        if pos >= len(buf):
+            if eof:
+                if in_array:
+                    raise ValueError("tableau JSON non terminé")
+                return
+            fill()
+            continue
+        if in_array is None:
+            in_array = buf[pos] == '['
+            if in_array:
+                pos += 1
+                continue
+        if in_array and buf[pos] == ']':
+            return
+        try:
+            value, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            fill()
+            continue
+        # Une valeur qui touche la fin du tampon peut être tronquée (nombre...)
+        if end >= len(buf) and not eof:
+            fill()
+            continue
+        pos = end
+        yield value
+
+
+def iter_documents(path):
+    """Itère sur (position, document ou exception) pour un fichier.
+
+    En JSONL, une ligne invalide est signalée et la lecture continue; dans
+    un fichier JSON, une erreur de syntaxe interrompt le fichier.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith(('.jsonl', '.ndjson')):
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield f"{path}:{line_no}", json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield f"{path}:{line_no}", InvalidRecord(f"JSON invalide: {e}")
+        else:
+            index = 0
+            try:
+                for doc in iter_json_values(f):
+                    yield f"{path}#{index}", doc
+                    index += 1
+            except ValueError as e:
+                yield f"{path}#{index}", InvalidRecord(f"JSON invalide: {e}")
+
+
+def iter_sources(paths):
+    """Développe les dossiers en fichiers JSON/JSONL (ordre alphabétique)"""
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(JSON_EXTENSIONS):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+# -----------------------
+# Conversion vers le format de l'éditeur
+# -----------------------
+def _text(value):
+    return value.strip() if isinstance(value, str) else ('' if value is None else str(value))
+
+
+def _month_year(date):
+    """'2019-03-01' / '2019-03' -> '03/2019', '2019' -> '2019'"""
+    date = _text(date)
+    parts = date.split('-')
+    if len(parts) >= 2 and parts[0].isdigit() and parts[1].isdigit():
+        return f"{int(parts[1]):02d}/{parts[0]}"
+    return date
+
+
+def _year(date):
+    date = _text(date)
+    return date[:4] if date[:4].isdigit() else date
+
+
+def _list(doc, key):
+    value = doc.get(key) or []
+    if not isinstance(value, list):
+        raise InvalidRecord(f"'{key}' doit être une liste")
+    for item in value:
+        if not isinstance(item, dict):
+            raise InvalidRecord(f"'{key}' doit contenir des objets")
+    return value
+
+
+def _object(doc, key):
+    value = doc.get(key) or {}
+    if not isinstance(value, dict):
+        raise InvalidRecord(f"'{key}' doit être un objet")
+    return value
+
+
+def _description(entry):
+    lines = [_text(entry.get('summary') or entry.get('description'))]
+    lines += [f"- {_text(h)}" for h in entry.get('highlights') or []]
+    return "\n".join(line for line in lines if line)
+
+
+def from_json_resume(doc):
+    """Convertit un document JSON Resume en données de CV"""
+    basics = _object(doc, 'basics')
+    first_name, _, last_name = _text(basics.get('name')).partition(' ')
+
+    location = _object(basics, 'location')
+    address = ", ".join(_text(location.get(k)) for k in ('address', 'postalCode', 'city', 'countryCode')
+                        if _text(location.get(k)))
+    linkedin = ''
+    for profile in _list(basics, 'profiles'):
+        if _text(profile.get('network')).lower() == 'linkedin':
+            linkedin = _text(profile.get('url')) or f"https://www.linkedin.com/in/{_text(profile.get('username'))}"
+            break
+
+    experience = []
+    for work in _list(doc, 'work'):
+        end_date = _month_year(work.get('endDate'))
+        experience.append({
+            "position": _text(work.get('position')),
+            "company": _text(work.get('name') or work.get('company')),
+            "location": _text(work.get('location')),
+            "start_date": _month_year(work.get('startDate')),
+            "end_date": end_date,
+            "current": not end_date,
+            "description": _description(work),
+        })
+
+    education = []
+    for ed in _list(doc, 'education'):
+        degree = " ".join(_text(ed.get(k)) for k in ('studyType', 'area') if _text(ed.get(k)))
+        education.append({
+            "degree": degree,
+            "school": _text(ed.get('institution')),
+            "location": _text(ed.get('location')),
+            "start_year": _year(ed.get('startDate')),
+            "end_year": _year(ed.get('endDate')),
+            "description": _description(ed),
+        })
+
+    skills = []
+    for skill in _list(doc, 'skills'):
+        if _text(skill.get('name')):
+            skills.append(_text(skill.get('name')))
+        skills.extend(_text(k) for k in skill.get('keywords') or [] if _text(k))
+
+    languages = [{"name": _text(l.get('language')), "level": _text(l.get('fluency'))}
+                 for l in _list(doc, 'languages') if _text(l.get('language'))]
+
+    return {
+        "personal": {
+            "first_name": first_name,
+            "last_name": last_name,
+            "title": _text(basics.get('label')),
+            "email": _text(basics.get('email')),
+            "phone": _text(basics.get('phone')),
+            "address": address,
+            "linkedin": linkedin,
+            "website": _text(basics.get('url') or basics.get('website')),
+            "description": _text(basics.get('summary')),
+        },
+        "experience": experience,
+        "education": education,
+        "skills": list(dict.fromkeys(skills)),
+        "languages": languages,
+    }
+
+
+def from_native(doc):
+    """Vérifie un document déjà au format de l'éditeur"""
+    if not isinstance(doc.get('personal'), dict):
+        raise InvalidRecord("'personal' doit être un objet")
+    data = {"personal": {k: _text(v) for k, v in doc['personal'].items()}}
+    for key in ('experience', 'education', 'languages'):
+        data[key] = _list(doc, key)
+    skills = doc.get('skills') or []
+    if not isinstance(skills, list):
+        raise InvalidRecord("'skills' doit être une liste")
+    data['skills'] = [s if isinstance(s, str) else _text(s.get('name')) if isinstance(s, dict) else _text(s)
+                      for s in skills]
+    return data
+
+
+def to_record(doc):
+    """Valide un document et retourne le record à insérer (voir CVService.import_cvs)"""
+    if not isinstance(doc, dict):
+        raise InvalidRecord("le document doit être un objet JSON")
+    data = from_native(doc) if 'personal' in doc else from_json_resume(doc)
+    # mêmes règles qu'à l'ouverture du CV dans l'éditeur
+    try:
+        CVModel.from_dict(data)
+    except InvalidCV as e:
+        raise InvalidRecord(str(e))
+    personal = data['personal']
+
+    email = personal.get('email', '')
+    if not email or '@' not in email or ' ' in email:
+        raise InvalidRecord(f"email manquant ou invalide: {email!r}")
+    if not personal.get('first_name') and not personal.get('last_name'):
+        raise InvalidRecord("nom manquant")
+
+    template = _text(doc.get('template')) or 'classic'
+    if template not in TEMPLATES:
+        raise InvalidRecord(f"template inconnu: {template!r}")
+    title = _text(doc.get('title')) or f"CV {personal.get('title') or 'importé'}"
+    return {
+        'email': email,
+        'first_name': personal.get('first_name', ''),
+        'last_name': personal.get('last_name', ''),
+        'title': title,
+        'template': template,
+        'data': data,
+    }
+
+
+# -----------------------
+# Import
+# -----------------------
+class ImportReport:
+    """Compteurs d'un import et débit (records/s)"""
+
+    def __init__(self):
+        self.records = 0
+        self.imported = 0
+        self.users_created = 0
+        self.skipped = 0
+        self.errors = 0
+        self.first_errors = []  # premières erreurs, pour l'affichage
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def error(self, where, message, keep=20):
+        self.errors += 1
+        if len(self.first_errors) < keep:
+            self.first_errors.append({'record': where, 'error': message})
+
+    def rows_per_sec(self):
+        return self.imported / self.elapsed if self.elapsed else 0.0
+
+    def to_dict(self):
+        return {
+            'records': self.records,
+            'imported': self.imported,
+            'users_created': self.users_created,
+            'skipped_existing_users': self.skipped,
+            'errors': self.errors,
+            'seconds': round(self.elapsed, 3),
+            'rows_per_sec': round(self.rows_per_sec(), 1),
+            'first_errors': self.first_errors,
+        }
+
+
+def import_files(service, paths, batch_size=1000, attach_existing=True,
+                 password_hash=IMPORTED_PASSWORD_HASH, errors_file=None, progress=None):
+    """Importe les CVs des fichiers/dossiers donnés; retourne un ImportReport.
+
+    Les records valides sont écrits par lots de batch_size (une transaction
+    par lot). Chaque erreur de validation est écrite dans errors_file
+    (JSONL, une ligne par record rejeté) si fourni.
+    """
+    report = ImportReport()
+    batch = []
+
+    def flush():
+        users, cvs, skipped = service.import_cvs(batch, password_hash, attach_existing)
+        report.users_created += users
+        report.imported += cvs
+        report.skipped += skipped
+        batch.clear()
+        report.elapsed = time.perf_counter() - report.started
+        if progress is not None:
+            progress(report)
+
+    for path in iter_sources(paths):
+        for where, doc in iter_documents(path):
+            report.records += 1
+            try:
+                if isinstance(doc, Exception):
+                    raise doc
+                batch.append(to_record(doc))
+            except InvalidRecord as e:
+                report.error(where, str(e))
+                if errors_file is not None:
+                    errors_file.write(json.dumps({'record': where, 'error': str(e)}, ensure_ascii=False) + "\n")
+                continue
+            if len(batch) >= batch_size:
+                flush()
+    if batch:
+        flush()
+    report.elapsed = time.perf_counter() - report.started
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importe des CVs JSON Resume / JSONL dans la base")
+    parser.add_argument("paths", nargs="+", help="fichiers .json/.jsonl ou dossiers")
+    parser.add_argument("--db", default="cv_platform.db", help="fichier SQLite cible")
+    parser.add_argument("--batch-size", type=int, default=1000, help="records par transaction")
+    parser.add_argument("--errors", help="fichier JSONL des records rejetés")
+    parser.add_argument("--skip-existing", action="store_true",
+                        help="ignore les records dont l'email correspond à un compte existant")
+    parser.add_argument("--no-wal", action="store_true", help="journal classique (base sur un partage réseau)")
+    args = parser.parse_args()
+
+    db = ConnectionManager(args.db, wal=not args.no_wal and wal_enabled())
+    service = CVService(db)
+    service.init_schema()
+
+    def progress(report):
+        print(f"{report.imported} CVs importés ({report.rows_per_sec():.0f}/s), {report.errors} erreurs",
+              file=sys.stderr)
+
+    errors_file = open(args.errors, 'w', encoding='utf-8') if args.errors else None
+    try:
+        report = import_files(service, args.paths, args.batch_size, not args.skip_existing,
+                              errors_file=errors_file, progress=progress)
+    finally:
+        if errors_file is not None:
+            errors_file.close()
+        db.close()
+    print(json.dumps(report.to_dict(), ensure_ascii=False, indent=2))
+    return 1 if report.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
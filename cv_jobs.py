@@ -0,0 +1,589 @@
+"""File de tâches durable (table jobs de cv_platform.db) et workers.
+
+Une tâche est un type (kind), un payload JSON et une priorité. Un worker
+la réclame par un seul UPDATE ... RETURNING: la ligne passe à l'état
+running avec un bail (available_at = fin du bail) et attempts augmente.
+attempts sert de jeton: terminer ou prolonger une tâche n'est accepté que
+si le jeton est toujours le bon, de sorte qu'un worker dont le bail a
+expiré (planté, déconnecté) ne peut plus écraser le travail d'un autre.
+Une tâche au bail expiré redevient réclamable. En cas d'échec, la tâche
+est reprogrammée avec un délai exponentiel (avec gigue) jusqu'à
+max_attempts, puis passe à l'état failed.
+
+Une tâche dont le résultat est un fichier local (export vers un chemin
+choisi dans l'interface, miniature) est réservée à un worker (owner):
+seul le worker de ce nom peut la réclamer. Les tâches terminées depuis
+plus d'une semaine, et les tâches réservées jamais réclamées (processus
+disparu), sont supprimées périodiquement par les workers.
+
+Plusieurs processus, éventuellement sur plusieurs machines, peuvent vider
+la même file. Le mode WAL a besoin de mémoire partagée: sur un partage
+réseau, il faut lancer les workers et l'application sans WAL (CV_DB_WAL=0,
+ou --no-wal pour les commandes de ce module).
+
+    python cv_jobs.py worker --db cv_platform.db --processes 4 [--no-wal]
+    python cv_jobs.py enqueue --db cv_platform.db rebuild_cv_index
+    python cv_jobs.py enqueue --db cv_platform.db import_files '{"paths": ["cvs.jsonl"]}'
+    python cv_jobs.py stats --db cv_platform.db
+    python cv_jobs.py bench --jobs 5000 --workers 1 2 4 8
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+from cv_db import ConnectionManager, wal_enabled
+from cv_metrics import LatencyHistogram
+
+DEFAULT_LEASE_S = 60.0
+MAX_ATTEMPTS = 5
+BACKOFF_BASE_S = 2.0
+BACKOFF_MAX_S = 600.0
+PURGE_INTERVAL_S = 3600.0
+
+# Tâches exécutées par les workers: kind -> fonction(contexte, payload) -> résultat JSON
+HANDLERS = {}
+
+
+class JobFailed(Exception):
+    """Échec définitif: la tâche n'est pas réessayée"""
+
+
+def handler(kind):
+    """Décorateur: enregistre une fonction comme exécutant des tâches kind"""
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+def backoff_delay(attempts, base=BACKOFF_BASE_S, cap=BACKOFF_MAX_S, rng=random):
+    """Délai avant le prochain essai: exponentiel, borné, avec gigue (50 à 100 %)"""
+    delay = min(cap, base * 2 ** (attempts - 1))
+    return delay * (0.5 + rng.random() / 2)
+
+
+def default_worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class Job:
+    """Tâche réclamée par un worker (attempts = jeton du bail)"""
+    __slots__ = ('id', 'kind', 'payload', 'attempts', 'max_attempts')
+
+    def __init__(self, job_id, kind, payload, attempts, max_attempts):
+        self.id = job_id
+        self.kind = kind
+        self.payload = payload
+        self.attempts = attempts
+        self.max_attempts = max_attempts
+
+    def __repr__(self):
+        return f"Job({self.id}, {self.kind!r}, essai {self.attempts}/{self.max_attempts})"
+
+
+# -----------------------
+# File
+# -----------------------
+class JobQueue:
+    """Opérations sur la table jobs (créée par CVService.init_schema)"""
+
+    def __init__(self, db, clock=time.time):
+        self.db = db
+        self.clock = clock
+
+    def enqueue(self, kind, payload=None, priority=0, delay=0.0, max_attempts=MAX_ATTEMPTS, owner=None):
+        """Ajoute une tâche; retourne son ID. Les priorités hautes passent en premier.
+
+        owner: nom du seul worker autorisé à la réclamer (None: n'importe lequel)
+        """
+        return self.enqueue_many(kind, [payload], priority, delay, max_attempts, owner)[0]
+
+    def enqueue_many(self, kind, payloads, priority=0, delay=0.0, max_attempts=MAX_ATTEMPTS, owner=None):
+        """Ajoute plusieurs tâches en une transaction; retourne leurs IDs"""
+        now = self.clock()
+        rows = [(kind, json.dumps(payload if payload is not None else {}, ensure_ascii=False),
+                 priority, max_attempts, now + delay, now, owner) for payload in payloads]
+        with self.db.write() as cursor:
+            cursor.executemany('''
+                INSERT INTO jobs (kind, payload, priority, max_attempts, available_at, enqueued_at, owner)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            # ids consécutifs: insertion dans une seule transaction d'écriture
+            cursor.execute('SELECT last_insert_rowid()')
+            last_id = cursor.fetchone()[0]
+        return list(range(last_id - len(rows) + 1, last_id + 1))
+
+    def claim(self, worker, lease_s=DEFAULT_LEASE_S):
+        """Réclame la tâche prête la plus prioritaire; retourne un Job ou None"""
+        while True:
+            now = self.clock()
+            with self.db.write() as cursor:
+                cursor.execute('''
+                    UPDATE jobs
+                    SET state = 'running', attempts = attempts + 1, worker = ?,
+                        available_at = ?, started_at = ?
+                    WHERE id = (
+                        SELECT id FROM jobs
+                        WHERE state IN ('queued', 'running') AND available_at <= ?
+                          AND (owner IS NULL OR owner = ?)
+                        ORDER BY priority DESC, available_at, id
+                        LIMIT 1
+                    )
+                    RETURNING id, kind, payload, attempts, max_attempts
+                ''', (worker, now + lease_s, now, now, worker))
+                row = cursor.fetchone()
+                if row is None:
+                    return None
+                job_id, kind, payload, attempts, max_attempts = row
+                if attempts <= max_attempts:
+                    return Job(job_id, kind, json.loads(payload), attempts, max_attempts)
+                # bail expiré au dernier essai (worker disparu): abandon
+                cursor.execute('''
+                    UPDATE jobs SET state = 'failed', finished_at = ?, last_error = ?
+                    WHERE id = ?
+                ''', (now, "bail expiré au dernier essai", job_id))
+
+    def heartbeat(self, job, lease_s=DEFAULT_LEASE_S):
+        """Prolonge le bail; False si la tâche a été reprise par un autre worker"""
+        with self.db.write() as cursor:
+            cursor.execute('''
+                UPDATE jobs SET available_at = ?
+                WHERE id = ? AND state = 'running' AND attempts = ?
+            ''', (self.clock() + lease_s, job.id, job.attempts))
+            return cursor.rowcount == 1
+
+    def complete(self, job, result=None):
+        """Marque la tâche terminée; False si le bail n'était plus valide"""
+        with self.db.write() as cursor:
+            cursor.execute('''
+                UPDATE jobs SET state = 'done', finished_at = ?, result = ?
+                WHERE id = ? AND state = 'running' AND attempts = ?
+            ''', (self.clock(), json.dumps(result, ensure_ascii=False, default=str), job.id, job.attempts))
+            return cursor.rowcount == 1
+
+    def fail(self, job, error, retry=True):
+        """Échec d'un essai: reprogrammée (retourne 'queued') ou abandonnée ('failed').
+
+        Retourne None si le bail n'était plus valide.
+        """
+        now = self.clock()
+        retry = retry and job.attempts < job.max_attempts
+        with self.db.write() as cursor:
+            if retry:
+                cursor.execute('''
+                    UPDATE jobs SET state = 'queued', available_at = ?, last_error = ?
+                    WHERE id = ? AND state = 'running' AND attempts = ?
+                ''', (now + backoff_delay(job.attempts), error, job.id, job.attempts))
+            else:
+                cursor.execute('''
+                    UPDATE jobs SET state = 'failed', finished_at = ?, last_error = ?
+                    WHERE id = ? AND state = 'running' AND attempts = ?
+                ''', (now, error, job.id, job.attempts))
+            if cursor.rowcount != 1:
+                return None
+        return 'queued' if retry else 'failed'
+
+    def get(self, job_id):
+        """État d'une tâche (dict), ou None"""
+        with self.db.read() as cursor:
+            cursor.execute('''
+                SELECT id, kind, state, priority, attempts, max_attempts, worker,
+                       enqueued_at, started_at, finished_at, result, last_error
+                FROM jobs WHERE id = ?
+            ''', (job_id,))
+            row = cursor.fetchone()
+        if not row:
+            return None
+        keys = ('id', 'kind', 'state', 'priority', 'attempts', 'max_attempts', 'worker',
+                'enqueued_at', 'started_at', 'finished_at', 'result', 'last_error')
+        job = dict(zip(keys, row))
+        if job['result'] is not None:
+            job['result'] = json.loads(job['result'])
+        return job
+
+    def wait(self, job_id, timeout=60.0, poll=0.05):
+        """Attend qu'une tâche soit terminée (done/failed) ou timeout; retourne son état"""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job['state'] in ('done', 'failed') or time.monotonic() >= deadline:
+                return job
+            time.sleep(poll)
+            poll = min(poll * 2, 1.0)
+
+    def stats(self, window_s=300.0):
+        """Tâches par état, débit et latences (attente, exécution) sur la fenêtre récente"""
+        since = self.clock() - window_s
+        with self.db.read() as cursor:
+            cursor.execute('SELECT state, COUNT(*) FROM jobs GROUP BY state')
+            counts = dict(cursor.fetchall())
+            cursor.execute('''
+                SELECT enqueued_at, started_at, finished_at FROM jobs
+                WHERE state = 'done' AND finished_at >= ?
+            ''', (since,))
+            rows = cursor.fetchall()
+        wait = LatencyHistogram()
+        run = LatencyHistogram()
+        total = LatencyHistogram()
+        for enqueued, started, finished in rows:
+            wait.observe((started - enqueued) * 1000)
+            run.observe((finished - started) * 1000)
+            total.observe((finished - enqueued) * 1000)
+        span = (max(r[2] for r in rows) - min(r[1] for r in rows)) if rows else 0.0
+        return {
+            'counts': {state: counts.get(state, 0) for state in ('queued', 'running', 'done', 'failed')},
+            'window_s': window_s,
+            'done_in_window': len(rows),
+            'jobs_per_sec': round(len(rows) / span, 1) if span > 0 else None,
+            'wait': wait.summary(),
+            'run': run.summary(),
+            'end_to_end': total.summary(),
+        }
+
+    def purge(self, older_than_s=7 * 86400):
+        """Supprime les tâches terminées depuis plus de older_than_s, et les
+        tâches réservées encore en file depuis aussi longtemps (leur worker a
+        disparu: le nom contient le PID). Retourne leur nombre.
+        """
+        cutoff = self.clock() - older_than_s
+        with self.db.write() as cursor:
+            cursor.execute("DELETE FROM jobs WHERE state IN ('done', 'failed') AND finished_at < ?", (cutoff,))
+            purged = cursor.rowcount
+            cursor.execute('''
+                DELETE FROM jobs
+                WHERE state IN ('queued', 'running') AND owner IS NOT NULL AND enqueued_at < ?
+            ''', (cutoff,))
+            return purged + cursor.rowcount
+
+
+# -----------------------
+# Worker
+# -----------------------
+class JobContext:
+    """Ce dont disposent les fonctions de tâches (base, service)"""
+
+    def __init__(self, db, service):
+        self.db = db
+        self.service = service
+
+
+class Worker:
+    """Boucle réclamer / exécuter / terminer, dans un thread ou un processus.
+
+    Un thread de battement prolonge le bail des tâches longues. Sans tâche
+    prête, le worker attend de plus en plus longtemps (jusqu'à idle_max_s)
+    ou jusqu'à wake(). Au démarrage puis toutes les PURGE_INTERVAL_S, il
+    purge les anciennes tâches.
+    """
+
+    def __init__(self, queue, context, name=None, lease_s=DEFAULT_LEASE_S, idle_max_s=1.0, handlers=None):
+        self.queue = queue
+        self.context = context
+        self.name = name or default_worker_name()
+        self.lease_s = lease_s
+        self.idle_max_s = idle_max_s
+        self.handlers = HANDLERS if handlers is None else handlers
+        self.processed = 0
+        self.failed = 0
+        self.claim_latency = LatencyHistogram()
+        self.run_latency = LatencyHistogram()
+        self._current = None
+        self._next_purge = 0.0
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._heartbeat = None
+
+    def run_one(self):
+        """Exécute une tâche prête; False si aucune"""
+        start = time.perf_counter()
+        job = self.queue.claim(self.name, self.lease_s)
+        self.claim_latency.observe((time.perf_counter() - start) * 1000)
+        if job is None:
+            return False
+        self._current = (job, time.monotonic())
+        start = time.perf_counter()
+        try:
+            fn = self.handlers.get(job.kind)
+            if fn is None:
+                raise JobFailed(f"type de tâche inconnu: {job.kind}")
+            result = fn(self.context, job.payload)
+        except Exception as e:
+            self._current = None
+            self.failed += 1
+            self.queue.fail(job, f"{type(e).__name__}: {e}", retry=not isinstance(e, JobFailed))
+        else:
+            self._current = None
+            if self.queue.complete(job, result):
+                self.processed += 1
+            else:
+                print(f"[DEBUG] Tâche {job.id}: bail perdu, résultat ignoré")
+        self.run_latency.observe((time.perf_counter() - start) * 1000)
+        return True
+
+    def run(self, stop_when_empty=False):
+        """Traite les tâches jusqu'à stop() (ou file vide si stop_when_empty)"""
+        self._start_heartbeat()
+        idle = 0.01
+        while not self._stop.is_set():
+            if time.monotonic() >= self._next_purge:
+                self._next_purge = time.monotonic() + PURGE_INTERVAL_S
+                try:
+                    self.queue.purge()
+                except Exception as e:
+                    print(f"[DEBUG] Worker {self.name}: purge: {e}")
+            try:
+                ran = self.run_one()
+            except Exception as e:  # base verrouillée trop longtemps, disque plein...
+                print(f"[DEBUG] Worker {self.name}: {e}")
+                ran = False
+            if ran:
+                idle = 0.01
+                continue
+            if stop_when_empty:
+                break
+            self._wakeup.wait(idle)
+            self._wakeup.clear()
+            idle = min(idle * 2, self.idle_max_s)
+
+    def _start_heartbeat(self):
+        if self._heartbeat is not None:
+            return
+
+        def beat():
+            interval = self.lease_s / 3
+            while not self._stop.wait(interval):
+                current = self._current
+                if current is not None and time.monotonic() - current[1] >= interval:
+                    try:
+                        self.queue.heartbeat(current[0], self.lease_s)
+                    except Exception as e:
+                        print(f"[DEBUG] Prolongation du bail impossible: {e}")
+
+        self._heartbeat = threading.Thread(target=beat, name="cv-jobs-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def wake(self):
+        """Une tâche vient d'être ajoutée: ne pas attendre la fin de la pause"""
+        self._wakeup.set()
+
+    def start_thread(self):
+        self._thread = threading.Thread(target=self.run, name="cv-jobs-worker", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout=2.0):
+        """Arrête la boucle; une tâche en cours sera reprise à l'expiration de son bail"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def metrics(self):
+        return {'worker': self.name, 'processed': self.processed, 'failed': self.failed,
+                'claim': self.claim_latency.summary(), 'run': self.run_latency.summary()}
+
+
+# -----------------------
+# Tâches
+# -----------------------
+@handler('noop')
+def run_noop(ctx, payload):
+    """Tâche vide (benchmark); sleep_ms simule du travail"""
+    if payload.get('sleep_ms'):
+        time.sleep(payload['sleep_ms'] / 1000)
+    return payload.get('value')
+
+
+@handler('export_pdf')
+def run_export_pdf(ctx, payload):
+    cv = ctx.service.get_cv(payload['cv_id'])
+    if cv is None:
+        raise JobFailed(f"CV {payload['cv_id']} introuvable")
+    ctx.service.build_pdf(cv['data'], cv['template'], cv['photo_path']).output(payload['path'])
+    return {'path': payload['path']}
+
+
+@handler('export_text')
+def run_export_text(ctx, payload):
+    cv = ctx.service.get_cv(payload['cv_id'])
+    if cv is None:
+        raise JobFailed(f"CV {payload['cv_id']} introuvable")
+    with open(payload['path'], 'w', encoding='utf-8') as f:
+        f.write(ctx.service.build_text(cv['data']))
+    return {'path': payload['path']}
+
+
+@handler('import_files')
+def run_import_files(ctx, payload):
+    from cv_import import import_files
+    return import_files(ctx.service, payload['paths'], payload.get('batch_size', 1000),
+                        payload.get('attach_existing', True)).to_dict()
+
+
+@handler('export_database')
+def run_export_database(ctx, payload):
+    from cv_export import export_database
+    return export_database(ctx.db, payload.get('out_dir', 'etl'), payload.get('tables'),
+                           payload.get('format', 'jsonl'), payload.get('gzip', False),
+                           payload.get('state'), codec=ctx.service.codec)
+
+
+@handler('export_site')
+def run_export_site(ctx, payload):
+    from cv_static import build_site
+    return build_site(ctx.db.db_file, payload.get('out_dir', 'site'), payload.get('processes', 1),
+                      payload.get('full', False), wal=ctx.db.wal)
+
+
+@handler('thumbnail')
+def run_thumbnail(ctx, payload):
+    from cv_thumbnails import THUMBNAIL_DIR, ensure_thumbnail
+    result = ensure_thumbnail(ctx.service, payload['cv_id'], payload.get('dir', THUMBNAIL_DIR))
+    if result is None:
+        raise JobFailed(f"CV {payload['cv_id']} introuvable")
+    return result
+
+
+@handler('rebuild_cv_index')
+def run_rebuild_cv_index(ctx, payload):
+    return {'cvs': ctx.service.rebuild_cv_index()}
+
+
+# -----------------------
+# Processus workers
+# -----------------------
+def open_database(db_file, wal=None):
+    """Connexions + service pour un processus worker (schéma vérifié).
+    wal: None pour suivre CV_DB_WAL"""
+    from cv_services import CVService
+
+    db = ConnectionManager(db_file, wal=wal_enabled() if wal is None else wal)
+    service = CVService(db)
+    service.init_schema()
+    return db, service
+
+
+def worker_process(db_file, wal, name, stop_when_empty, results=None):
+    """Point d'entrée d'un processus worker (multiprocessing)"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # arrêt piloté par le parent (SIGTERM)
+    db, service = open_database(db_file, wal)
+    worker = Worker(JobQueue(db), JobContext(db, service), name=name)
+    signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop(timeout=0))
+    try:
+        worker.run(stop_when_empty=stop_when_empty)
+    finally:
+        db.close()
+        if results is not None:
+            results.put(worker.metrics())
+
+
+def run_workers(db_file, processes, wal=True, stop_when_empty=False):
+    """Lance processes workers et attend leur fin; retourne leurs métriques"""
+    results = multiprocessing.Queue()
+    host = socket.gethostname()
+    workers = [multiprocessing.Process(target=worker_process,
+                                       args=(db_file, wal, f"{host}:w{i}", stop_when_empty, results))
+               for i in range(processes)]
+    for p in workers:
+        p.start()
+    metrics = []
+    try:
+        while len(metrics) < len(workers):
+            metrics.append(results.get())
+    except KeyboardInterrupt:
+        for p in workers:
+            p.terminate()
+        while len(metrics) < len(workers):
+            metrics.append(results.get())
+    for p in workers:
+        p.join()
+    return metrics
+
+
+def bench(jobs, worker_counts, wal=True, sleep_ms=0.0):
+    """Débit (tâches/s) et latences pour chaque nombre de workers, sur une base temporaire"""
+    results = []
+    for count in worker_counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_file = os.path.join(tmp, "jobs.db")
+            db, _ = open_database(db_file, wal)
+            queue = JobQueue(db)
+            queue.enqueue_many('noop', [{'value': i, 'sleep_ms': sleep_ms} for i in range(jobs)])
+            start = time.perf_counter()
+            metrics = run_workers(db_file, count, wal, stop_when_empty=True)
+            elapsed = time.perf_counter() - start
+            stats = queue.stats(window_s=3600)
+            db.close()
+        results.append({
+            'workers': count,
+            'jobs': jobs,
+            'done': stats['counts']['done'],
+            'seconds': round(elapsed, 2),
+            'jobs_per_sec': round(stats['counts']['done'] / elapsed, 1),
+            'end_to_end_p50_ms': stats['end_to_end']['p50_ms'],
+            'run_p99_ms': stats['run']['p99_ms'],
+            'claim_p50_ms': round(sorted(m['claim']['p50_ms'] for m in metrics)[len(metrics) // 2], 3),
+            'claim_p99_ms': round(max(m['claim']['p99_ms'] for m in metrics), 3),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="File de tâches de la plateforme CV")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("worker", help="lance des processus workers")
+    p.add_argument("--db", default="cv_platform.db")
+    p.add_argument("--processes", type=int, default=os.cpu_count() or 2)
+    p.add_argument("--no-wal", action="store_true", help="journal classique (base sur un partage réseau)")
+    p.add_argument("--exit-when-empty", action="store_true")
+
+    p = sub.add_parser("enqueue", help="ajoute une tâche")
+    p.add_argument("kind", choices=sorted(HANDLERS))
+    p.add_argument("payload", nargs="?", default="{}", help="payload JSON")
+    p.add_argument("--db", default="cv_platform.db")
+    p.add_argument("--priority", type=int, default=0)
+    p.add_argument("--no-wal", action="store_true")
+
+    p = sub.add_parser("stats", help="état de la file et latences récentes")
+    p.add_argument("--db", default="cv_platform.db")
+    p.add_argument("--window", type=float, default=300.0)
+    p.add_argument("--no-wal", action="store_true")
+
+    p = sub.add_parser("bench", help="débit avec 1..N workers (base temporaire)")
+    p.add_argument("--jobs", type=int, default=5000)
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    p.add_argument("--sleep-ms", type=float, default=0.0, help="travail simulé par tâche")
+    p.add_argument("--no-wal", action="store_true")
+    args = parser.parse_args()
+
+    wal = not args.no_wal and wal_enabled()
+    if args.command == "worker":
+        metrics = run_workers(args.db, args.processes, wal, args.exit_when_empty)
+        print(json.dumps(metrics, indent=2))
+    elif args.command == "bench":
+        print(json.dumps({'wal': wal, 'results': bench(args.jobs, args.workers, wal, args.sleep_ms)}, indent=2))
+    else:
+        db, _ = open_database(args.db, wal)
+        try:
+            queue = JobQueue(db)
+            if args.command == "enqueue":
+                result = {'job_id': queue.enqueue(args.kind, json.loads(args.payload), args.priority)}
+            else:
+                result = queue.stats(args.window)
+        finally:
+            db.close()
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
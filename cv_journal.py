@@ -0,0 +1,182 @@
+"""Journal local des modifications du CV ouvert (write-ahead).
+
+Entre deux sauvegardes (save_cv / autosave), chaque modification est
+ajoutée au fichier sous forme d'une ligne JSON:
+
+    {"cv": 12, "base": 7}     en-tête (base: cvs.version)
+    {"op": "set", "field": "title", "value": "Ingénieur"}
+    {"op": "insert", "section": "experience", "index": 0, "value": {...}}
+    {"op": "replace", "section": "languages", "index": 1, "value": {...}}
+    {"op": "delete", "section": "education", "index": 2}
+    {"op": "load", "section": "languages", "value": [...]}     (annuler/rétablir)
+
+L'écriture va au système (survit à un plantage du processus); fsync est
+regroupé toutes les sync_interval secondes par un thread. Après une
+sauvegarde réussie, le journal est remis à zéro; après une écriture qui
+ne reprend pas les modifications en cours (photo), seule sa base change.
+Au démarrage, un
+journal non vide est rejoué sur la version du CV en base (base).
+"""
+import json
+import os
+import threading
+
+JOURNAL_FILE = "edits.journal"
+
+SECTIONS = ('experience', 'education', 'languages')
+
+
+class JournalError(ValueError):
+    """Opération inconnue ou invalide"""
+
+
+def apply_op(data, op):
+    """Applique une opération du journal à un document CV (modifié sur place)"""
+    kind = op.get('op')
+    if kind == 'set':
+        data.setdefault('personal', {})[op['field']] = op['value']
+        return data
+    section = op.get('section')
+    if section not in SECTIONS:
+        raise JournalError(f"section inconnue: {section}")
+    items = data.setdefault(section, [])
+    if kind == 'insert':
+        items.insert(op['index'], op['value'])
+    elif kind == 'replace':
+        items[op['index']] = op['value']
+    elif kind == 'delete':
+        del items[op['index']]
+    elif kind == 'load':
+        items[:] = op['value']
+    else:
+        raise JournalError(f"opération inconnue: {kind}")
+    return data
+
+
+def read_journal(path=JOURNAL_FILE):
+    """Retourne (en-tête, opérations) ou (None, []) si le journal est absent/vide.
+
+    Une dernière ligne tronquée (plantage pendant l'écriture) est ignorée.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.read().split('\n')
+    except OSError:
+        return None, []
+    records = []
+    for line in lines:
+        if not line:
+            continue
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            break
+    if not records or 'cv' not in records[0]:
+        return None, []
+    return records[0], records[1:]
+
+
+class EditJournal:
+    """Journal en ajout seul du CV ouvert, fsync regroupé"""
+
+    def __init__(self, path=JOURNAL_FILE, sync_interval=0.5):
+        self.path = path
+        self.sync_interval = sync_interval
+        self.header = None
+        self.appended = 0
+        self.syncs = 0
+        self._file = None
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="cv-edit-journal", daemon=True)
+        self._thread.start()
+
+    def begin(self, cv_id, base):
+        """Repart d'un journal vide pour le CV cv_id dans sa version base (cvs.version)"""
+        with self._lock:
+            self._close_file()
+            self.header = {'cv': cv_id, 'base': base}
+            self._file = open(self.path, 'w', encoding='utf-8')
+            self._write(self.header)
+
+    def append(self, op):
+        """Ajoute une opération; sans effet si aucun CV n'est ouvert (begin)"""
+        with self._lock:
+            if self._file is None:
+                return
+            self._write(op)
+            self.appended += 1
+
+    def reset(self, base=None):
+        """Après une sauvegarde réussie: vide le journal (nouvelle version base)"""
+        if self.header is None:
+            return
+        header = self.header
+        self.begin(header['cv'], base if base is not None else header['base'])
+
+    def rebase(self, base):
+        """Le CV a été enregistré sans les modifications en cours (photo):
+        mêmes opérations, sur la nouvelle version base"""
+        with self._lock:
+            if self._file is None:
+                return
+            _, ops = read_journal(self.path)
+            self._close_file()
+            self.header = dict(self.header, base=base)
+            self._file = open(self.path + ".tmp", 'w', encoding='utf-8')
+            for record in [self.header] + ops:
+                self._write(record)
+            self._close_file()
+            os.replace(self.path + ".tmp", self.path)
+            self._file = open(self.path, 'a', encoding='utf-8')
+
+    def discard(self):
+        """Ferme et supprime le journal (CV fermé ou supprimé)"""
+        with self._lock:
+            self._close_file()
+            self.header = None
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def sync(self):
+        with self._lock:
+            if self._file is not None and self._dirty:
+                os.fsync(self._file.fileno())
+                self._dirty = False
+                self.syncs += 1
+
+    def close(self):
+        """Arrête le thread; le fichier reste sur disque pour la reprise"""
+        self._stopping = True
+        self._wakeup.set()
+        self._thread.join()
+        with self._lock:
+            self._close_file()
+
+    def _write(self, record):
+        # les entrées peuvent être des enregistrements cv_model (to_dict)
+        text = json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=lambda o: o.to_dict())
+        self._file.write(text + '\n')
+        self._file.flush()
+        self._dirty = True
+
+    def _close_file(self):
+        if self._file is not None:
+            if self._dirty:
+                os.fsync(self._file.fileno())
+                self._dirty = False
+            self._file.close()
+            self._file = None
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.sync_interval)
+            if not self._stopping:
+                try:
+                    self.sync()
+                except OSError as e:
+                    print(f"[DEBUG] Journal des modifications: {e}")
@@ -0,0 +1,555 @@
+"""Mise en page des CVs, commune à l'export PDF et à l'aperçu de l'éditeur.
+
+CVLayout.layout() place le contenu d'un CV sur des pages A4 (en mm) selon
+le template choisi (colonnes, bandeau, photo) et retourne un Document:
+une liste d'opérations de dessin (texte, rectangle, trait, image) par page.
+render_pdf() les écrit avec fpdf; CanvasRenderer les dessine sur le
+Canvas de l'aperçu, à l'échelle. Les deux utilisent la même mise en page,
+avec les métriques des polices de base PDF (Helvetica): les coupures de
+lignes et les sauts de page de l'aperçu sont ceux du fichier exporté.
+
+Les largeurs de mots sont gardées en cache (TextMetrics) ainsi que le
+découpage en lignes de chaque paragraphe (CVLayout.wrap): après une
+frappe, seul le paragraphe modifié est redécoupé, le reste de la mise en
+page n'est que du placement. CanvasRenderer ne touche qu'aux éléments du
+Canvas qui ont changé.
+
+    python cv_layout.py --pages 3
+"""
+import argparse
+import os
+import threading
+import time
+from collections import OrderedDict
+
+PAGE_W = 210.0
+PAGE_H = 297.0
+MARGIN = 15.0
+SIDEBAR_W = 65.0
+HEADER_H = 42.0
+PHOTO_SIZE = 30.0
+PT = 25.4 / 72          # mm par point
+ASCENT = 0.9            # position de la ligne de base, en hauteur de police
+LEADING = 1.35
+TEXT_COLOR = '#2c3e50'
+MUTED_COLOR = '#7f8c8d'
+
+TEMPLATES = {
+    'classic': {'accent': '#3498db', 'header': None, 'sidebar': None},
+    'modern': {'accent': '#27ae60', 'header': None, 'sidebar': '#ecf0f1'},
+    'creative': {'accent': '#9b59b6', 'header': '#9b59b6', 'sidebar': None},
+    'professional': {'accent': '#2c3e50', 'header': '#2c3e50', 'sidebar': None},
+}
+
+# Les polices de base PDF sont en Latin-1: même texte pour l'aperçu et le fichier
+_PDF_CHARS = str.maketrans({'—': '-', '–': '-', '’': "'", '‘': "'", '“': '"', '”': '"', '…': '...',
+                            '•': '-', '·': '-', ' ': ' ', '\t': ' '})
+
+
+def pdf_text(text):
+    return str(text or '').translate(_PDF_CHARS).encode('latin-1', 'replace').decode('latin-1')
+
+
+class TextMetrics:
+    """Largeurs de texte en Helvetica (tables de fpdf), mises en cache par mot et par style"""
+
+    MAX_ENTRIES = 50000
+
+    def __init__(self):
+        self._tables = None
+        self._cache = {}
+
+    def _table(self, style):
+        if self._tables is None:
+            try:
+                from fpdf.fonts import fpdf_charwidths
+                self._tables = {s: fpdf_charwidths['helvetica' + s] for s in ('', 'B', 'I', 'BI')}
+            except ImportError:
+                print("[DEBUG] fpdf absent: largeurs de caractères approximatives")
+                self._tables = {}
+        return self._tables.get(style)
+
+    def units(self, text, style=''):
+        """Largeur en millièmes de la taille de police"""
+        key = (style, text)
+        width = self._cache.get(key)
+        if width is None:
+            table = self._table(style)
+            width = sum(table.get(c, 556) for c in text) if table else 556 * len(text)
+            if len(self._cache) >= self.MAX_ENTRIES:
+                self._cache.clear()
+            self._cache[key] = width
+        return width
+
+    def width(self, text, style='', size=10):
+        """Largeur en mm"""
+        return self.units(text, style) * size / 1000 * PT
+
+
+class Document:
+    """Résultat d'une mise en page: nombre de pages et opérations de dessin.
+
+    ops: ('text', page, x, y, texte, style, taille, couleur) (y = haut de la ligne),
+    ('rect', page, x, y, w, h, couleur), ('line', page, x1, y1, x2, y2, couleur, épaisseur),
+    ('image', page, x, y, w, h, chemin). anchors: {(section, index): (page, y)}.
+    """
+    __slots__ = ('pages', 'ops', 'anchors')
+
+    def __init__(self, pages, ops, anchors):
+        self.pages = pages
+        self.ops = ops
+        self.anchors = anchors
+
+
+class _Flow:
+    """Colonne de texte qui se poursuit sur la page suivante"""
+
+    def __init__(self, engine, ops, x, width, y=MARGIN):
+        self.engine = engine
+        self.ops = ops
+        self.x = x
+        self.width = width
+        self.y = y
+        self.page = 0
+
+    def ensure(self, height):
+        if self.y + height > PAGE_H - MARGIN:
+            self.page += 1
+            self.y = MARGIN
+
+    def space(self, height):
+        self.y += height
+
+    def paragraph(self, text, style='', size=10, color=TEXT_COLOR, indent=0.0, width=None):
+        if not text:
+            return
+        line_h = size * PT * LEADING
+        for line in self.engine.wrap(text, style, size, (width or self.width) - indent):
+            self.ensure(line_h)
+            if line:
+                self.ops.append(('text', self.page, self.x + indent, self.y, line, style, size, color))
+            self.y += line_h
+
+    def title(self, text, color):
+        # titre gardé avec le début de la section
+        self.ensure(12 * PT * LEADING + 3 * 10 * PT * LEADING)
+        self.space(2)
+        self.paragraph(text, 'B', 12, color)
+        self.ops.append(('line', self.page, self.x, self.y, self.x + self.width, self.y, color, 0.4))
+        self.space(2)
+
+
+class CVLayout:
+    """Moteur de mise en page (thread-safe: partagé par l'éditeur et les exports)"""
+
+    MAX_WRAPS = 4096
+
+    def __init__(self, metrics=None):
+        self.metrics = metrics or TextMetrics()
+        self._wraps = OrderedDict()
+        self._lock = threading.Lock()
+        self.wrap_hits = 0
+        self.wrap_misses = 0
+
+    # -----------------------
+    # Découpage en lignes
+    # -----------------------
+    def wrap(self, text, style, size, width):
+        """Lignes d'un paragraphe (tuple), mis en cache par (texte, style, taille, largeur)"""
+        key = (text, style, size, width)
+        with self._lock:
+            lines = self._wraps.get(key)
+            if lines is not None:
+                self._wraps.move_to_end(key)
+                self.wrap_hits += 1
+                return lines
+        lines = self._wrap(text, style, width / (size / 1000 * PT))
+        with self._lock:
+            self.wrap_misses += 1
+            self._wraps[key] = lines
+            if len(self._wraps) > self.MAX_WRAPS:
+                self._wraps.popitem(last=False)
+        return lines
+
+    def _wrap(self, text, style, limit):
+        """Coupure gloutonne aux espaces; limit en millièmes de la taille de police"""
+        units = self.metrics.units
+        space = units(' ', style)
+        lines = []
+        for raw in text.split('\n'):
+            line, line_w = [], 0
+            for word in raw.split():
+                w = units(word, style)
+                if line and line_w + space + w <= limit:
+                    line.append(word)
+                    line_w += space + w
+                    continue
+                if line:
+                    lines.append(' '.join(line))
+                while w > limit and len(word) > 1:
+                    # mot plus long que la ligne: coupé au caractère
+                    cut = 1
+                    while cut < len(word) and units(word[:cut + 1], style) <= limit:
+                        cut += 1
+                    lines.append(word[:cut])
+                    word = word[cut:]
+                    w = units(word, style)
+                line, line_w = [word], w
+            lines.append(' '.join(line))
+        return tuple(lines)
+
+    # -----------------------
+    # Mise en page
+    # -----------------------
+    def layout(self, cv_data, template='classic', photo_path=None):
+        """Document d'un CV (dict, CVModel ou sections de l'éditeur)"""
+        style = TEMPLATES.get(template) or TEMPLATES['classic']
+        accent = style['accent']
+        ops = []
+        anchors = {}
+        p = cv_data.get('personal') or {}
+        name = pdf_text(f"{p.get('first_name', '') or ''} {p.get('last_name', '') or ''}".strip())
+        headline = pdf_text(p.get('title'))
+        contact = [pdf_text(p.get(k)) for k in ('email', 'phone', 'address', 'linkedin', 'website') if p.get(k)]
+        photo = photo_path if photo_path and os.path.exists(photo_path) else None
+
+        side = None
+        if style['sidebar']:
+            side = _Flow(self, ops, MARGIN * 0.7, SIDEBAR_W - MARGIN * 1.4)
+            main = _Flow(self, ops, SIDEBAR_W + MARGIN * 0.7, PAGE_W - SIDEBAR_W - MARGIN * 1.7)
+        else:
+            main = _Flow(self, ops, MARGIN, PAGE_W - 2 * MARGIN)
+
+        # En-tête: nom, titre, coordonnées, photo
+        text_w = main.width - (PHOTO_SIZE + 5 if photo and not side else 0)
+        if style['header']:
+            ops.append(('rect', 0, 0, 0, PAGE_W, HEADER_H, style['header']))
+            if photo:
+                ops.append(('image', 0, PAGE_W - MARGIN - PHOTO_SIZE, (HEADER_H - PHOTO_SIZE) / 2,
+                            PHOTO_SIZE, PHOTO_SIZE, photo))
+            main.y = 10
+            main.paragraph(name, 'B', 22, '#ffffff', width=text_w)
+            main.paragraph(headline, '', 13, '#ffffff', width=text_w)
+            main.paragraph(' | '.join(contact), '', 9, '#ffffff', width=text_w)
+            main.y = max(main.y, HEADER_H) + 6
+        elif side:
+            if photo:
+                ops.append(('image', 0, side.x + (side.width - PHOTO_SIZE) / 2, side.y, PHOTO_SIZE, PHOTO_SIZE, photo))
+                side.space(PHOTO_SIZE + 6)
+            main.paragraph(name, 'B', 22, TEXT_COLOR)
+            main.paragraph(headline, '', 13, accent)
+            main.space(4)
+            side.title("Contact", accent)
+            for line in contact:
+                side.paragraph(line, '', 9)
+        else:
+            if photo:
+                ops.append(('image', 0, PAGE_W - MARGIN - PHOTO_SIZE, MARGIN, PHOTO_SIZE, PHOTO_SIZE, photo))
+            main.paragraph(name, 'B', 22, TEXT_COLOR, width=text_w)
+            main.paragraph(headline, '', 13, accent, width=text_w)
+            main.paragraph(' | '.join(contact), '', 9, MUTED_COLOR, width=text_w)
+            main.y = max(main.y, MARGIN + PHOTO_SIZE if photo else 0) + 2
+            main.ops.append(('line', 0, main.x, main.y, main.x + main.width, main.y, accent, 0.6))
+            main.space(4)
+
+        if p.get('description'):
+            main.title("Profil", accent)
+            main.paragraph(pdf_text(p.get('description')))
+
+        experience = cv_data.get('experience') or []
+        if experience:
+            main.title("Expériences", accent)
+            for i, exp in enumerate(experience):
+                main.ensure(3 * 10 * PT * LEADING)
+                anchors[('experience', i)] = (main.page, main.y)
+                main.paragraph(pdf_text(' - '.join(v for v in (exp.get('position'), exp.get('company')) if v)),
+                               'B', 10.5)
+                end = 'Présent' if exp.get('current') else exp.get('end_date') or 'Présent'
+                period = f"{exp.get('start_date') or ''} - {end}"
+                if exp.get('location'):
+                    period += f" | {exp.get('location')}"
+                main.paragraph(pdf_text(period), 'I', 9, MUTED_COLOR)
+                main.paragraph(pdf_text(exp.get('description')), '', 10)
+                main.space(2)
+
+        education = cv_data.get('education') or []
+        if education:
+            main.title("Formations", accent)
+            for i, ed in enumerate(education):
+                main.ensure(3 * 10 * PT * LEADING)
+                anchors[('education', i)] = (main.page, main.y)
+                main.paragraph(pdf_text(' - '.join(v for v in (ed.get('degree'), ed.get('school')) if v)), 'B', 10.5)
+                period = ' - '.join(str(v) for v in (ed.get('start_year'), ed.get('end_year')) if v)
+                main.paragraph(pdf_text(period), 'I', 9, MUTED_COLOR)
+                main.paragraph(pdf_text(ed.get('description')), '', 10)
+                main.space(2)
+
+        skills = [pdf_text(s if isinstance(s, str) else s.get('name')) for s in cv_data.get('skills') or []]
+        languages = cv_data.get('languages') or []
+        flow = side or main
+        if skills:
+            flow.title("Compétences", accent)
+            if side:
+                for skill in skills:
+                    side.paragraph(f"- {skill}", '', 9.5)
+            else:
+                main.paragraph(', '.join(skills))
+        if languages:
+            flow.title("Langues", accent)
+            for i, lang in enumerate(languages):
+                anchors[('languages', i)] = (flow.page, flow.y)
+                flow.paragraph(pdf_text(f"{lang.get('name') or ''} - {lang.get('level') or ''}"), '', 9.5 if side else 10)
+
+        pages = max(main.page, side.page if side else 0) + 1
+        if side:
+            # fond de la colonne latérale, sous le reste sur chaque page
+            ops[:0] = [('rect', page, 0, 0, SIDEBAR_W, PAGE_H, style['sidebar']) for page in range(pages)]
+        return Document(pages, ops, anchors)
+
+
+# -----------------------
+# Rendus
+# -----------------------
+def _rgb(color):
+    return int(color[1:3], 16), int(color[3:5], 16), int(color[5:7], 16)
+
+
+def render_pdf(document):
+    """FPDF du document (fpdf importé à la demande)"""
+    from fpdf import FPDF
+
+    pdf = FPDF(unit='mm', format='A4')
+    pdf.set_auto_page_break(False)
+    pdf.add_page()
+    page = 0
+    # tri stable: l'ordre de superposition est conservé dans chaque page
+    for op in sorted(document.ops, key=lambda op: op[1]):
+        while page < op[1]:
+            pdf.add_page()
+            page += 1
+        kind = op[0]
+        if kind == 'text':
+            _, _, x, y, text, style, size, color = op
+            pdf.set_font('Arial', style, size)
+            pdf.set_text_color(*_rgb(color))
+            pdf.text(x, y + size * PT * ASCENT, text)
+        elif kind == 'rect':
+            _, _, x, y, w, h, color = op
+            pdf.set_fill_color(*_rgb(color))
+            pdf.rect(x, y, w, h, 'F')
+        elif kind == 'line':
+            _, _, x1, y1, x2, y2, color, width = op
+            pdf.set_draw_color(*_rgb(color))
+            pdf.set_line_width(width)
+            pdf.line(x1, y1, x2, y2)
+        elif kind == 'image':
+            _, _, x, y, w, h, path = op
+            try:
+                pdf.image(path, x, y, w, h)
+            except Exception as e:
+                print(f"[DEBUG] Photo non exportée ({path}): {e}")
+    while page < document.pages - 1:
+        pdf.add_page()
+        page += 1
+    return pdf
+
+
+class CanvasRenderer:
+    """Dessine un Document sur un Canvas Tk, pages empilées à la largeur du Canvas.
+
+    Les éléments déjà présents sont réutilisés (coords/itemconfigure) et
+    seuls ceux qui ont changé sont touchés: une frappe ne redessine pas
+    tout le CV.
+    """
+
+    PAD = 10
+    GAP = 12
+    # ordre de superposition des éléments
+    LAYERS = ('page', 'rect', 'line', 'image', 'text')
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.items = {}         # spec -> id d'élément du Canvas
+        self.scale = 1.0
+        self.page_h = PAGE_H
+        self._images = {}
+        self.last_changes = 0
+
+    def reset(self):
+        self.canvas.delete("all")
+        self.items = {}
+
+    def page_top(self, page):
+        return self.PAD + page * (self.page_h + self.GAP)
+
+    def _specs(self, document, width_px):
+        s = self.scale = max(width_px - 2 * self.PAD, 100) / PAGE_W
+        self.page_h = round(PAGE_H * s)
+        specs = []
+        for page in range(document.pages):
+            top = self.page_top(page)
+            specs.append(('page', self.PAD, top, self.PAD + round(PAGE_W * s), top + self.page_h, '#ffffff'))
+        for op in document.ops:
+            kind, page = op[0], op[1]
+            top = self.page_top(page)
+            if kind == 'text':
+                _, _, x, y, text, style, size, color = op
+                font_style = {'': 'normal', 'B': 'bold', 'I': 'italic', 'BI': 'bold italic'}[style]
+                specs.append(('text', self.PAD + round(x * s), top + round(y * s), text,
+                              ('Helvetica', -max(1, round(size * PT * s)), font_style), color))
+            elif kind == 'rect':
+                _, _, x, y, w, h, color = op
+                specs.append(('rect', self.PAD + round(x * s), top + round(y * s),
+                              self.PAD + round((x + w) * s), top + round((y + h) * s), color))
+            elif kind == 'line':
+                _, _, x1, y1, x2, y2, color, width = op
+                specs.append(('line', self.PAD + round(x1 * s), top + round(y1 * s), self.PAD + round(x2 * s),
+                              top + round(y2 * s), color, max(1, round(width * s))))
+            elif kind == 'image':
+                _, _, x, y, w, h, path = op
+                specs.append(('image', self.PAD + round(x * s), top + round(y * s), path,
+                              max(1, round(w * s)), max(1, round(h * s))))
+        return specs
+
+    def _photo(self, path, w, h):
+        key = (path, w, h)
+        if key not in self._images:
+            if len(self._images) > 8:
+                self._images.clear()
+            try:
+                from PIL import Image, ImageTk
+                img = Image.open(path)
+                self._images[key] = ImageTk.PhotoImage(img.resize((w, h), Image.LANCZOS))
+            except Exception as e:
+                print(f"[DEBUG] Photo de l'aperçu ({path}): {e}")
+                self._images[key] = None
+        return self._images[key]
+
+    def _create(self, spec):
+        c = self.canvas
+        kind = spec[0]
+        if kind in ('page', 'rect'):
+            return c.create_rectangle(*spec[1:5], fill=spec[5], outline='#bdc3c7' if kind == 'page' else '',
+                                      tags=(kind,))
+        if kind == 'line':
+            return c.create_line(*spec[1:5], fill=spec[5], width=spec[6], tags=(kind,))
+        if kind == 'image':
+            return c.create_image(spec[1], spec[2], anchor='nw', image=self._photo(*spec[3:]), tags=(kind,))
+        return c.create_text(spec[1], spec[2], anchor='nw', text=spec[3], font=spec[4], fill=spec[5], tags=(kind,))
+
+    def _update(self, item, spec):
+        c = self.canvas
+        kind = spec[0]
+        if kind in ('page', 'rect', 'line'):
+            c.coords(item, *spec[1:5])
+            if kind == 'line':
+                c.itemconfigure(item, fill=spec[5], width=spec[6])
+            else:
+                c.itemconfigure(item, fill=spec[5])
+        elif kind == 'image':
+            c.coords(item, spec[1], spec[2])
+            c.itemconfigure(item, image=self._photo(*spec[3:]))
+        else:
+            c.coords(item, spec[1], spec[2])
+            c.itemconfigure(item, text=spec[3], font=spec[4], fill=spec[5])
+
+    def render(self, document, width_px):
+        """Met le Canvas à jour; retourne le nombre d'éléments créés, modifiés ou supprimés"""
+        specs = self._specs(document, width_px)
+        old = self.items
+        items = {}
+        missing = []
+        for spec in specs:
+            if spec in items:
+                continue
+            item = old.pop(spec, None)
+            if item is None:
+                missing.append(spec)
+            else:
+                items[spec] = item
+        # éléments qui ont changé: réutilisés par type avant d'en créer
+        spare = {}
+        for spec, item in old.items():
+            spare.setdefault(spec[0], []).append(item)
+        created = False
+        for spec in missing:
+            pool = spare.get(spec[0])
+            if pool:
+                item = pool.pop()
+                self._update(item, spec)
+            else:
+                item = self._create(spec)
+                created = True
+            items[spec] = item
+        for pool in spare.values():
+            if pool:
+                self.canvas.delete(*pool)
+        if created:
+            for layer in self.LAYERS[1:]:
+                self.canvas.tag_raise(layer)
+        self.items = items
+        self.canvas.configure(scrollregion=(0, 0, width_px, self.page_top(document.pages)))
+        self.last_changes = len(missing) + sum(len(pool) for pool in spare.values())
+        return self.last_changes
+
+    def y_of(self, anchor):
+        """Ordonnée (px) d'une ancre (page, y en mm) du document"""
+        page, y = anchor
+        return self.page_top(page) + y * self.scale
+
+
+# -----------------------
+# Benchmark
+# -----------------------
+def sample_cv(pages=3):
+    """CV fictif d'environ `pages` pages"""
+    words = ("conception développement équipe projet client livraison qualité analyse données "
+             "architecture service performance migration tests déploiement suivi").split()
+    text = lambda n, k: ' '.join(words[(k * 7 + i * 3) % len(words)] for i in range(n)).capitalize() + '.'
+    return {
+        'personal': {'first_name': "Camille", 'last_name': "Durand", 'title': "Ingénieure logiciel",
+                     'email': "camille@example.com", 'phone': "06 12 34 56 78", 'address': "Lyon",
+                     'description': text(60, 1)},
+        'experience': [{'position': f"Poste {k}", 'company': f"Société {k}", 'location': "Lyon",
+                        'start_date': f"01/{2000 + k}", 'end_date': f"12/{2001 + k}", 'description': text(70, k)}
+                       for k in range(3 * pages)],
+        'education': [{'degree': f"Diplôme {k}", 'school': "Université", 'start_year': "1998",
+                       'end_year': "2000", 'description': text(25, k)} for k in range(3)],
+        'skills': [f"Compétence {k}" for k in range(25)],
+        'languages': [{'name': "Anglais", 'level': "Courant"}, {'name': "Espagnol", 'level': "Intermédiaire"}],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la mise en page (frappe dans une description)")
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--keystrokes", type=int, default=300)
+    parser.add_argument("--template", default="modern", choices=list(TEMPLATES))
+    args = parser.parse_args()
+
+    data = sample_cv(args.pages)
+    engine = CVLayout()
+    start = time.perf_counter()
+    engine.metrics.units('x')
+    import_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    document = engine.layout(data, args.template)
+    cold_ms = (time.perf_counter() - start) * 1000
+
+    entry = data['experience'][len(data['experience']) // 2]
+    timings = []
+    for k in range(args.keystrokes):
+        entry['description'] += ' ' if k % 6 == 5 else 'x'
+        start = time.perf_counter()
+        document = engine.layout(data, args.template)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    print(f"pages: {document.pages}, opérations: {len(document.ops)}, chargement des métriques: {import_ms:.0f} ms, "
+          f"première mise en page: {cold_ms:.1f} ms")
+    print(f"par frappe: p50 {timings[len(timings) // 2]:.2f} ms, p99 {timings[int(len(timings) * 0.99)]:.2f} ms, "
+          f"max {timings[-1]:.2f} ms (budget 60 i/s: 16.7 ms)")
+    print(f"paragraphes redécoupés: {engine.wrap_misses}, réutilisés: {engine.wrap_hits}")
+
+
+if __name__ == "__main__":
+    main()
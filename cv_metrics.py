@@ -0,0 +1,113 @@
+import bisect
+import threading
+import time
+
+
+# Bornes des buckets de latence (en millisecondes), espacées de façon logarithmique
+DEFAULT_BUCKETS_MS = (
+    0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50,
+    100, 250, 500, 1000, 2500, 5000, 10000,
+)
+
+
+class LatencyHistogram:
+    """Histogramme de latences à buckets fixes (mémoire constante).
+
+    Les percentiles sont estimés par interpolation linéaire à l'intérieur
+    du bucket concerné.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS_MS):
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)  # dernier bucket = +Inf
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value_ms):
+        """Enregistre une mesure (ms)"""
+        idx = bisect.bisect_left(self.bounds, value_ms)
+        with self._lock:
+            self.counts[idx] += 1
+            self.count += 1
+            self.total += value_ms
+            if value_ms > self.max:
+                self.max = value_ms
+
+    def percentile(self, p):
+        """Estime le percentile p (0-100) en ms"""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = p / 100.0 * self.count
+            seen = 0
+            for idx, n in enumerate(self.counts):
+                if not n:
+                    continue
+                if seen + n >= rank:
+                    lower = self.bounds[idx - 1] if idx > 0 else 0.0
+                    upper = self.bounds[idx] if idx < len(self.bounds) else self.max
+                    upper = min(upper, self.max)
+                    fraction = (rank - seen) / n
+                    return lower + (upper - lower) * fraction
+                seen += n
+            return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self):
+        """Résumé sérialisable (count, moyenne, p50/p95/p99, max)"""
+        return {
+            'count': self.count,
+            'mean_ms': round(self.mean(), 3),
+            'p50_ms': round(self.percentile(50), 3),
+            'p95_ms': round(self.percentile(95), 3),
+            'p99_ms': round(self.percentile(99), 3),
+            'max_ms': round(self.max, 3),
+        }
+
+
+class RollingHistogram:
+    """Histogramme glissant: cumul total + fenêtre récente découpée en tranches.
+
+    La fenêtre couvre window_s secondes réparties en `slots` histogrammes;
+    les tranches expirées sont recyclées au fil de l'eau.
+    """
+
+    def __init__(self, window_s=300, slots=10, buckets=DEFAULT_BUCKETS_MS, clock=None):
+        self._clock = clock or time.monotonic
+        self.buckets = tuple(buckets)
+        self.slot_s = window_s / slots
+        self.total = LatencyHistogram(buckets)
+        self._slots = [(None, LatencyHistogram(buckets)) for _ in range(slots)]
+        self._lock = threading.Lock()
+
+    def observe(self, value_ms):
+        epoch = int(self._clock() // self.slot_s)
+        idx = epoch % len(self._slots)
+        with self._lock:
+            slot_epoch, hist = self._slots[idx]
+            if slot_epoch != epoch:
+                hist = LatencyHistogram(self.buckets)
+                self._slots[idx] = (epoch, hist)
+        hist.observe(value_ms)
+        self.total.observe(value_ms)
+
+    def window(self):
+        """Fusionne les tranches encore valides en un histogramme"""
+        epoch = int(self._clock() // self.slot_s)
+        merged = LatencyHistogram(self.buckets)
+        with self._lock:
+            slots = list(self._slots)
+        for slot_epoch, hist in slots:
+            if slot_epoch is None or epoch - slot_epoch >= len(slots):
+                continue
+            with hist._lock:
+                for i, n in enumerate(hist.counts):
+                    merged.counts[i] += n
+                merged.count += hist.count
+                merged.total += hist.total
+                merged.max = max(merged.max, hist.max)
+        return merged
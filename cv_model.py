@@ -0,0 +1,311 @@
+"""Modèle en mémoire d'un CV: enregistrements à __slots__, validés une fois.
+
+Chaque section est une liste d'enregistrements (Experience, Education,
+Language), les informations personnelles un PersonalInfo et les
+compétences une liste de noms. Les enregistrements gardent l'accès des
+dicts en lecture (entry.get('position', '')), ce qui laisse inchangés
+l'aperçu et les exports.
+
+La sérialisation JSON est mise en cache par section: après une
+modification, seule la section touchée est resérialisée (save_cv).
+
+Mesure mémoire / temps sur des milliers de CVs:
+
+    python cv_model.py --cvs 5000
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+SECTIONS = ('personal', 'experience', 'education', 'skills', 'languages')
+
+
+class InvalidCV(ValueError):
+    """Document CV mal formé (section ou entrée du mauvais type)"""
+
+
+# -----------------------
+# Enregistrements
+# -----------------------
+class Record:
+    """Base des enregistrements: champs texte (ou booléens) déclarés dans FIELDS.
+
+    Les clés inconnues sont conservées dans extra et réémises par
+    to_dict(): le modèle ne perd rien d'un document importé.
+    """
+    __slots__ = ('extra',)
+    FIELDS = ()
+    BOOL_FIELDS = ()
+    _field_set = frozenset()
+
+    def __init__(self, **values):
+        for name in self.FIELDS:
+            setattr(self, name, values.pop(name, False if name in self.BOOL_FIELDS else ''))
+        self.extra = values or None
+
+    @classmethod
+    def from_dict(cls, value):
+        """Valide et convertit un dict (un enregistrement est retourné tel quel)"""
+        if isinstance(value, cls):
+            return value
+        if not isinstance(value, dict):
+            raise InvalidCV(f"{cls.__name__}: objet attendu, reçu {type(value).__name__}")
+        record = cls.__new__(cls)
+        get = value.get
+        for name in cls.FIELDS:
+            v = get(name)
+            if v.__class__ is not str or name in cls.BOOL_FIELDS:
+                v = cls._coerce(name, v)
+            setattr(record, name, v)
+        if value.keys() <= cls._field_set:
+            record.extra = None
+        else:
+            record.extra = {k: v for k, v in value.items() if k not in cls._field_set}
+        return record
+
+    @classmethod
+    def _coerce(cls, name, v):
+        if name in cls.BOOL_FIELDS:
+            return bool(v)
+        if v is None:
+            return ''
+        if isinstance(v, (dict, list)):
+            raise InvalidCV(f"{cls.__name__}.{name}: texte attendu")
+        return str(v)
+
+    def to_dict(self):
+        data = {name: getattr(self, name) for name in self.FIELDS}
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    # accès en lecture façon dict (aperçu, exports, formulaires)
+    def get(self, key, default=None):
+        if key in self.FIELDS:
+            return getattr(self, key)
+        if self.extra:
+            return self.extra.get(key, default)
+        return default
+
+    def __getitem__(self, key):
+        if key in self.FIELDS:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            return type(self) is type(other) and self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class PersonalInfo(Record):
+    __slots__ = ('first_name', 'last_name', 'title', 'email', 'phone', 'address',
+                 'linkedin', 'website', 'description')
+    FIELDS = __slots__
+    _field_set = frozenset(FIELDS)
+
+
+class Experience(Record):
+    __slots__ = ('position', 'company', 'location', 'start_date', 'end_date', 'current', 'description')
+    FIELDS = __slots__
+    BOOL_FIELDS = ('current',)
+    _field_set = frozenset(FIELDS)
+
+
+class Education(Record):
+    __slots__ = ('degree', 'school', 'location', 'start_year', 'end_year', 'description')
+    FIELDS = __slots__
+    _field_set = frozenset(FIELDS)
+
+
+class Language(Record):
+    __slots__ = ('name', 'level')
+    FIELDS = __slots__
+    _field_set = frozenset(FIELDS)
+
+
+SECTION_RECORDS = {'experience': Experience, 'education': Education, 'languages': Language}
+
+
+def skill_name(value):
+    """Compétence stockée en texte ou en objet {'name': ...} -> nom"""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        return str(value.get('name') or '')
+    raise InvalidCV(f"compétence invalide: {value!r}")
+
+
+# -----------------------
+# CV
+# -----------------------
+class CVModel:
+    """CV validé; les sections sont des listes d'enregistrements modifiables via apply()"""
+    __slots__ = ('personal', 'experience', 'education', 'skills', 'languages', 'extra', '_json')
+
+    def __init__(self):
+        self.personal = PersonalInfo()
+        self.experience = []
+        self.education = []
+        self.skills = []
+        self.languages = []
+        self.extra = None
+        self._json = {}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Une seule passe de validation/normalisation d'un document CV (dict)"""
+        if not isinstance(data, dict):
+            raise InvalidCV("le CV doit être un objet")
+        model = cls()
+        personal = data.get('personal') or {}
+        model.personal = PersonalInfo.from_dict(personal)
+        for section, record_cls in SECTION_RECORDS.items():
+            items = data.get(section) or []
+            if not isinstance(items, list):
+                raise InvalidCV(f"'{section}' doit être une liste")
+            setattr(model, section, [record_cls.from_dict(item) for item in items])
+        skills = data.get('skills') or []
+        if not isinstance(skills, list):
+            raise InvalidCV("'skills' doit être une liste")
+        model.skills = [skill_name(s) for s in skills]
+        extra = {k: v for k, v in data.items() if k not in SECTIONS}
+        model.extra = extra or None
+        return model
+
+    def to_dict(self):
+        data = {'personal': self.personal.to_dict()}
+        for section in SECTIONS[1:]:
+            items = getattr(self, section)
+            data[section] = list(items) if section == 'skills' else [record.to_dict() for record in items]
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def get(self, key, default=None):
+        """Accès en lecture façon dict (frise de carrière, exports)"""
+        if key in SECTIONS:
+            return getattr(self, key)
+        if self.extra:
+            return self.extra.get(key, default)
+        return default
+
+    def section_json(self, section):
+        """JSON d'une section, mis en cache jusqu'à sa prochaine modification"""
+        text = self._json.get(section)
+        if text is None:
+            value = getattr(self, section)
+            if section == 'personal':
+                value = value.to_dict()
+            elif section != 'skills':
+                value = [record.to_dict() for record in value]
+            text = self._json[section] = json.dumps(value, ensure_ascii=False)
+        return text
+
+    def to_json(self):
+        """Document JSON complet; seules les sections modifiées sont resérialisées"""
+        parts = [f'"{section}": {self.section_json(section)}' for section in SECTIONS]
+        if self.extra:
+            parts.extend(f'{json.dumps(k, ensure_ascii=False)}: {json.dumps(v, ensure_ascii=False)}'
+                         for k, v in self.extra.items())
+        return '{' + ', '.join(parts) + '}'
+
+    def invalidate(self, section):
+        self._json.pop(section, None)
+
+    def set_personal(self, values):
+        """Remplace les informations personnelles (dict) si elles ont changé"""
+        personal = PersonalInfo.from_dict(values)
+        if personal != self.personal:
+            self.personal = personal
+            self.invalidate('personal')
+
+    def apply(self, op):
+        """Applique une opération de cv_journal (listes modifiées sur place)"""
+        kind = op.get('op')
+        if kind == 'set':
+            field = op['field']
+            if field in PersonalInfo.FIELDS:
+                setattr(self.personal, field, op['value'])
+            else:
+                self.personal.extra = dict(self.personal.extra or {}, **{field: op['value']})
+            self.invalidate('personal')
+            return
+        section = op.get('section')
+        record_cls = SECTION_RECORDS.get(section)
+        if record_cls is None:
+            raise InvalidCV(f"section inconnue: {section}")
+        items = getattr(self, section)
+        if kind == 'insert':
+            items.insert(op['index'], record_cls.from_dict(op['value']))
+        elif kind == 'replace':
+            items[op['index']] = record_cls.from_dict(op['value'])
+        elif kind == 'delete':
+            del items[op['index']]
+        elif kind == 'load':
+            items[:] = [record_cls.from_dict(item) for item in op['value']]
+        else:
+            raise InvalidCV(f"opération inconnue: {kind}")
+        self.invalidate(section)
+
+
+# -----------------------
+# Benchmark
+# -----------------------
+def measure(documents, use_model):
+    """Mémoire retenue par len(documents) CVs chargés, temps de chargement et de sauvegarde"""
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    if use_model:
+        loaded = [CVModel.from_dict(json.loads(doc)) for doc in documents]
+    else:
+        loaded = [json.loads(doc) for doc in documents]
+    load_s = time.perf_counter() - start
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+
+    # sauvegarde après modification du titre (cas de l'autosave)
+    for cv in loaded:
+        if use_model:
+            cv.to_json()
+    start = time.perf_counter()
+    for i, cv in enumerate(loaded):
+        if use_model:
+            cv.apply({'op': 'set', 'field': 'title', 'value': f'Titre {i}'})
+            cv.to_json()
+        else:
+            cv['personal']['title'] = f'Titre {i}'
+            json.dumps(cv, ensure_ascii=False)
+    save_s = time.perf_counter() - start
+    n = len(documents)
+    return {'cvs': n, 'mb': round(used / 2**20, 1), 'kb_per_cv': round(used / n / 1024, 2),
+            'load_us_per_cv': round(load_s / n * 1e6, 1), 'save_us_per_cv': round(save_s / n * 1e6, 1)}
+
+
+def main():
+    import random
+    from benchmarks.generate_data import make_cv
+
+    parser = argparse.ArgumentParser(description="Mémoire et temps du modèle de CV")
+    parser.add_argument("--cvs", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    documents = [json.dumps(make_cv(rng, f"Prénom{i}", f"Nom{i}", f"user{i}@bench.example"), ensure_ascii=False)
+                 for i in range(args.cvs)]
+    print("dicts      :", measure(documents, False))
+    print("CVModel    :", measure(documents, True))
+
+
+if __name__ == "__main__":
+    main()
@@ -9,13 +9,142 @@ import base64
 import tempfile
 import shutil
 from tkinter import font as tkfont
-from PIL import Image, ImageTk, ImageOps
 import threading
 import webbrowser
-from fpdf import FPDF
 import html
+from cv_background import BackgroundRunner
+from cv_db import ConnectionManager, QueryStats, DeferredWriter, wal_enabled
+from cv_jobs import JobContext, JobQueue, Worker
+from cv_journal import EditJournal, JournalError, apply_op, read_journal
+from cv_model import CVModel, InvalidCV
+from cv_undo import UndoHistory
+from cv_services import CVService, hash_password, filter_skill_names
+from cv_facets import FACET_LABELS, EXPERIENCE_BUCKETS, level_value
+from cv_layout import CanvasRenderer
+from cv_thumbnails import SMALL_WIDTH, THUMBNAIL_DIR, thumbnail_paths, thumbnail_size
+from cv_session import SessionStore, make_thumbnail, pack_cv_data, unpack_cv_data, utc_now
+from cv_trace import UITracer, MainloopWatchdog
+
+class CVListView:
+    """Liste des CVs du tableau de bord: Treeview avec une miniature par ligne.
+
+    Reprend l'interface de Listbox utilisée par l'application (insert,
+    delete, get, curselection, selection_set...) et signale les défilements
+    (on_scroll) pour que seules les miniatures des lignes visibles soient
+    chargées.
+    """
+
+    ROW_HEIGHT = 84
+    # Lignes supposées visibles tant que Tk n'a pas encore affiché la liste
+    DEFAULT_VISIBLE = 12
+
+    def __init__(self, master, font=None, on_scroll=None):
+        self.on_scroll = on_scroll
+        self.view = None
+        self.frame = tk.Frame(master, bg='#ffffff')
+        ttk.Style(master).configure('CVList.Treeview', rowheight=self.ROW_HEIGHT, font=font)
+        self.tree = ttk.Treeview(self.frame, show='tree', selectmode='browse', style='CVList.Treeview')
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_yscroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        # Image vide: réserve la place de la miniature en attendant son chargement
+        self.placeholder = tk.PhotoImage(width=SMALL_WIDTH, height=thumbnail_size(SMALL_WIDTH)[1])
+
+    def _on_yscroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.view = (float(first), float(last))
+        if self.on_scroll:
+            self.on_scroll()
+
+    def _rows(self, first, last=None):
+        children = self.tree.get_children()
+        if last is None:
+            last = first
+        end = len(children) if last == tk.END else int(last) + 1
+        return children[int(first):end]
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def bind(self, sequence, func):
+        if sequence == '<<ListboxSelect>>':
+            sequence = '<<TreeviewSelect>>'
+        return self.tree.bind(sequence, func)
+
+    def size(self):
+        return len(self.tree.get_children())
+
+    def insert(self, index, *titles):
+        for title in titles:
+            self.tree.insert('', index, text=title, image=self.placeholder)
+
+    def delete(self, first, last=None):
+        rows = self._rows(first, last)
+        if rows:
+            self.tree.delete(*rows)
+
+    def get(self, first, last=None):
+        texts = tuple(self.tree.item(iid, 'text') for iid in self._rows(first, last))
+        return texts if last is not None else (texts[0] if texts else '')
+
+    def curselection(self):
+        return tuple(self.tree.index(iid) for iid in self.tree.selection())
+
+    def selection_set(self, first, last=None):
+        self.tree.selection_set(self._rows(first, last))
+
+    def selection_clear(self, first=0, last=tk.END):
+        self.tree.selection_remove(self._rows(first, last))
+
+    def see(self, index):
+        rows = self._rows(index)
+        if rows:
+            self.tree.see(rows[0])
+
+    def set_image(self, index, image):
+        rows = self._rows(index)
+        if rows:
+            self.tree.item(rows[0], image=image)
+
+    def visible_range(self):
+        """Indices des lignes affichées (d'après la position de la barre de défilement)"""
+        count = self.size()
+        if self.view is None:
+            return range(min(count, self.DEFAULT_VISIBLE))
+        first, last = self.view
+        return range(int(first * count), min(count, int(last * count) + 1))
+
 
 class CVGeneratorApp:
+    # Handlers et méthodes de construction mesurés en mode traçage
+    TRACED_METHODS = (
+        "setup_login_tab", "setup_register_tab", "setup_dashboard_tab", "setup_editor_tab",
+        "setup_skills_tab", "setup_personal_section", "setup_experience_section",
+        "setup_education_section", "setup_skills_section_editor", "setup_languages_section",
+        "login", "register", "on_cv_select", "load_user_cvs", "load_cv_data", "load_user_skills",
+        "update_stats", "update_preview", "save_cv", "new_cv", "delete_cv", "export_pdf",
+        "export_word", "upload_photo", "load_photo", "filter_skills", "add_user_skill",
+        "edit_user_skill", "delete_user_skill", "change_template", "setup_candidates_tab",
+        "search_candidates", "show_duplicate_cvs", "render_preview", "open_selected_cv",
+        "load_thumbnails",
+    )
+
+    # Nombre maximal de compétences affichées dans la recherche
+    MAX_SKILL_RESULTS = 500
+
+    # Délai de l'aperçu (ms): les frappes d'une même image (~60 i/s) sont regroupées
+    PREVIEW_DELAY_MS = 16
+
+    # Intervalle de consultation des tâches de miniatures en cours (ms)
+    THUMBNAIL_POLL_MS = 150
+
+    SKILL_LEVELS = ("Débutant", "Intermédiaire", "Avancé", "Expert")
+    LANGUAGE_LEVELS = ("Débutant", "Intermédiaire", "Avancé", "Courant")
+
+    # Valeurs affichées par facette dans la recherche de candidats
+    MAX_FACET_VALUES = 40
+
     def __init__(self, root):
         self.root = root
         self.root.title("📄 Plateforme de Génération de CV")
@@ -25,20 +154,40 @@ class CVGeneratorApp:
         # Fichier de base de données
         self.db_file = "cv_platform.db"
 
+        # Statistiques SQL (panneau caché Ctrl+Shift+D, export JSON si CV_QUERY_STATS est défini)
+        self.query_stats = QueryStats(slow_ms=float(os.environ.get("CV_SLOW_QUERY_MS", "50")))
+        self.query_stats_file = os.environ.get("CV_QUERY_STATS")
+
         # Attributs utilisateur / CV
         self.current_user = None
         self.current_cv_id = None
         self.current_template = "classic"
         self.photo_path = None
+        # état du CV à son chargement / sa dernière sauvegarde (voir editor_state)
+        self.saved_state = None
+        # Aperçu de l'éditeur: rendu programmé et dernière mise en page
+        self.preview_job = None
+        self.preview_document = None
 
-        # Données d'édition (structures en mémoire)
-        self.experience_data = []   # liste de dicts
-        self.education_data = []    # liste de dicts
-        self.skills_data = []       # liste de str ou dict
-        self.languages_data = []    # liste de dicts
+        # Données d'édition: CVModel validé; experience_data, education_data,
+        # skills_data et languages_data sont les listes du modèle
+        self.set_cv_model(CVModel())
 
         # Mapping entre Listbox indices et IDs en base
         self.cv_ids = []
+        # Version (cvs.version) de chaque CV listé (validation du cache de CVs)
+        self.cv_versions = {}
+        # Miniatures du tableau de bord: cv_id -> (version, hash, PhotoImage),
+        # tâches "thumbnail" en attente (cv_id -> job_id) et scans programmés
+        self.thumbnail_images = {}
+        self.thumbnail_jobs = {}
+        # (cv_id, version) déjà demandés / régénérés (fichier introuvable): une
+        # génération par version, plus une régénération au plus
+        self.thumbnail_requested = set()
+        self.thumbnail_regenerated = set()
+        self.thumbnail_scan_job = None
+        self.thumbnail_poll_job = None
+        self.dashboard_preview_image = None
 
         # Index en cours d'édition pour expérience / education / languages
         self.editing_experience_index = None
@@ -53,14 +202,17 @@ class CVGeneratorApp:
             "professional": "Professionnel"
         }
 
-        # Compétences prédéfinies (initialisation)
-        self.predefined_skills = [
-            "Python", "JavaScript", "Java", "C++", "PHP", "SQL", "HTML/CSS",
-            "React", "Angular", "Vue.js", "Node.js", "Django", "Flask",
-            "Git", "Docker", "AWS", "Azure", "Machine Learning",
-            "Data Analysis", "Project Management", "Agile/Scrum",
-            "Communication", "Leadership", "Problem Solving"
-        ]
+        # Noms des compétences du catalogue (chargés à l'ouverture de l'onglet Compétences)
+        self.skill_names = None
+        # Compétences affichées dans user_skills_tree: skill_id -> (nom, niveau, années)
+        self.user_skill_rows = {}
+        # Compétences préchargées à la connexion, avant construction de l'onglet
+        self.prefetched_user_skills = None
+        # Incrémenté à chaque connexion/déconnexion: écarte les résultats d'une session précédente
+        self.login_generation = 0
+        # Session "se souvenir de moi" (jeton + instantané du dernier CV)
+        self.session_store = SessionStore()
+        self.session = None
 
         # Créer dossiers utiles
         self.create_folders()
@@ -71,20 +223,57 @@ class CVGeneratorApp:
         # Connexion DB + tables
         self.init_db()
 
+        # Tâches en arrière-plan (préchargement du tableau de bord)
+        self.background = BackgroundRunner(self.root)
+
+        # Expériences en cours: cumul d'expérience avancé au mois courant
+        # (recherche de candidats, tranches d'expérience des facettes)
+        self.background.submit(self.service.refresh_timelines,
+                               on_error=lambda e: print(f"[DEBUG] Frises de carrière: {e}"))
+
+        # File de tâches durable (exports...): un worker intégré la vide, des
+        # workers externes (python cv_jobs.py worker) peuvent s'y ajouter
+        self.jobs = JobQueue(self.db)
+        self.job_worker = Worker(self.jobs, JobContext(self.db, self.service))
+        self.job_worker.start_thread()
+
+        # Journal des modifications entre deux sauvegardes; rejoué s'il reste
+        # des modifications d'une exécution précédente (plantage)
+        self.journal = EditJournal()
+        self.history = UndoHistory()
+        self.journaled_personal = {}
+        self.description_job = None
+        self.recover_journal()
+
+        # Traçage des handlers UI (opt-in via CV_TRACE), avant la création des widgets
+        self.tracer = UITracer.from_env()
+        self.tracer.instrument(self, self.TRACED_METHODS)
+
         # Interface (onglets, frames, widgets)
         self.setup_interface()
 
+        # Reprise de la session mémorisée: l'éditeur est affiché depuis l'instantané
+        self.restore_session()
+
         # Charger liste de compétences dans skills_listbox si existant
         # (sera généré quand connecte)
         # lancement autosave
         self.setup_autosave()
 
+        # Surveillance des blocages de la boucle Tk (opt-in via CV_STALL_MS)
+        self.watchdog = MainloopWatchdog.from_env(self.root)
+        if self.watchdog:
+            self.watchdog.start()
+
+        # Fermeture propre (connexions BD)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
     # -----------------------
     # Utilitaires init
     # -----------------------
     def create_folders(self):
         """Crée les dossiers nécessaires"""
-        folders = ["uploads", "exports", "templates", "backups"]
+        folders = ["uploads", "exports", "templates", "backups", THUMBNAIL_DIR]
         for folder in folders:
             os.makedirs(folder, exist_ok=True)
 
@@ -97,7 +286,7 @@ class CVGeneratorApp:
 
     def hash_password(self, password):
         """Hash un mot de passe avec SHA-256"""
-        return hashlib.sha256(password.encode()).hexdigest()
+        return hash_password(password)
 
     # -----------------------
     # Base de données
@@ -105,97 +294,15 @@ class CVGeneratorApp:
     def init_db(self):
         """Initialise la base de données SQLite"""
         try:
-            self.conn = sqlite3.connect(self.db_file, check_same_thread=False)
-            self.cursor = self.conn.cursor()
-
-            # Table utilisateurs
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    email TEXT UNIQUE NOT NULL,
-                    password_hash TEXT NOT NULL,
-                    first_name TEXT NOT NULL,
-                    last_name TEXT NOT NULL,
-                    role TEXT DEFAULT 'candidate',
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    last_login DATETIME,
-                    is_active BOOLEAN DEFAULT 1
-                )
-            ''')
-
-            # Table CVs
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS cvs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    title TEXT NOT NULL,
-                    template TEXT DEFAULT 'classic',
-                    data TEXT NOT NULL,
-                    photo_path TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    is_public BOOLEAN DEFAULT 0,
-                    view_count INTEGER DEFAULT 0,
-                    FOREIGN KEY (user_id) REFERENCES users (id)
-                )
-            ''')
-
-            # Table compétences
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS skills (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT UNIQUE NOT NULL,
-                    category TEXT,
-                    description TEXT
-                )
-            ''')
-
-            # Table compétences utilisateur
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS user_skills (
-                    user_id INTEGER NOT NULL,
-                    skill_id INTEGER NOT NULL,
-                    level INTEGER DEFAULT 1,
-                    experience_years INTEGER DEFAULT 0,
-                    last_used INTEGER,
-                    PRIMARY KEY (user_id, skill_id),
-                    FOREIGN KEY (user_id) REFERENCES users (id),
-                    FOREIGN KEY (skill_id) REFERENCES skills (id)
-                )
-            ''')
-
-            # Table historique CV
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS cv_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    cv_id INTEGER NOT NULL,
-                    data TEXT NOT NULL,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (cv_id) REFERENCES cvs (id)
-                )
-            ''')
-
-            # Table vues CV
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS cv_views (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    cv_id INTEGER NOT NULL,
-                    viewer_id INTEGER,
-                    viewed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    ip_address TEXT,
-                    FOREIGN KEY (cv_id) REFERENCES cvs (id),
-                    FOREIGN KEY (viewer_id) REFERENCES users (id)
-                )
-            ''')
-
-            # Insérer compétences prédéfinies
-            for skill in self.predefined_skills:
-                try:
-                    self.cursor.execute('INSERT OR IGNORE INTO skills (name) VALUES (?)', (skill,))
-                except sqlite3.Error:
-                    pass
-
-            self.conn.commit()
+            # CV_DB_WAL=0: journal classique (base partagée sur le réseau avec des workers)
+            self.db = ConnectionManager(self.db_file, stats=self.query_stats, wal=wal_enabled())
+            self.service = CVService(self.db)
+            self.service.init_schema()
+            # Écritures non urgentes (dernière connexion) regroupées par lots
+            self.deferred_writer = DeferredWriter(self.db)
+            self.service.deferred = self.deferred_writer
+            # Catalogue de compétences: rechargé uniquement si sa version change
+            self.service.sync_skill_catalog()
 
         except sqlite3.Error as e:
             messagebox.showerror("Erreur BD", f"Erreur initialisation: {e}")
@@ -222,23 +329,47 @@ class CVGeneratorApp:
         self.dashboard_tab = ttk.Frame(self.notebook)
         self.editor_tab = ttk.Frame(self.notebook)
         self.skills_tab = ttk.Frame(self.notebook)
+        self.candidates_tab = ttk.Frame(self.notebook)
 
         self.notebook.add(self.login_tab, text="Connexion")
         self.notebook.add(self.register_tab, text="Inscription")
         self.notebook.add(self.dashboard_tab, text="Tableau de bord", state='hidden')
         self.notebook.add(self.editor_tab, text="Éditeur CV", state='hidden')
         self.notebook.add(self.skills_tab, text="Compétences", state='hidden')
-
-        # Setup each tab
+        self.notebook.add(self.candidates_tab, text="Candidats", state='hidden')
+
+        # Seuls les onglets visibles au lancement sont construits; les autres
+        # le sont au premier affichage (voir ensure_tab)
+        self.tab_builders = {
+            str(self.dashboard_tab): self.setup_dashboard_tab,
+            str(self.editor_tab): self.setup_editor_tab,
+            str(self.skills_tab): self.setup_skills_tab,
+            str(self.candidates_tab): self.setup_candidates_tab,
+        }
+        self.built_tabs = set()
         self.setup_login_tab()
         self.setup_register_tab()
-        self.setup_dashboard_tab()
-        self.setup_editor_tab()
-        self.setup_skills_tab()
+        self.notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed)
 
         # Afficher l'onglet de connexion par défaut
         self.notebook.select(0)
 
+        # Panneau de debug caché (statistiques SQL)
+        self.root.bind('<Control-Shift-D>', self.show_query_stats)
+
+    def ensure_tab(self, tab):
+        """Construit un onglet s'il ne l'a pas encore été"""
+        key = str(tab)
+        if key in self.tab_builders and key not in self.built_tabs:
+            self.built_tabs.add(key)
+            self.tab_builders[key]()
+
+    def on_tab_changed(self, event=None):
+        """Construit l'onglet sélectionné au premier affichage"""
+        selected = self.notebook.select()
+        if selected:
+            self.ensure_tab(selected)
+
     # -----------------------
     # Login / Register Tabs
     # -----------------------
@@ -261,6 +392,10 @@ class CVGeneratorApp:
         self.login_password = tk.Entry(form_frame, show="•", width=30)
         self.login_password.grid(row=1, column=1, pady=5, padx=5)
 
+        self.remember_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(form_frame, text="Se souvenir de moi", variable=self.remember_var,
+                       bg='#ffffff').grid(row=2, column=1, sticky='w', pady=5, padx=5)
+
         # Boutons
         btn_frame = tk.Frame(frame, bg='#ffffff')
         btn_frame.pack(pady=20)
@@ -337,19 +472,25 @@ class CVGeneratorApp:
 
         tk.Label(left_frame, text="Mes CVs", font=self.subtitle_font, bg='#ffffff').pack(pady=10)
 
-        # Listbox for CVs
-        self.cv_listbox = tk.Listbox(left_frame, font=self.normal_font)
+        # Liste des CVs: la sélection affiche l'aperçu, l'ouverture charge l'éditeur
+        self.cv_listbox = CVListView(left_frame, font=self.normal_font, on_scroll=self.schedule_thumbnail_scan)
         self.cv_listbox.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
         self.cv_listbox.bind('<<ListboxSelect>>', self.on_cv_select)
+        self.cv_listbox.bind('<Double-1>', self.open_selected_cv)
+        self.cv_listbox.bind('<Return>', self.open_selected_cv)
 
         # CV actions
         cv_btn_frame = tk.Frame(left_frame, bg='#ffffff')
         cv_btn_frame.pack(fill=tk.X, pady=5)
 
+        tk.Button(cv_btn_frame, text="Ouvrir", command=self.open_selected_cv,
+                 bg='#27ae60', fg='white').pack(side=tk.LEFT, padx=2)
         tk.Button(cv_btn_frame, text="Nouveau CV", command=self.new_cv,
                  bg='#3498db', fg='white').pack(side=tk.LEFT, padx=2)
         tk.Button(cv_btn_frame, text="Supprimer", command=self.delete_cv,
                  bg='#e74c3c', fg='white').pack(side=tk.LEFT, padx=2)
+        tk.Button(cv_btn_frame, text="Doublons", command=self.show_duplicate_cvs,
+                 bg='#95a5a6', fg='white').pack(side=tk.LEFT, padx=2)
 
         # Right panel - CV preview and stats
         right_frame = tk.Frame(content_frame, bg='#ffffff')
@@ -361,6 +502,10 @@ class CVGeneratorApp:
         self.preview_frame = tk.Frame(right_frame, bg='#ecf0f1', height=400)
         self.preview_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
 
+        self.dashboard_preview = tk.Label(self.preview_frame, text="Sélectionnez un CV pour voir l'aperçu",
+                                          bg='#ecf0f1', fg='#7f8c8d')
+        self.dashboard_preview.pack(fill=tk.BOTH, expand=True, pady=10)
+
         # Stats
         stats_frame = tk.Frame(right_frame, bg='#ffffff')
         stats_frame.pack(fill=tk.X, pady=10)
@@ -395,12 +540,22 @@ class CVGeneratorApp:
         template_combo.pack(side=tk.LEFT, padx=5)
         template_combo.bind('<<ComboboxSelected>>', self.change_template)
 
+        # Publication sur le service public (cv_public.py)
+        self.public_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(header_frame, text="Public", variable=self.public_var, command=self.toggle_public,
+                       bg='#34495e', fg='white', selectcolor='#34495e',
+                       activebackground='#34495e').pack(side=tk.LEFT, padx=10)
+
         # Save buttons
         save_frame = tk.Frame(header_frame, bg='#34495e')
         save_frame.pack(side=tk.RIGHT, padx=20)
 
+        tk.Button(save_frame, text="↶", command=self.undo_edit, width=3).pack(side=tk.LEFT, padx=2)
+        tk.Button(save_frame, text="↷", command=self.redo_edit, width=3).pack(side=tk.LEFT, padx=(2, 10))
         tk.Button(save_frame, text="💾 Sauvegarder", command=self.save_cv,
                  bg='#27ae60', fg='white').pack(side=tk.LEFT, padx=5)
+        self.root.bind('<Control-z>', self.undo_edit)
+        self.root.bind('<Control-y>', self.redo_edit)
         tk.Button(save_frame, text="📤 Exporter PDF", command=self.export_pdf,
                  bg='#e67e22', fg='white').pack(side=tk.LEFT, padx=5)
         tk.Button(save_frame, text="📋 Exporter Word", command=self.export_word,
@@ -419,12 +574,26 @@ class CVGeneratorApp:
         self.sections_notebook = ttk.Notebook(form_frame)
         self.sections_notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
-        # Sections
-        self.setup_personal_section()
-        self.setup_experience_section()
-        self.setup_education_section()
-        self.setup_skills_section_editor()
-        self.setup_languages_section()
+        # Sections: cadres vides, remplis au premier affichage de chaque section
+        sections = [
+            ("personal", "Personnel", self.setup_personal_section),
+            ("experience", "Expérience", self.setup_experience_section),
+            ("education", "Formation", self.setup_education_section),
+            ("skills", "Compétences", self.setup_skills_section_editor),
+            ("languages", "Langues", self.setup_languages_section),
+        ]
+        self.section_frames = {}
+        self.section_builders = {}
+        self.built_sections = set()
+        for name, text, builder in sections:
+            frame = ttk.Frame(self.sections_notebook)
+            self.sections_notebook.add(frame, text=text)
+            self.section_frames[name] = frame
+            self.section_builders[str(frame)] = (name, builder)
+        self.sections_notebook.bind('<<NotebookTabChanged>>', self.on_section_changed)
+
+        # La section Personnel est affichée en premier: construite tout de suite
+        self.ensure_section("personal")
 
         # Right panel - Live preview
         preview_frame = tk.Frame(main_frame, bg='#ffffff')
@@ -432,13 +601,32 @@ class CVGeneratorApp:
 
         tk.Label(preview_frame, text="Aperçu en direct", font=self.subtitle_font, bg='#ffffff').pack(pady=10)
 
-        self.preview_canvas = tk.Canvas(preview_frame, bg='white', relief=tk.SUNKEN, bd=1)
-        self.preview_canvas.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        preview_scroll = tk.Scrollbar(preview_frame, orient=tk.VERTICAL)
+        preview_scroll.pack(side=tk.RIGHT, fill=tk.Y, pady=5)
+        self.preview_canvas = tk.Canvas(preview_frame, bg='#bdc3c7', relief=tk.SUNKEN, bd=1,
+                                        yscrollcommand=preview_scroll.set)
+        self.preview_canvas.pack(fill=tk.BOTH, expand=True, padx=(10, 0), pady=5)
+        preview_scroll.config(command=self.preview_canvas.yview)
+        self.preview_renderer = CanvasRenderer(self.preview_canvas)
+        # nouvelle largeur: pages remises à l'échelle
+        self.preview_canvas.bind('<Configure>', self.update_preview)
+
+    def ensure_section(self, name):
+        """Construit une section de l'éditeur si nécessaire"""
+        if name not in self.built_sections:
+            self.built_sections.add(name)
+            frame = self.section_frames[name]
+            self.section_builders[str(frame)][1]()
+
+    def on_section_changed(self, event=None):
+        """Construit la section sélectionnée au premier affichage"""
+        selected = self.sections_notebook.select()
+        if selected in self.section_builders:
+            self.ensure_section(self.section_builders[selected][0])
 
     def setup_personal_section(self):
         """Configure la section informations personnelles"""
-        frame = ttk.Frame(self.sections_notebook)
-        self.sections_notebook.add(frame, text="Personnel")
+        frame = self.section_frames["personal"]
 
         # Photo upload
         photo_frame = tk.Frame(frame, bg='#ffffff')
@@ -472,21 +660,117 @@ class CVGeneratorApp:
             entry = tk.Entry(personal_frame, textvariable=var, width=30)
             entry.grid(row=i, column=1, pady=2, padx=5)
             entry.bind('<KeyRelease>', self.update_preview)
+            var.trace_add('write', lambda *args, name=var_name: self.on_personal_edit(name))
             self.personal_vars[var_name] = var
 
         # Description
         tk.Label(personal_frame, text="Description:", bg='#ffffff').grid(row=len(fields), column=0, sticky='ne', pady=2, padx=5)
         self.personal_description = scrolledtext.ScrolledText(personal_frame, width=30, height=5)
         self.personal_description.grid(row=len(fields), column=1, pady=2, padx=5)
-        self.personal_description.bind('<KeyRelease>', self.update_preview)
+        self.personal_description.bind('<KeyRelease>', self.on_description_edit)
+
+    def on_personal_edit(self, var_name):
+        """Journalise la saisie d'un champ personnel (ignore les remplissages du formulaire)"""
+        field = var_name.replace('personal_', '')
+        value = self.personal_vars[var_name].get()
+        if self.current_cv_id and self.journaled_personal.get(field, '') != value:
+            self.apply_edit({'op': 'set', 'field': field, 'value': value})
+
+    def on_description_edit(self, event=None):
+        """Aperçu immédiat; la description est journalisée après une courte pause de frappe"""
+        self.update_preview()
+        if self.description_job:
+            self.root.after_cancel(self.description_job)
+        self.description_job = self.root.after(400, self.journal_description)
+
+    def journal_description(self):
+        self.description_job = None
+        value = self.personal_description.get(1.0, tk.END).strip()
+        if self.current_cv_id and self.journaled_personal.get('description', '') != value:
+            self.apply_edit({'op': 'set', 'field': 'description', 'value': value})
+
+    def apply_edit(self, op, undoable=True):
+        """Point unique de modification du CV ouvert: met à jour l'état, l'historique et le journal"""
+        self.cv_model.apply(op)
+        if op['op'] == 'set':
+            field, value = op['field'], op['value']
+            self.journaled_personal[field] = value
+            if field == 'description':
+                if self.personal_description.get(1.0, tk.END).strip() != value:
+                    self.personal_description.delete(1.0, tk.END)
+                    self.personal_description.insert(1.0, value)
+            elif self.personal_vars['personal_' + field].get() != value:
+                self.personal_vars['personal_' + field].set(value)
+        else:
+            if op['section'] == 'experience':
+                self.refresh_experience_list()
+            elif op['section'] == 'education':
+                self.refresh_education_list()
+            else:
+                self.refresh_languages_list()
+            self.update_preview()
+        if undoable:
+            self.history.push(op)
+        try:
+            self.journal.append(op)
+        except OSError as e:
+            print(f"[DEBUG] Journal des modifications: {e}")
+
+    def undo_edit(self, event=None):
+        """Annule la dernière modification du CV ouvert (Ctrl+Z)"""
+        self.replay_history(self.history.undo)
+        return "break" if event else None
+
+    def redo_edit(self, event=None):
+        """Rétablit la dernière modification annulée (Ctrl+Y)"""
+        self.replay_history(self.history.redo)
+        return "break" if event else None
+
+    def replay_history(self, move):
+        if not self.current_cv_id:
+            return
+        # description en cours de frappe: l'enregistrer comme étape avant de se déplacer
+        if self.description_job:
+            self.root.after_cancel(self.description_job)
+            self.journal_description()
+        for op in move():
+            self.apply_edit(op, undoable=False)
+
+    def recover_journal(self):
+        """Rejoue le journal laissé par une exécution interrompue et enregistre le CV"""
+        header, ops = read_journal(self.journal.path)
+        if not ops:
+            return
+        cv_id = header['cv']
+        try:
+            current = self.service.cv_version(cv_id)
+            if current is None:
+                self.journal.discard()
+                return
+            version, updated_at = current
+            # journaux antérieurs à cvs.version: base = updated_at
+            if header['base'] not in (version, updated_at):
+                # CV modifié ailleurs depuis: les index du journal ne sont plus fiables
+                os.replace(self.journal.path, self.journal.path + ".conflict")
+                print(f"[DEBUG] Journal non rejoué (CV {cv_id} modifié depuis), conservé dans {self.journal.path}.conflict")
+                return
+            cv = self.service.get_cv(cv_id, version)
+            data = cv['data']
+            for op in ops:
+                apply_op(data, op)
+            self.service.save_cv(cv_id, data, cv['photo_path'], cv['template'])
+        except (sqlite3.Error, JournalError, LookupError, TypeError) as e:
+            messagebox.showerror("Erreur", f"Récupération des modifications impossible: {e}")
+            return
+        self.journal.discard()
+        messagebox.showinfo("Récupération", f"{len(ops)} modification(s) non sauvegardée(s) ont été restaurées")
 
     # -----------------------
     # Experience Section (full)
     # -----------------------
     def setup_experience_section(self):
         """Configure la section expérience professionnelle"""
-        frame = ttk.Frame(self.sections_notebook)
-        self.sections_notebook.add(frame, text="Expérience")
+        frame = self.section_frames["experience"]
 
         # Experience list and buttons
         exp_frame = tk.Frame(frame, bg='#ffffff')
@@ -546,6 +830,9 @@ class CVGeneratorApp:
         tk.Button(self.experience_form_frame, text="💾 Sauvegarder", command=self.save_experience,
                  bg='#27ae60', fg='white').grid(row=4, column=1, columnspan=2, pady=10)
 
+        # Afficher les données du CV déjà chargé
+        self.refresh_experience_list()
+
     def on_experience_current_toggle(self):
         """Désactive la date de fin si 'En cours' est coché"""
         if self.experience_vars.get('exp_current') and self.experience_vars['exp_current'].get():
@@ -586,9 +873,7 @@ class CVGeneratorApp:
             return
         idx = sel[0]
         if messagebox.askyesno("Confirmation", "Supprimer cette expérience ?"):
-            del self.experience_data[idx]
-            self.refresh_experience_list()
-            self.update_preview()
+            self.apply_edit({'op': 'delete', 'section': 'experience', 'index': idx})
 
     def on_experience_select(self, event=None):
         """Affiche un aperçu rapide de l'expérience sélectionnée"""
@@ -596,12 +881,7 @@ class CVGeneratorApp:
         if not sel:
             return
         idx = sel[0]
-        exp = self.experience_data[idx]
-        # afficher description dans preview canvas ou dans un petit popup
-        preview_text = f"{exp.get('position','')} - {exp.get('company','')}\n{exp.get('start_date','')} - {exp.get('end_date','') if not exp.get('current') else 'Présent'}\n\n{exp.get('description','')[:300]}"
-        # petite fenêtre info (non intrusive)
-        self.preview_canvas.delete("all")
-        self.preview_canvas.create_text(10, 10, anchor='nw', text=preview_text, font=("Arial", 10), fill="black")
+        self.show_preview_anchor('experience', idx)
 
     def save_experience(self):
         """Sauvegarde l'expérience en cours (ajout ou mise à jour)"""
@@ -629,19 +909,20 @@ class CVGeneratorApp:
 
         if self.editing_experience_index is None:
             # ajouter
-            self.experience_data.insert(0, entry)
+            self.apply_edit({'op': 'insert', 'section': 'experience', 'index': 0, 'value': entry})
         else:
             # mise à jour
-            self.experience_data[self.editing_experience_index] = entry
+            self.apply_edit({'op': 'replace', 'section': 'experience',
+                             'index': self.editing_experience_index, 'value': entry})
             self.editing_experience_index = None
 
-        self.refresh_experience_list()
         self.clear_experience_form()
-        self.update_preview()
         messagebox.showinfo("Succès", "Expérience sauvegardée")
 
     def refresh_experience_list(self):
         """Met à jour la listbox d'expériences"""
+        if "experience" not in self.built_sections:
+            return
         self.experience_listbox.delete(0, tk.END)
         for exp in self.experience_data:
             label = f"{exp.get('position','')} - {exp.get('company','')} ({exp.get('start_date','')}{' - Présent' if exp.get('current') else (' - ' + (exp.get('end_date','') or ''))})"
@@ -661,8 +942,7 @@ class CVGeneratorApp:
     # -----------------------
     def setup_education_section(self):
         """Configure la section formation"""
-        frame = ttk.Frame(self.sections_notebook)
-        self.sections_notebook.add(frame, text="Formation")
+        frame = self.section_frames["education"]
 
         # Listbox
         ed_frame = tk.Frame(frame, bg='#ffffff')
@@ -707,6 +987,8 @@ class CVGeneratorApp:
         tk.Button(self.education_form_frame, text="💾 Sauvegarder", command=self.save_education,
                  bg='#27ae60', fg='white').grid(row=len(ed_fields), column=1, pady=10)
 
+        self.refresh_education_list()
+
     def add_education(self):
         self.clear_education_form()
         self.editing_education_index = None
@@ -736,9 +1018,7 @@ class CVGeneratorApp:
             return
         idx = sel[0]
         if messagebox.askyesno("Confirmation", "Supprimer cette formation ?"):
-            del self.education_data[idx]
-            self.refresh_education_list()
-            self.update_preview()
+            self.apply_edit({'op': 'delete', 'section': 'education', 'index': idx})
 
     def save_education(self):
         degree = self.education_vars['ed_degree'].get().strip()
@@ -759,17 +1039,18 @@ class CVGeneratorApp:
         }
 
         if self.editing_education_index is None:
-            self.education_data.insert(0, entry)
+            self.apply_edit({'op': 'insert', 'section': 'education', 'index': 0, 'value': entry})
         else:
-            self.education_data[self.editing_education_index] = entry
+            self.apply_edit({'op': 'replace', 'section': 'education',
+                             'index': self.editing_education_index, 'value': entry})
             self.editing_education_index = None
 
-        self.refresh_education_list()
         self.clear_education_form()
-        self.update_preview()
         messagebox.showinfo("Succès", "Formation sauvegardée")
 
     def refresh_education_list(self):
+        if "education" not in self.built_sections:
+            return
         self.education_listbox.delete(0, tk.END)
         for ed in self.education_data:
             label = f"{ed.get('degree','')} - {ed.get('school','')} ({ed.get('start_year','')}{' - ' + ed.get('end_year','') if ed.get('end_year') else ''})"
@@ -785,18 +1066,14 @@ class CVGeneratorApp:
         if not sel:
             return
         idx = sel[0]
-        ed = self.education_data[idx]
-        preview_text = f"{ed.get('degree','')} - {ed.get('school','')}\n{ed.get('start_year','')} - {ed.get('end_year','')}\n\n{ed.get('description','')[:300]}"
-        self.preview_canvas.delete("all")
-        self.preview_canvas.create_text(10, 10, anchor='nw', text=preview_text, font=("Arial", 10), fill="black")
+        self.show_preview_anchor('education', idx)
 
     # -----------------------
     # Skills (editor tab)
     # -----------------------
     def setup_skills_section_editor(self):
         """Configure la section compétences dans l'éditeur"""
-        frame = ttk.Frame(self.sections_notebook)
-        self.sections_notebook.add(frame, text="Compétences")
+        frame = self.section_frames["skills"]
 
         tk.Label(frame, text="Gérez vos compétences dans l'onglet 'Compétences'",
                  bg='#ffffff').pack(pady=50)
@@ -806,8 +1083,7 @@ class CVGeneratorApp:
     # -----------------------
     def setup_languages_section(self):
         """Configure la section langues"""
-        frame = ttk.Frame(self.sections_notebook)
-        self.sections_notebook.add(frame, text="Langues")
+        frame = self.section_frames["languages"]
 
         lang_frame = tk.Frame(frame, bg='#ffffff')
         lang_frame.pack(fill=tk.BOTH, expand=True)
@@ -831,13 +1107,15 @@ class CVGeneratorApp:
         tk.Entry(self.language_form_frame, textvariable=self.language_name_var, width=25).grid(row=0, column=1, pady=2, padx=5)
 
         tk.Label(self.language_form_frame, text="Niveau:", bg='#ffffff').grid(row=1, column=0, sticky='e', pady=2, padx=5)
-        self.language_level = ttk.Combobox(self.language_form_frame, values=["Débutant", "Intermédiaire", "Avancé", "Courant"], state="readonly", width=22)
+        self.language_level = ttk.Combobox(self.language_form_frame, values=list(self.LANGUAGE_LEVELS), state="readonly", width=22)
         self.language_level.set("Intermédiaire")
         self.language_level.grid(row=1, column=1, pady=2, padx=5)
 
         tk.Button(self.language_form_frame, text="💾 Sauvegarder", command=self.save_language,
                  bg='#27ae60', fg='white').grid(row=2, column=1, pady=10)
 
+        self.refresh_languages_list()
+
     def add_language(self):
         self.language_name_var.set('')
         self.language_level.set('Intermédiaire')
@@ -863,9 +1141,7 @@ class CVGeneratorApp:
             return
         idx = sel[0]
         if messagebox.askyesno("Confirmation", "Supprimer cette langue ?"):
-            del self.languages_data[idx]
-            self.refresh_languages_list()
-            self.update_preview()
+            self.apply_edit({'op': 'delete', 'section': 'languages', 'index': idx})
 
     def save_language(self):
         name = self.language_name_var.get().strip()
@@ -875,15 +1151,16 @@ class CVGeneratorApp:
             return
         entry = {"name": name, "level": level}
         if self.editing_language_index is None:
-            self.languages_data.insert(0, entry)
+            self.apply_edit({'op': 'insert', 'section': 'languages', 'index': 0, 'value': entry})
         else:
-            self.languages_data[self.editing_language_index] = entry
+            self.apply_edit({'op': 'replace', 'section': 'languages',
+                             'index': self.editing_language_index, 'value': entry})
             self.editing_language_index = None
-        self.refresh_languages_list()
-        self.update_preview()
         messagebox.showinfo("Succès", "Langue sauvegardée")
 
     def refresh_languages_list(self):
+        if "languages" not in self.built_sections:
+            return
         self.languages_listbox.delete(0, tk.END)
         for l in self.languages_data:
             self.languages_listbox.insert(tk.END, f"{l.get('name')} ({l.get('level')})")
@@ -893,10 +1170,7 @@ class CVGeneratorApp:
         if not sel:
             return
         idx = sel[0]
-        l = self.languages_data[idx]
-        preview_text = f"{l.get('name')} - {l.get('level')}"
-        self.preview_canvas.delete("all")
-        self.preview_canvas.create_text(10, 10, anchor='nw', text=preview_text, font=("Arial", 10), fill="black")
+        self.show_preview_anchor('languages', idx)
 
     # -----------------------
     # Skills Tab (global)
@@ -922,7 +1196,7 @@ class CVGeneratorApp:
         list_frame = tk.Frame(frame, bg='#ffffff')
         list_frame.pack(fill=tk.BOTH, expand=True, pady=10)
 
-        self.skills_listbox = tk.Listbox(list_frame, height=15)
+        self.skills_listbox = tk.Listbox(list_frame, height=15, selectmode=tk.EXTENDED)
         self.skills_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(0, 10))
 
         # Level selection
@@ -930,7 +1204,7 @@ class CVGeneratorApp:
         level_frame.pack(side=tk.RIGHT, fill=tk.Y)
 
         tk.Label(level_frame, text="Niveau:", bg='#ffffff').pack()
-        self.skill_level = ttk.Combobox(level_frame, values=["Débutant", "Intermédiaire", "Avancé", "Expert"],
+        self.skill_level = ttk.Combobox(level_frame, values=list(self.SKILL_LEVELS),
                                        state="readonly", width=12)
         self.skill_level.set("Intermédiaire")
         self.skill_level.pack(pady=5)
@@ -948,7 +1222,8 @@ class CVGeneratorApp:
 
         tk.Label(user_skills_frame, text="Mes Compétences:", bg='#ffffff').pack(anchor='w')
 
-        self.user_skills_tree = ttk.Treeview(user_skills_frame, columns=('level', 'experience'), height=8)
+        self.user_skills_tree = ttk.Treeview(user_skills_frame, columns=('level', 'experience'), height=8,
+                                             selectmode='extended')
         self.user_skills_tree.heading('#0', text='Compétence')
         self.user_skills_tree.heading('level', text='Niveau')
         self.user_skills_tree.heading('experience', text='Expérience (ans)')
@@ -968,18 +1243,26 @@ class CVGeneratorApp:
 
         # Load initial predefined skills
         self.filter_skills()
+        self.load_user_skills()
 
     def filter_skills(self, event=None):
         """Filtre la liste des compétences"""
-        search_term = self.skill_search.get().lower() if hasattr(self, 'skill_search') else ''
+        search_term = self.skill_search.get() if hasattr(self, 'skill_search') else ''
         self.skills_listbox.delete(0, tk.END)
 
-        for skill in self.predefined_skills:
-            if search_term in skill.lower():
-                self.skills_listbox.insert(tk.END, skill)
+        if self.skill_names is None:
+            try:
+                self.skill_names = self.service.list_skill_names()
+            except sqlite3.Error as e:
+                messagebox.showerror("Erreur", f"Erreur chargement compétences: {e}")
+                self.skill_names = []
+
+        # Le catalogue peut être volumineux: affichage limité aux premiers résultats
+        matches = filter_skill_names(self.skill_names, search_term, limit=self.MAX_SKILL_RESULTS)
+        self.skills_listbox.insert(tk.END, *matches)
 
     def add_user_skill(self):
-        """Ajoute une compétence à l'utilisateur"""
+        """Ajoute les compétences sélectionnées à l'utilisateur (une transaction)"""
         if not self.current_user:
             messagebox.showwarning("Attention", "Connectez-vous pour ajouter des compétences")
             return
@@ -989,34 +1272,25 @@ class CVGeneratorApp:
             messagebox.showwarning("Attention", "Veuillez sélectionner une compétence")
             return
 
-        skill_name = self.skills_listbox.get(selection[0])
+        skill_names = [self.skills_listbox.get(i) for i in selection]
         level = self.skill_level.current() + 1
         experience = int(self.skill_experience.get())
 
         try:
-            # Récupérer l'ID de la compétence
-            self.cursor.execute('SELECT id FROM skills WHERE name = ?', (skill_name,))
-            r = self.cursor.fetchone()
-            if r:
-                skill_id = r[0]
-            else:
-                # insérer si introuvable
-                self.cursor.execute('INSERT INTO skills (name) VALUES (?)', (skill_name,))
-                self.conn.commit()
-                skill_id = self.cursor.lastrowid
-
-            # Ajouter ou mettre à jour la compétence utilisateur
-            self.cursor.execute('''
-                INSERT OR REPLACE INTO user_skills (user_id, skill_id, level, experience_years)
-                VALUES (?, ?, ?, ?)
-            ''', (self.current_user['id'], skill_id, level, experience))
-
-            self.conn.commit()
-            self.load_user_skills()
-            messagebox.showinfo("Succès", f"Compétence '{skill_name}' ajoutée!")
-
+            # IDs des compétences via le cache du service (insérées si introuvables)
+            skill_ids = self.service.get_skill_ids(skill_names, create=True)
+            rows = [(skill_ids[name], level, experience) for name in skill_names]
+            self.service.set_user_skills(self.current_user['id'], rows)
         except sqlite3.Error as e:
             messagebox.showerror("Erreur", f"Erreur ajout compétence: {e}")
+            return
+
+        for name in skill_names:
+            self.show_user_skill(skill_ids[name], name, level, experience)
+        if len(skill_names) == 1:
+            messagebox.showinfo("Succès", f"Compétence '{skill_names[0]}' ajoutée!")
+        else:
+            messagebox.showinfo("Succès", f"{len(skill_names)} compétences ajoutées!")
 
     def edit_user_skill(self):
         """Modifie la compétence utilisateur sélectionnée (popup simple)"""
@@ -1024,14 +1298,12 @@ class CVGeneratorApp:
         if not sel:
             messagebox.showwarning("Attention", "Sélectionnez une compétence utilisateur")
             return
-        skill_name = self.user_skills_tree.item(sel[0])['text']
-        # récupère niv et exp actuels
-        cur_values = self.user_skills_tree.item(sel[0])['values']
-        cur_level = cur_values[0] if cur_values else "Intermédiaire"
-        cur_exp = int(cur_values[1].split()[0]) if cur_values and cur_values[1] else 0
+        skill_id = self.user_skill_id(sel[0])
+        skill_name, cur_level, cur_exp = self.user_skill_rows[skill_id]
 
         # Simpledialog pour modifier
-        new_level = simpledialog.askstring("Modifier niveau", f"Nouveau niveau pour {skill_name} (Débutant/Intermédiaire/Avancé/Expert):", initialvalue=cur_level)
+        new_level = simpledialog.askstring("Modifier niveau", f"Nouveau niveau pour {skill_name} (Débutant/Intermédiaire/Avancé/Expert):",
+                                           initialvalue=self.SKILL_LEVELS[cur_level - 1])
         if new_level is None:
             return
         try:
@@ -1040,24 +1312,14 @@ class CVGeneratorApp:
             new_exp = cur_exp
 
         # écrire en base
+        level_index = self.SKILL_LEVELS.index(new_level) + 1 if new_level in self.SKILL_LEVELS else 2
         try:
-            # récupérer skill_id
-            self.cursor.execute('SELECT id FROM skills WHERE name = ?', (skill_name,))
-            r = self.cursor.fetchone()
-            if not r:
-                messagebox.showerror("Erreur", "Compétence introuvable en base")
-                return
-            skill_id = r[0]
-            level_index = ["Débutant", "Intermédiaire", "Avancé", "Expert"].index(new_level) + 1 if new_level in ["Débutant", "Intermédiaire", "Avancé", "Expert"] else 2
-            self.cursor.execute('''
-                INSERT OR REPLACE INTO user_skills (user_id, skill_id, level, experience_years)
-                VALUES (?, ?, ?, ?)
-            ''', (self.current_user['id'], skill_id, level_index, new_exp))
-            self.conn.commit()
-            self.load_user_skills()
-            messagebox.showinfo("Succès", "Compétence mise à jour")
+            self.service.set_user_skill(self.current_user['id'], skill_id, level_index, new_exp)
         except sqlite3.Error as e:
             messagebox.showerror("Erreur", f"Erreur mise à jour compétence: {e}")
+            return
+        self.show_user_skill(skill_id, skill_name, level_index, new_exp)
+        messagebox.showinfo("Succès", "Compétence mise à jour")
 
     # -----------------------
     # User management functions
@@ -1071,49 +1333,211 @@ class CVGeneratorApp:
             messagebox.showerror("Erreur", "Veuillez remplir tous les champs")
             return
 
+        interactive_span = self.tracer.start_span("login_to_interactive")
+        loaded_span = self.tracer.start_span("login_to_dashboard_loaded")
         try:
-            password_hash = self.hash_password(password)
-            self.cursor.execute('SELECT id, first_name, last_name, role FROM users WHERE email = ? AND password_hash = ? AND is_active = 1',
-                                (email, password_hash))
-            user = self.cursor.fetchone()
+            user = self.service.authenticate(email, password)
 
             if user:
-                self.current_user = {
-                    'id': user[0],
-                    'first_name': user[1],
-                    'last_name': user[2],
-                    'role': user[3],
-                    'email': email
-                }
-
-                # Mettre à jour la dernière connexion
-                self.cursor.execute('UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?', (user[0],))
-                self.conn.commit()
-
-                # Mettre à jour l'interface
-                self.update_user_info()
-                self.load_user_cvs()
-                self.load_user_skills()
-
-                # Afficher les onglets appropriés
-                self.notebook.tab(2, state='normal')  # Dashboard
-                self.notebook.tab(3, state='normal')  # Editor
-                self.notebook.tab(4, state='normal')  # Skills
-                # masquer login/register
-                try:
-                    self.notebook.hide(0)  # Cacher login
-                    self.notebook.hide(1)  # Cacher register
-                except Exception:
-                    pass
+                # Dernière connexion: écriture différée (DeferredWriter)
+                self.service.touch_last_login(user['id'])
+                self.remember_session(user)
+
+                # Afficher le tableau de bord tout de suite, les données suivent
+                self.enter_session(user)
+                self.cv_listbox.delete(0, tk.END)
+                self.cv_listbox.insert(tk.END, "Chargement...")
+                self.cv_ids = []
+                self.prefetch_dashboard(loaded_span)
                 self.notebook.select(2)  # Afficher dashboard
+                self.root.after_idle(lambda: self.tracer.end_span(interactive_span))
 
-                messagebox.showinfo("Succès", f"Bienvenue {user[1]} {user[2]}!")
+                messagebox.showinfo("Succès", f"Bienvenue {user['first_name']} {user['last_name']}!")
             else:
                 messagebox.showerror("Erreur", "Email ou mot de passe incorrect")
 
         except sqlite3.Error as e:
             messagebox.showerror("Erreur", f"Erreur de connexion: {e}")
 
+    def enter_session(self, user):
+        """Passe l'interface en mode connecté (onglets privés visibles)"""
+        self.current_user = user
+        self.login_generation += 1
+        self.ensure_tab(self.dashboard_tab)
+        self.update_user_info()
+
+        # Afficher les onglets appropriés
+        self.notebook.tab(2, state='normal')  # Dashboard
+        self.notebook.tab(3, state='normal')  # Editor
+        self.notebook.tab(4, state='normal')  # Skills
+        if user.get('role') == 'recruteur':
+            self.notebook.tab(5, state='normal')  # Recherche de candidats
+        # masquer login/register
+        try:
+            self.notebook.hide(0)  # Cacher login
+            self.notebook.hide(1)  # Cacher register
+        except Exception:
+            pass
+
+    # -----------------------
+    # Session mémorisée
+    # -----------------------
+    def remember_session(self, user):
+        """Crée (ou oublie) la session persistante selon la case "Se souvenir de moi"""
+        self.forget_session()
+        if not self.remember_var.get():
+            return
+        try:
+            token, expires_at = self.service.create_session(user['id'])
+        except sqlite3.Error as e:
+            print(f"[DEBUG] Session non mémorisée: {e}")
+            return
+        self.session = {'token': token, 'expires_at': expires_at, 'user': user, 'cvs': [], 'cv': None}
+        self.save_session_snapshot()
+
+    def forget_session(self):
+        """Révoque la session mémorisée (base + fichier local)"""
+        session = self.session or self.session_store.load()
+        self.session = None
+        self.session_store.clear()
+        if session:
+            try:
+                self.service.delete_session(session['token'])
+            except sqlite3.Error as e:
+                print(f"[DEBUG] Révocation de session impossible: {e}")
+
+    def save_session_snapshot(self):
+        """Enregistre l'instantané du CV ouvert (version en base) et de la liste des CVs"""
+        if not self.session or not self.current_user:
+            return
+        session = dict(self.session, user=self.current_user)
+        session['cvs'] = [[cv_id, None, None, self.cv_versions.get(cv_id)] for cv_id in self.cv_ids]
+        for row, title in zip(session['cvs'], self.cv_listbox.get(0, tk.END)):
+            row[1] = title
+        session['cv'] = None
+        if self.current_cv_id:
+            try:
+                cv = self.service.get_cv(self.current_cv_id, self.cv_versions.get(self.current_cv_id))
+            except sqlite3.Error:
+                cv = None
+            if cv:
+                session['cv'] = {
+                    'id': self.current_cv_id,
+                    'version': self.cv_versions.get(self.current_cv_id),
+                    'template': cv['template'],
+                    'photo_path': cv['photo_path'],
+                    'data': pack_cv_data(cv['data']),
+                    'thumbnail': make_thumbnail(cv['photo_path']),
+                }
+        try:
+            self.session_store.save(session)
+        except OSError as e:
+            print(f"[DEBUG] Instantané de session impossible: {e}")
+
+    def restore_session(self):
+        """Affiche l'instantané de la session mémorisée puis le réconcilie avec la base"""
+        session = self.session_store.load()
+        if not session or session['expires_at'] <= utc_now():
+            return
+        span = self.tracer.start_span("warm_start_to_editor")
+        self.session = session
+        self.enter_session(session['user'])
+
+        # Liste des CVs telle qu'au dernier lancement (titres déjà formatés)
+        self.cv_listbox.delete(0, tk.END)
+        self.cv_ids = [row[0] for row in session['cvs']]
+        self.cv_versions = {row[0]: row[3] for row in session['cvs']}
+        for row in session['cvs']:
+            self.cv_listbox.insert(tk.END, row[1])
+        self.schedule_thumbnail_scan()
+
+        snap = session.get('cv')
+        if snap:
+            cv = {'data': unpack_cv_data(snap['data']), 'photo_path': snap['photo_path'],
+                  'template': snap['template']}
+            self.show_cv(snap['id'], cv, thumbnail=snap.get('thumbnail'))
+            self.notebook.select(3)
+            self.update_preview()
+        else:
+            self.notebook.select(2)
+        self.root.after_idle(lambda: self.tracer.end_span(span))
+
+        self.reconcile_session(session)
+
+    def reconcile_session(self, session):
+        """Vérifie le jeton et rafraîchit liste, CV et statistiques en arrière-plan"""
+        generation = self.login_generation
+        snap = session.get('cv')
+
+        def fetch():
+            user = self.service.resume_session(session['token'])
+            if user is None:
+                return None
+            cvs = self.service.list_user_cvs(user['id'])
+            stats = self.service.cv_stats(snap['id']) if snap else None
+            return user, cvs, stats
+
+        def done(result):
+            if generation != self.login_generation:
+                return
+            if result is None:
+                self.logout()
+                messagebox.showinfo("Session expirée", "Veuillez vous reconnecter")
+                return
+            user, cvs, stats = result
+            self.current_user = user
+            self.update_user_info()
+            self.service.touch_last_login(user['id'])
+            self.show_user_cvs(cvs)
+            if snap and self.current_cv_id == snap['id']:
+                if snap['id'] not in self.cv_versions:
+                    # CV supprimé depuis: retour au tableau de bord
+                    self.current_cv_id = None
+                    self.notebook.select(2)
+                elif self.cv_versions[snap['id']] != snap['version']:
+                    # modifié ailleurs depuis l'instantané: recharger depuis la base
+                    self.load_cv_data(snap['id'])
+                elif stats:
+                    self.show_stats(stats)
+
+        def failed(e):
+            if generation == self.login_generation:
+                messagebox.showerror("Erreur", f"Erreur reprise de session: {e}")
+
+        self.background.submit(fetch, on_done=done, on_error=failed)
+        self.background.submit(self.service.list_user_skills, session['user']['id'],
+                               on_done=lambda rows: generation == self.login_generation and self.show_user_skills(rows))
+
+    def prefetch_dashboard(self, span=None):
+        """Charge en arrière-plan les CVs (+ statistiques du plus récent) et les compétences"""
+        user_id = self.current_user['id']
+        generation = self.login_generation
+
+        def fetch_cvs():
+            cvs = self.service.list_user_cvs(user_id)
+            stats = self.service.cv_stats(cvs[0][0]) if cvs else None
+            return cvs, stats
+
+        def cvs_loaded(result):
+            if generation != self.login_generation:
+                return
+            cvs, stats = result
+            self.show_user_cvs(cvs)
+            if stats:
+                self.show_stats(stats, title=cvs[0][1])
+            self.tracer.end_span(span)
+
+        def skills_loaded(rows):
+            if generation == self.login_generation:
+                self.show_user_skills(rows)
+
+        def failed(e):
+            if generation == self.login_generation:
+                messagebox.showerror("Erreur", f"Erreur chargement tableau de bord: {e}")
+
+        self.background.submit(fetch_cvs, on_done=cvs_loaded, on_error=failed)
+        self.background.submit(self.service.list_user_skills, user_id, on_done=skills_loaded, on_error=failed)
+
     def register(self):
         """Gère l'inscription"""
         # Récupérer les données du formulaire
@@ -1138,20 +1562,11 @@ class CVGeneratorApp:
             return
 
         try:
-            # Vérifier si l'email existe déjà
-            self.cursor.execute('SELECT id FROM users WHERE email = ?', (email,))
-            if self.cursor.fetchone():
+            # Insérer l'utilisateur (refusé si l'email existe déjà)
+            if self.service.create_user(email, password, first_name, last_name, role) is None:
                 messagebox.showerror("Erreur", "Cet email est déjà utilisé")
                 return
 
-            # Hasher le mot de passe
-            password_hash = self.hash_password(password)
-
-            # Insérer l'utilisateur
-            self.cursor.execute('INSERT INTO users (email, password_hash, first_name, last_name, role) VALUES (?, ?, ?, ?, ?)',
-                                (email, password_hash, first_name, last_name, role))
-            self.conn.commit()
-
             messagebox.showinfo("Succès", "Compte créé avec succès! Vous pouvez maintenant vous connecter.")
             self.notebook.select(0)  # Retour à la connexion
 
@@ -1179,14 +1594,18 @@ class CVGeneratorApp:
 
     def logout(self):
         """Déconnecte l'utilisateur"""
+        self.forget_session()
         self.current_user = None
         self.current_cv_id = None
+        self.login_generation += 1
+        self.prefetched_user_skills = None
 
         # Réinitialiser l'interface: masquer onglets privés et revenir au login
         try:
             self.notebook.hide(2)
             self.notebook.hide(3)
             self.notebook.hide(4)
+            self.notebook.hide(5)
         except Exception:
             pass
 
@@ -1209,79 +1628,185 @@ class CVGeneratorApp:
     # -----------------------
     def load_user_cvs(self):
         """Charge les CVs de l'utilisateur et stocke correctement les IDs"""
+        if not self.current_user:
+            self.show_user_cvs([])
+            return
+        try:
+            cvs = self.service.list_user_cvs(self.current_user['id'])
+        except sqlite3.Error as e:
+            self.show_user_cvs([])
+            messagebox.showerror("Erreur", f"Erreur chargement CVs: {e}")
+            return
+        self.show_user_cvs(cvs)
+
+    def show_user_cvs(self, cvs):
+        """Remplit cv_listbox avec les lignes de list_user_cvs"""
         self.cv_listbox.delete(0, tk.END)
         self.cv_ids = []
+        self.cv_versions = {}
+        for cv_id, title, created_at, version in cvs:
+            display_title = f"{title} ({created_at[:10]})" if created_at else title
+            self.cv_listbox.insert(tk.END, display_title)
+            self.cv_ids.append(cv_id)
+            self.cv_versions[cv_id] = version
+        # Miniatures déjà chargées: remises sur les nouvelles lignes
+        self.thumbnail_images = {cv_id: entry for cv_id, entry in self.thumbnail_images.items()
+                                 if cv_id in self.cv_versions}
+        for idx, cv_id in enumerate(self.cv_ids):
+            if cv_id in self.thumbnail_images:
+                self.cv_listbox.set_image(idx, self.thumbnail_images[cv_id][2])
+        self.schedule_thumbnail_scan()
+
+    def selected_cv_id(self):
+        """ID du CV sélectionné dans la liste, ou None"""
+        selection = self.cv_listbox.curselection()
+        if selection and selection[0] < len(self.cv_ids):
+            return self.cv_ids[selection[0]]
+        return None
 
-        if self.current_user:
-            try:
-                self.cursor.execute('SELECT id, title, created_at FROM cvs WHERE user_id = ? ORDER BY updated_at DESC',
-                                    (self.current_user['id'],))
-                cvs = self.cursor.fetchall()
+    def on_cv_select(self, event):
+        """Gère la sélection d'un CV: aperçu et statistiques, sans ouvrir l'éditeur"""
+        cv_id = self.selected_cv_id()
+        if cv_id is not None:
+            self.show_dashboard_preview(cv_id)
+            self.update_stats(cv_id)
 
-                for cv_id, title, created_at in cvs:
-                    display_title = f"{title} ({created_at[:10]})" if created_at else title
-                    self.cv_listbox.insert(tk.END, display_title)
-                    self.cv_ids.append(cv_id)
+    def open_selected_cv(self, event=None):
+        """Ouvre le CV sélectionné dans l'éditeur (double-clic, Entrée ou bouton Ouvrir)"""
+        cv_id = self.selected_cv_id()
+        if cv_id is None:
+            return
+        span = self.tracer.start_span("cv_click_to_editor_ready")
+        self.load_cv_data(cv_id)
+        # l'éditeur est prêt une fois les redessins en attente traités
+        self.root.after_idle(lambda: self.tracer.end_span(span))
 
+    # -----------------------
+    # Miniatures (tableau de bord)
+    # -----------------------
+    def schedule_thumbnail_scan(self):
+        """Programme le chargement des miniatures visibles (un seul par rafale de défilement)"""
+        if self.thumbnail_scan_job is None:
+            self.thumbnail_scan_job = self.root.after(50, self.load_visible_thumbnails)
+
+    def load_visible_thumbnails(self):
+        self.thumbnail_scan_job = None
+        rows = [self.cv_ids[idx] for idx in self.cv_listbox.visible_range() if idx < len(self.cv_ids)]
+        self.load_thumbnails(rows)
+
+    def load_thumbnails(self, cv_ids):
+        """Affiche les miniatures à jour des CVs donnés; demande la génération des autres"""
+        wanted = [cv_id for cv_id in cv_ids
+                  if self.thumbnail_images.get(cv_id, (None,))[0] != self.cv_versions.get(cv_id)]
+        if not wanted or not self.current_user:
+            return
+        try:
+            known = self.service.cv_thumbnails(wanted)
+        except sqlite3.Error as e:
+            print(f"[DEBUG] Miniatures: {e}")
+            return
+        missing = []
+        for cv_id in wanted:
+            entry = known.get(cv_id)
+            version = self.cv_versions.get(cv_id)
+            if entry and entry[1] == version:
+                if self.show_thumbnail(cv_id, entry[0], entry[1]):
+                    continue
+                # miniature à jour en base mais fichier illisible ou supprimé: une seule régénération
+                if (cv_id, version) in self.thumbnail_regenerated:
+                    continue
+                self.thumbnail_regenerated.add((cv_id, version))
+                self.thumbnail_requested.discard((cv_id, version))
+            missing.append(cv_id)
+        self.request_thumbnails(missing)
+
+    def show_thumbnail(self, cv_id, key, version):
+        """Charge la petite miniature d'un CV dans sa ligne; False si le fichier manque"""
+        small, _ = thumbnail_paths(key)
+        try:
+            image = tk.PhotoImage(file=small)
+        except tk.TclError:
+            return False
+        self.thumbnail_images[cv_id] = (version, key, image)
+        if cv_id in self.cv_ids:
+            self.cv_listbox.set_image(self.cv_ids.index(cv_id), image)
+        return True
+
+    def request_thumbnails(self, cv_ids):
+        """Ajoute les tâches "thumbnail" des CVs qui n'en ont pas déjà une en
+        attente, une seule fois par version. Les PNG sont écrits dans le dossier
+        local: les tâches sont réservées au worker intégré."""
+        cv_ids = [cv_id for cv_id in cv_ids if cv_id not in self.thumbnail_jobs
+                  and (cv_id, self.cv_versions.get(cv_id)) not in self.thumbnail_requested]
+        if not cv_ids:
+            return
+        try:
+            job_ids = self.jobs.enqueue_many('thumbnail', [{'cv_id': cv_id} for cv_id in cv_ids],
+                                             owner=self.job_worker.name)
+        except sqlite3.Error as e:
+            print(f"[DEBUG] Miniatures: {e}")
+            return
+        self.thumbnail_requested.update((cv_id, self.cv_versions.get(cv_id)) for cv_id in cv_ids)
+        self.thumbnail_jobs.update(zip(cv_ids, job_ids))
+        self.job_worker.wake()
+        if self.thumbnail_poll_job is None:
+            self.thumbnail_poll_job = self.root.after(self.THUMBNAIL_POLL_MS, self.poll_thumbnail_jobs)
+
+    def poll_thumbnail_jobs(self):
+        """Affiche les miniatures des tâches terminées; reprogrammé tant qu'il en reste"""
+        self.thumbnail_poll_job = None
+        selected = self.selected_cv_id()
+        outdated = []
+        for cv_id, job_id in list(self.thumbnail_jobs.items()):
+            try:
+                job = self.jobs.get(job_id)
             except sqlite3.Error as e:
-                messagebox.showerror("Erreur", f"Erreur chargement CVs: {e}")
-
-    def on_cv_select(self, event):
-        """Gère la sélection d'un CV"""
-        selection = self.cv_listbox.curselection()
-        if selection and self.cv_ids:
-            idx = selection[0]
-            if idx < len(self.cv_ids):
-                cv_id = self.cv_ids[idx]
-                self.load_cv_data(cv_id)
+                print(f"[DEBUG] Miniatures: {e}")
+                break
+            if job is not None and job['state'] not in ('done', 'failed'):
+                continue
+            del self.thumbnail_jobs[cv_id]
+            if job is None or job['state'] == 'failed':
+                print(f"[DEBUG] Miniature du CV {cv_id}: {job['last_error'] if job else 'tâche perdue'}")
+                continue
+            result = job['result']
+            if self.show_thumbnail(cv_id, result['hash'], result['version']) and cv_id == selected:
+                self.show_dashboard_preview(cv_id)
+            # tâche lancée avant la dernière sauvegarde: une nouvelle est nécessaire
+            if result['version'] < (self.cv_versions.get(cv_id) or 0):
+                outdated.append(cv_id)
+        self.request_thumbnails(outdated)
+        if self.thumbnail_jobs and self.thumbnail_poll_job is None:
+            self.thumbnail_poll_job = self.root.after(self.THUMBNAIL_POLL_MS, self.poll_thumbnail_jobs)
+
+    def show_dashboard_preview(self, cv_id):
+        """Affiche la grande miniature du CV dans le panneau Aperçu du tableau de bord"""
+        if cv_id not in self.thumbnail_images:
+            self.load_thumbnails([cv_id])
+        entry = self.thumbnail_images.get(cv_id)
+        if entry:
+            _, large = thumbnail_paths(entry[1])
+            try:
+                self.dashboard_preview_image = tk.PhotoImage(file=large)
+            except tk.TclError:
+                self.dashboard_preview_image = None
+            if self.dashboard_preview_image is not None:
+                self.dashboard_preview.config(image=self.dashboard_preview_image, text='')
+                return
+        self.dashboard_preview.config(image='', text="Aperçu en préparation...")
 
     def load_cv_data(self, cv_id):
         """Charge les données d'un CV spécifique"""
+        self.ensure_tab(self.editor_tab)
         try:
-            self.cursor.execute('SELECT data, photo_path, template FROM cvs WHERE id = ?', (cv_id,))
-            row = self.cursor.fetchone()
+            # version connue par la liste: le cache est utilisé si elle n'a pas changé
+            cv = self.service.get_cv(cv_id, self.cv_versions.get(cv_id))
 
-            if not row:
+            if not cv:
                 messagebox.showerror("Erreur", "CV introuvable en base")
                 return
 
-            data_json, photo_path, template = row
-            data = json.loads(data_json) if data_json else {}
-
-            self.current_cv_id = cv_id
-            self.photo_path = photo_path
-            self.template_var.set(template or 'classic')
-
-            # Remplir les champs du formulaire - personnel
-            personal_data = data.get('personal', {})
-            # keys in personal_vars are like 'personal_first_name' -> remove prefix to get key name
-            for key, var in self.personal_vars.items():
-                clean_key = key.replace('personal_', '')
-                var.set(personal_data.get(clean_key, ''))
-
-            if 'description' in personal_data:
-                self.personal_description.delete(1.0, tk.END)
-                self.personal_description.insert(1.0, personal_data.get('description', ''))
-
-            # expériences
-            self.experience_data = data.get('experience', [])
-            self.refresh_experience_list()
-
-            # education
-            self.education_data = data.get('education', [])
-            try:
-                self.refresh_education_list()
-            except Exception:
-                pass
-
-            # skills
-            self.skills_data = data.get('skills', [])
-            # languages
-            self.languages_data = data.get('languages', [])
-            self.refresh_languages_list()
-
-            # Charger l'image
-            self.load_photo()
+            self.show_cv(cv_id, cv)
 
             # Mettre à jour les statistiques
             self.update_stats(cv_id)
@@ -1292,6 +1817,73 @@ class CVGeneratorApp:
 
         except sqlite3.Error as e:
             messagebox.showerror("Erreur", f"Erreur chargement CV: {e}")
+        except InvalidCV as e:
+            messagebox.showerror("Erreur", f"CV invalide: {e}")
+
+    def set_cv_model(self, model):
+        """Installe le modèle édité; les listes de sections sont partagées avec lui"""
+        self.cv_model = model
+        self.experience_data = model.experience
+        self.education_data = model.education
+        self.skills_data = model.skills
+        self.languages_data = model.languages
+
+    def show_cv(self, cv_id, cv, thumbnail=None):
+        """Remplit l'éditeur avec un CV ({'data', 'photo_path', 'template'}).
+
+        thumbnail: miniature PNG (base64) de l'instantané de session, évite
+        de charger PIL et la photo au démarrage.
+        """
+        self.ensure_tab(self.editor_tab)
+        data = cv['data']
+        # validation avant de toucher au formulaire (lève InvalidCV)
+        model = CVModel.from_dict(data)
+
+        self.current_cv_id = cv_id
+        self.photo_path = cv['photo_path']
+        self.template_var.set(cv['template'] or 'classic')
+        try:
+            self.public_var.set(self.service.is_cv_public(cv_id))
+        except sqlite3.Error as e:
+            print(f"[DEBUG] Statut public du CV {cv_id}: {e}")
+
+        # Remplir les champs du formulaire - personnel
+        personal_data = data.get('personal', {})
+        # valeurs de référence: le remplissage ci-dessous n'est pas journalisé
+        self.journaled_personal = dict(personal_data)
+        self.history.reset(data)
+        # keys in personal_vars are like 'personal_first_name' -> remove prefix to get key name
+        for key, var in self.personal_vars.items():
+            clean_key = key.replace('personal_', '')
+            var.set(personal_data.get(clean_key, ''))
+
+        if 'description' in personal_data:
+            self.personal_description.delete(1.0, tk.END)
+            self.personal_description.insert(1.0, personal_data.get('description', ''))
+
+        # sections (expériences, formations, compétences, langues)
+        self.set_cv_model(model)
+        self.refresh_experience_list()
+        try:
+            self.refresh_education_list()
+        except Exception:
+            pass
+        self.refresh_languages_list()
+
+        # Nouveau journal pour ce CV, dans la version affichée
+        try:
+            self.journal.begin(cv_id, self.cv_versions.get(cv_id))
+        except OSError as e:
+            print(f"[DEBUG] Journal des modifications: {e}")
+        self.saved_state = self.editor_state()
+
+        # Charger l'image
+        if thumbnail:
+            photo = tk.PhotoImage(data=thumbnail)
+            self.photo_label.config(image=photo, text="")
+            self.photo_label.image = photo
+        else:
+            self.load_photo()
 
     def new_cv(self):
         """Crée un nouveau CV"""
@@ -1315,15 +1907,12 @@ class CVGeneratorApp:
                     'languages': []
                 }
 
-                self.cursor.execute('INSERT INTO cvs (user_id, title, data, template) VALUES (?, ?, ?, ?)',
-                                    (self.current_user['id'], title, json.dumps(default_data), self.current_template))
-                self.conn.commit()
+                new_id = self.service.create_cv(self.current_user['id'], title, default_data, self.current_template)
 
                 # Recharger la liste
                 self.load_user_cvs()
 
                 # Charger le nouveau CV
-                new_id = self.cursor.lastrowid
                 self.load_cv_data(new_id)
 
             except sqlite3.Error as e:
@@ -1343,20 +1932,15 @@ class CVGeneratorApp:
         if not messagebox.askyesno("Confirmation", "Voulez-vous vraiment supprimer ce CV ?"):
             return
         try:
-            # récupérer chemin photo pour suppression
-            self.cursor.execute('SELECT photo_path FROM cvs WHERE id = ?', (cv_id,))
-            row = self.cursor.fetchone()
-            if row and row[0]:
+            # supprimer en base, puis la photo associée
+            photo_path = self.service.delete_cv(cv_id)
+            if photo_path:
                 try:
-                    if os.path.exists(row[0]):
-                        os.remove(row[0])
+                    if os.path.exists(photo_path):
+                        os.remove(photo_path)
                 except Exception:
                     pass
 
-            # supprimer en base
-            self.cursor.execute('DELETE FROM cvs WHERE id = ?', (cv_id,))
-            self.conn.commit()
-
             # retirer de la liste et rafraîchir
             self.load_user_cvs()
             # si on supprimait le CV courant, nettoyer
@@ -1369,9 +1953,36 @@ class CVGeneratorApp:
         except sqlite3.Error as e:
             messagebox.showerror("Erreur", f"Erreur suppression CV: {e}")
 
+    def show_duplicate_cvs(self):
+        """Liste les groupes de CVs quasi identiques de l'utilisateur"""
+        if not self.current_user:
+            return
+        try:
+            clusters = self.service.duplicate_clusters(self.current_user['id'])
+        except sqlite3.Error as e:
+            messagebox.showerror("Erreur", f"Erreur recherche de doublons: {e}")
+            return
+        if not clusters:
+            messagebox.showinfo("Doublons", "Aucun CV quasi identique")
+            return
+        lines = [" / ".join(title for _, title, _ in group) for group in clusters]
+        messagebox.showinfo("Doublons", "CVs quasi identiques:\n\n" + "\n".join(f"• {line}" for line in lines))
+
     # -----------------------
     # Save / Export
     # -----------------------
+    def editor_state(self):
+        """(document JSON, photo, template) de l'éditeur, champs personnels du
+        formulaire reportés dans le modèle (sections déjà sérialisées en cache)"""
+        personal = {}
+        for key, var in self.personal_vars.items():
+            clean_key = key.replace('personal_', '')
+            personal[clean_key] = var.get()
+
+        personal['description'] = self.personal_description.get(1.0, tk.END).strip()
+        self.cv_model.set_personal(personal)
+        return self.cv_model.to_json(), self.photo_path, self.template_var.get()
+
     def save_cv(self, autosave=False):
         """Sauvegarde le CV actuel"""
         if not self.current_cv_id:
@@ -1380,34 +1991,30 @@ class CVGeneratorApp:
             return
 
         try:
-            # Récupérer les données du formulaire
-            data = {
-                'personal': {},
-                'experience': self.experience_data,
-                'education': self.education_data,
-                'skills': self.skills_data,
-                'languages': self.languages_data
-            }
-
-            for key, var in self.personal_vars.items():
-                clean_key = key.replace('personal_', '')
-                data['personal'][clean_key] = var.get()
-
-            data['personal']['description'] = self.personal_description.get(1.0, tk.END).strip()
-
-            # Sauvegarder la photo_path et template aussi
-            photo = self.photo_path
-            template = self.template_var.get()
-
-            # Sauvegarder dans la base
-            self.cursor.execute('UPDATE cvs SET data = ?, updated_at = CURRENT_TIMESTAMP, photo_path = ?, template = ? WHERE id = ?',
-                                (json.dumps(data), photo, template, self.current_cv_id))
-            self.conn.commit()
-
-            # Sauvegarder l'historique
-            self.cursor.execute('INSERT INTO cv_history (cv_id, data) VALUES (?, ?)',
-                                (self.current_cv_id, json.dumps(data)))
-            self.conn.commit()
+            # Récupérer les champs personnels du formulaire; les sections sont déjà dans le modèle
+            state = self.editor_state()
+            if state == self.saved_state:
+                # rien de modifié depuis le chargement ou la dernière sauvegarde:
+                # ni nouvelle version, ni historique, ni miniature
+                if not autosave:
+                    messagebox.showinfo("Succès", "CV sauvegardé avec succès!")
+                return
+            _, photo, template = state
+
+            # Sauvegarder dans la base (CV + historique dans une même transaction)
+            previous = self.cv_versions.get(self.current_cv_id)
+            version = self.service.save_cv(self.current_cv_id, self.cv_model, photo, template)
+            self.saved_state = state
+            if version is not None and version != previous:
+                self.cv_versions[self.current_cv_id] = version
+                self.request_thumbnails([self.current_cv_id])
+
+            # Modifications enregistrées: le journal repart de cette version
+            self.journaled_personal['description'] = self.cv_model.personal.description
+            try:
+                self.journal.reset(version)
+            except OSError as e:
+                print(f"[DEBUG] Journal des modifications: {e}")
 
             if not autosave:
                 messagebox.showinfo("Succès", "CV sauvegardé avec succès!")
@@ -1424,45 +2031,13 @@ class CVGeneratorApp:
             messagebox.showerror("Erreur", "Aucun CV sélectionné")
             return
 
-        try:
-            # Récupérer les données
-            self.cursor.execute('SELECT data FROM cvs WHERE id = ?', (self.current_cv_id,))
-            row = self.cursor.fetchone()
-            if not row:
-                messagebox.showerror("Erreur", "CV introuvable")
-                return
-            cv_data = json.loads(row[0])
-
-            # Créer le PDF minimal
-            pdf = FPDF()
-            pdf.add_page()
-            pdf.set_font("Arial", size=16)
-            personal = cv_data.get('personal', {})
-            name = f"{personal.get('first_name','')} {personal.get('last_name','')}".strip()
-            pdf.cell(0, 10, name, ln=True)
-            pdf.set_font("Arial", size=12)
-            pdf.multi_cell(0, 6, personal.get('description',''))
-
-            # expériences
-            pdf.set_font("Arial", 'B', 12)
-            pdf.cell(0, 8, "Expériences", ln=True)
-            pdf.set_font("Arial", size=11)
-            for exp in cv_data.get('experience', []):
-                pdf.cell(0, 6, f"{exp.get('position','')} - {exp.get('company','')}", ln=True)
-                pdf.multi_cell(0, 5, exp.get('description',''))
-
-            filename = filedialog.asksaveasfilename(
-                defaultextension=".pdf",
-                filetypes=[("PDF files", "*.pdf")],
-                title="Exporter en PDF"
-            )
-
-            if filename:
-                pdf.output(filename)
-                messagebox.showinfo("Succès", f"CV exporté en PDF: {filename}")
-
-        except Exception as e:
-            messagebox.showerror("Erreur", f"Erreur export PDF: {e}")
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".pdf",
+            filetypes=[("PDF files", "*.pdf")],
+            title="Exporter en PDF"
+        )
+        if filename:
+            self.run_export_job('export_pdf', filename, "Erreur export PDF")
 
     def export_word(self):
         """Exporte le CV en Word - placeholder simple (export .txt renamed .docx possible)"""
@@ -1470,36 +2045,36 @@ class CVGeneratorApp:
             messagebox.showerror("Erreur", "Aucun CV sélectionné")
             return
 
+        # sauvegarde en .docx simple (en réalité texte)
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".docx",
+            filetypes=[("Word files", "*.docx"), ("Text files", "*.txt")],
+            title="Exporter en Word (simple)"
+        )
+        if filename:
+            self.run_export_job('export_text', filename, "Erreur export Word")
+
+    def run_export_job(self, kind, filename, error_title):
+        """Exporte le CV courant (version enregistrée) via la file de tâches"""
         try:
-            self.cursor.execute('SELECT data FROM cvs WHERE id = ?', (self.current_cv_id,))
-            row = self.cursor.fetchone()
-            if not row:
-                messagebox.showerror("Erreur", "CV introuvable")
-                return
-            cv_data = json.loads(row[0])
-
-            # Assembly simple en texte
-            lines = []
-            p = cv_data.get('personal', {})
-            lines.append(f"{p.get('first_name','')} {p.get('last_name','')}")
-            lines.append(p.get('description',''))
-            lines.append("\nExpériences:")
-            for exp in cv_data.get('experience', []):
-                lines.append(f"- {exp.get('position','')} at {exp.get('company','')} ({exp.get('start_date','')} - {exp.get('end_date','') or 'Présent'})")
-                if exp.get('description'):
-                    lines.append(f"  {exp.get('description')}")
-            # sauvegarde en .docx simple (en réalité texte)
-            filename = filedialog.asksaveasfilename(
-                defaultextension=".docx",
-                filetypes=[("Word files", "*.docx"), ("Text files", "*.txt")],
-                title="Exporter en Word (simple)"
-            )
-            if filename:
-                with open(filename, 'w', encoding='utf-8') as f:
-                    f.write("\n".join(lines))
+            # chemin choisi sur cette machine: seul le worker intégré peut l'écrire
+            job_id = self.jobs.enqueue(kind, {'cv_id': self.current_cv_id, 'path': filename}, priority=10,
+                                       owner=self.job_worker.name)
+        except sqlite3.Error as e:
+            messagebox.showerror("Erreur", f"{error_title}: {e}")
+            return
+        self.job_worker.wake()
+
+        def done(job):
+            if job is None or job['state'] == 'failed':
+                messagebox.showerror("Erreur", f"{error_title}: {job['last_error'] if job else 'tâche perdue'}")
+            elif job['state'] == 'done':
                 messagebox.showinfo("Succès", f"CV exporté: {filename}")
-        except Exception as e:
-            messagebox.showerror("Erreur", f"Erreur export Word: {e}")
+            else:
+                messagebox.showinfo("Export", f"L'export continue en arrière-plan: {filename}")
+
+        self.background.submit(self.jobs.wait, job_id, on_done=done,
+                               on_error=lambda e: messagebox.showerror("Erreur", f"{error_title}: {e}"))
 
     # -----------------------
     # Photo upload / preview
@@ -1517,6 +2092,9 @@ class CVGeneratorApp:
 
         if filename:
             try:
+                # Import différé: PIL n'est chargé qu'au premier usage
+                from PIL import Image, ImageOps
+
                 # Compresser et redimensionner l'image
                 img = Image.open(filename)
                 img = ImageOps.fit(img, (200, 200), Image.LANCZOS)
@@ -1529,12 +2107,22 @@ class CVGeneratorApp:
 
                 self.photo_path = photo_path
                 self.load_photo()
+                self.update_preview()
 
-                # Mettre à jour la base si CV courant
+                # Mettre à jour la base si CV courant; les modifications non
+                # sauvegardées restent au journal, rebasé sur la nouvelle version
                 if self.current_cv_id:
-                    self.cursor.execute('UPDATE cvs SET photo_path = ? WHERE id = ?',
-                                        (photo_path, self.current_cv_id))
-                    self.conn.commit()
+                    version = self.service.set_cv_photo(self.current_cv_id, photo_path)
+                    if version is not None:
+                        self.cv_versions[self.current_cv_id] = version
+                        if self.saved_state is not None:
+                            document, _, template = self.saved_state
+                            self.saved_state = (document, photo_path, template)
+                        try:
+                            self.journal.rebase(version)
+                        except OSError as e:
+                            print(f"[DEBUG] Journal des modifications: {e}")
+                        self.request_thumbnails([self.current_cv_id])
 
                 messagebox.showinfo("Succès", "Photo uploadée")
 
@@ -1545,6 +2133,7 @@ class CVGeneratorApp:
         """Charge la photo actuelle"""
         if self.photo_path and os.path.exists(self.photo_path):
             try:
+                from PIL import Image, ImageTk
                 img = Image.open(self.photo_path)
                 img = img.resize((100, 100), Image.LANCZOS)
                 photo = ImageTk.PhotoImage(img)
@@ -1561,142 +2150,297 @@ class CVGeneratorApp:
     def update_stats(self, cv_id):
         """Met à jour les statistiques d'un CV"""
         try:
-            self.cursor.execute('SELECT view_count FROM cvs WHERE id = ?', (cv_id,))
-            row = self.cursor.fetchone()
-            view_count = row[0] if row else 0
-
-            self.cursor.execute('''
-                SELECT COUNT(DISTINCT viewer_id) as unique_viewers 
-                FROM cv_views WHERE cv_id = ?
-            ''', (cv_id,))
-            unique_viewers = self.cursor.fetchone()[0]
-
-            self.cursor.execute('''
-                SELECT MAX(viewed_at) as last_view 
-                FROM cv_views WHERE cv_id = ?
-            ''', (cv_id,))
-            last_view = self.cursor.fetchone()[0]
-
-            stats_text = f"""Vues totales: {view_count}
-Visiteurs uniques: {unique_viewers}
-Dernière vue: {last_view[:10] if last_view else 'Jamais'}"""
-
-            self.stats_label.config(text=stats_text)
-
+            self.show_stats(self.service.cv_stats(cv_id))
         except sqlite3.Error as e:
             self.stats_label.config(text="Erreur chargement statistiques")
 
+    def show_stats(self, stats, title=None):
+        """Affiche (vues, visiteurs uniques, dernière vue) dans stats_label"""
+        view_count, unique_viewers, last_view = stats
+        stats_text = f"""Vues totales: {view_count}
+Visiteurs uniques: {unique_viewers}
+Dernière vue: {last_view[:10] if last_view else 'Jamais'}"""
+        if title:
+            stats_text = f"CV le plus récent: {title}\n" + stats_text
+        self.stats_label.config(text=stats_text)
+
     # -----------------------
     # Load user skills
     # -----------------------
     def load_user_skills(self):
         """Charge les compétences de l'utilisateur"""
-        if not self.current_user:
+        # onglet pas encore construit: chargé à sa construction
+        if not self.current_user or str(self.skills_tab) not in self.built_tabs:
             return
 
-        try:
-            self.user_skills_tree.delete(*self.user_skills_tree.get_children())
-
-            self.cursor.execute('''
-                SELECT s.name, us.level, us.experience_years 
-                FROM user_skills us
-                JOIN skills s ON us.skill_id = s.id
-                WHERE us.user_id = ?
-                ORDER BY us.level DESC, us.experience_years DESC
-            ''', (self.current_user['id'],))
-
-            for skill_name, level, experience in self.cursor.fetchall():
-                lvl_index = max(1, min(level, 4))
-                level_text = ["Débutant", "Intermédiaire", "Avancé", "Expert"][lvl_index-1]
-                self.user_skills_tree.insert('', 'end', text=skill_name,
-                                            values=(level_text, f"{experience} ans"))
+        rows, self.prefetched_user_skills = self.prefetched_user_skills, None
+        if rows is None:
+            try:
+                rows = self.service.list_user_skills(self.current_user['id'])
+            except sqlite3.Error as e:
+                messagebox.showerror("Erreur", f"Erreur chargement compétences: {e}")
+                return
+        self.show_user_skills(rows)
 
-        except sqlite3.Error as e:
-            messagebox.showerror("Erreur", f"Erreur chargement compétences: {e}")
+    def show_user_skills(self, rows):
+        """Remplit user_skills_tree (ou garde les lignes si l'onglet n'est pas construit)"""
+        if str(self.skills_tab) not in self.built_tabs:
+            self.prefetched_user_skills = rows
+            return
+
+        # Chargement complet (connexion, ouverture de l'onglet); les
+        # modifications suivantes mettent l'arbre à jour ligne par ligne
+        self.user_skills_tree.delete(*self.user_skills_tree.get_children())
+        self.user_skill_rows = {}
+        for skill_id, skill_name, level, experience in rows:
+            self.user_skill_rows[skill_id] = (skill_name, level, experience)
+            self.user_skills_tree.insert('', 'end', iid=f"skill-{skill_id}", text=skill_name,
+                                         values=self.user_skill_values(level, experience))
+
+    def user_skill_id(self, iid):
+        """ID de compétence d'une ligne de user_skills_tree"""
+        return int(iid.split('-', 1)[1])
+
+    def user_skill_values(self, level, experience):
+        lvl_index = max(1, min(level, 4))
+        return (self.SKILL_LEVELS[lvl_index - 1], f"{experience} ans")
+
+    def show_user_skill(self, skill_id, skill_name, level, experience):
+        """Insère ou déplace une ligne de user_skills_tree.
+
+        L'ordre de list_user_skills (niveau puis expérience décroissants)
+        est conservé sans recharger l'arbre.
+        """
+        iid = f"skill-{skill_id}"
+        tree = self.user_skills_tree
+        if skill_id in self.user_skill_rows:
+            tree.delete(iid)
+        self.user_skill_rows[skill_id] = (skill_name, level, experience)
+
+        key = (-level, -experience)
+        index = 0
+        for other in tree.get_children():
+            _, other_level, other_exp = self.user_skill_rows[self.user_skill_id(other)]
+            if (-other_level, -other_exp) > key:
+                break
+            index += 1
+        tree.insert('', index, iid=iid, text=skill_name,
+                    values=self.user_skill_values(level, experience))
 
     def delete_user_skill(self):
-        """Supprime une compétence utilisateur"""
+        """Supprime les compétences utilisateur sélectionnées"""
         selection = self.user_skills_tree.selection()
         if not selection:
             messagebox.showwarning("Attention", "Veuillez sélectionner une compétence")
             return
 
-        skill_name = self.user_skills_tree.item(selection[0])['text']
+        skill_ids = [self.user_skill_id(iid) for iid in selection]
+        if len(skill_ids) == 1:
+            question = f"Supprimer la compétence '{self.user_skill_rows[skill_ids[0]][0]}'?"
+        else:
+            question = f"Supprimer les {len(skill_ids)} compétences sélectionnées?"
 
-        if messagebox.askyesno("Confirmation", f"Supprimer la compétence '{skill_name}'?"):
+        if messagebox.askyesno("Confirmation", question):
             try:
-                self.cursor.execute('''
-                    DELETE FROM user_skills 
-                    WHERE user_id = ? AND skill_id = (
-                        SELECT id FROM skills WHERE name = ?
-                    )
-                ''', (self.current_user['id'], skill_name))
-
-                self.conn.commit()
-                self.load_user_skills()
-
+                self.service.delete_user_skills(self.current_user['id'], skill_ids)
             except sqlite3.Error as e:
                 messagebox.showerror("Erreur", f"Erreur suppression compétence: {e}")
+                return
+            self.user_skills_tree.delete(*selection)
+            for skill_id in skill_ids:
+                del self.user_skill_rows[skill_id]
+
+    # -----------------------
+    # Recherche de candidats (recruteurs)
+    # -----------------------
+    def setup_candidates_tab(self):
+        """Configure l'onglet de recherche de candidats par facettes"""
+        frame = tk.Frame(self.candidates_tab, bg='#ffffff', padx=20, pady=20)
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        tk.Label(frame, text="🔎 Recherche de candidats", font=self.subtitle_font,
+                 bg='#ffffff').pack(pady=10)
+
+        # Niveaux minimum (appliqués aux compétences / langues cochées)
+        level_frame = tk.Frame(frame, bg='#ffffff')
+        level_frame.pack(fill=tk.X, pady=5)
+        tk.Label(level_frame, text="Niveau de compétence min.:", bg='#ffffff').pack(side=tk.LEFT)
+        self.candidate_skill_level = ttk.Combobox(level_frame, values=list(self.SKILL_LEVELS),
+                                                  state="readonly", width=14)
+        self.candidate_skill_level.set(self.SKILL_LEVELS[0])
+        self.candidate_skill_level.pack(side=tk.LEFT, padx=5)
+        self.candidate_skill_level.bind('<<ComboboxSelected>>', self.schedule_candidate_search)
+        tk.Label(level_frame, text="Niveau de langue min.:", bg='#ffffff').pack(side=tk.LEFT, padx=(20, 0))
+        self.candidate_language_level = ttk.Combobox(level_frame, values=list(self.LANGUAGE_LEVELS),
+                                                     state="readonly", width=14)
+        self.candidate_language_level.set(self.LANGUAGE_LEVELS[0])
+        self.candidate_language_level.pack(side=tk.LEFT, padx=5)
+        self.candidate_language_level.bind('<<ComboboxSelected>>', self.schedule_candidate_search)
+        tk.Button(level_frame, text="Effacer les filtres", command=self.clear_candidate_filters,
+                 bg='#95a5a6', fg='white').pack(side=tk.RIGHT)
+
+        # Une liste par facette: "valeur (effectif)", sélection multiple
+        facets_frame = tk.Frame(frame, bg='#ffffff')
+        facets_frame.pack(fill=tk.BOTH, expand=True, pady=5)
+        self.facet_lists = {}
+        self.facet_values = {}
+        for facet in ('skill', 'language', 'location', 'degree', 'experience'):
+            column = tk.Frame(facets_frame, bg='#ffffff')
+            column.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=3)
+            tk.Label(column, text=FACET_LABELS[facet], bg='#ffffff').pack(anchor='w')
+            listbox = tk.Listbox(column, height=10, selectmode=tk.MULTIPLE, exportselection=False)
+            listbox.pack(fill=tk.BOTH, expand=True)
+            listbox.bind('<<ListboxSelect>>', self.schedule_candidate_search)
+            self.facet_lists[facet] = listbox
+            self.facet_values[facet] = []
+
+        self.candidates_count = tk.Label(frame, text="Chargement de l'index...", bg='#ffffff',
+                                         font=self.normal_font)
+        self.candidates_count.pack(anchor='w', pady=5)
+
+        self.candidates_tree = ttk.Treeview(frame, columns=('title', 'experience', 'position'), height=10)
+        self.candidates_tree.heading('#0', text='Candidat')
+        self.candidates_tree.heading('title', text='CV')
+        self.candidates_tree.heading('experience', text='Expérience')
+        self.candidates_tree.heading('position', text='Poste actuel')
+        self.candidates_tree.column('#0', width=180)
+        self.candidates_tree.column('title', width=220)
+        self.candidates_tree.column('experience', width=90)
+        self.candidates_tree.column('position', width=200)
+        self.candidates_tree.pack(fill=tk.BOTH, expand=True)
+
+        self.candidate_search_job = None
+        self.load_candidate_index()
+
+    def load_candidate_index(self):
+        """Construit l'index de facettes en arrière-plan, puis lance une première recherche"""
+        if self.service.facets is not None:
+            self.search_candidates()
+            return
+
+        def failed(e):
+            self.candidates_count.config(text="Index indisponible")
+            messagebox.showerror("Erreur", f"Erreur chargement des candidats: {e}")
+
+        self.background.submit(self.service.load_facet_index,
+                               on_done=lambda index: self.search_candidates(), on_error=failed)
+
+    def schedule_candidate_search(self, event=None):
+        """Regroupe les clics successifs en une seule recherche"""
+        if self.candidate_search_job is not None:
+            self.root.after_cancel(self.candidate_search_job)
+        self.candidate_search_job = self.root.after(150, self.search_candidates)
+
+    def clear_candidate_filters(self):
+        for listbox in self.facet_lists.values():
+            listbox.selection_clear(0, tk.END)
+        self.candidate_skill_level.set(self.SKILL_LEVELS[0])
+        self.candidate_language_level.set(self.LANGUAGE_LEVELS[0])
+        self.search_candidates()
+
+    def selected_facet_values(self, facet):
+        listbox = self.facet_lists[facet]
+        return [self.facet_values[facet][i] for i in listbox.curselection()]
+
+    def candidate_filters(self):
+        """Filtres de facettes d'après les sélections (niveaux: minimum et au-delà)"""
+        filters = {facet: self.selected_facet_values(facet) for facet in ('location', 'degree', 'experience')}
+        skills = self.selected_facet_values('skill')
+        min_skill = self.SKILL_LEVELS.index(self.candidate_skill_level.get()) + 1
+        if min_skill > 1:
+            filters['skill_level'] = [level_value(name, level) for name in skills
+                                      for level in range(min_skill, len(self.SKILL_LEVELS) + 1)]
+        else:
+            filters['skill'] = skills
+        languages = self.selected_facet_values('language')
+        min_language = self.LANGUAGE_LEVELS.index(self.candidate_language_level.get())
+        if min_language > 0:
+            filters['language_level'] = [level_value(name, level) for name in languages
+                                         for level in self.LANGUAGE_LEVELS[min_language:]]
+        else:
+            filters['language'] = languages
+        # un niveau minimum sans compétence/langue cochée ne filtre rien
+        return {facet: values for facet, values in filters.items() if values}
+
+    def search_candidates(self):
+        """Applique les filtres: résultats et effectifs de chaque facette"""
+        self.candidate_search_job = None
+        try:
+            total, rows, counts = self.service.search_candidates(self.candidate_filters())
+        except sqlite3.Error as e:
+            messagebox.showerror("Erreur", f"Erreur recherche candidats: {e}")
+            return
+
+        for facet, listbox in self.facet_lists.items():
+            selected = set(self.selected_facet_values(facet))
+            facet_counts = counts.get(facet, [])[:self.MAX_FACET_VALUES]
+            if facet == 'experience':
+                order = {label: i for i, (_, label) in enumerate(EXPERIENCE_BUCKETS)}
+                facet_counts = sorted(facet_counts, key=lambda item: order.get(item[0], len(order)))
+            shown = {value for value, _ in facet_counts}
+            # les valeurs cochées restent visibles même sans candidat
+            facet_counts += [(value, 0) for value in sorted(selected - shown)]
+            listbox.delete(0, tk.END)
+            self.facet_values[facet] = [value for value, _ in facet_counts]
+            for i, (value, count) in enumerate(facet_counts):
+                listbox.insert(tk.END, f"{value} ({count})")
+                if value in selected:
+                    listbox.selection_set(i)
+
+        self.candidates_count.config(text=f"{total} candidat(s)")
+        tree = self.candidates_tree
+        tree.delete(*tree.get_children())
+        for cv_id, title, first_name, last_name, months, position in rows:
+            experience = f"{months // 12} ans {months % 12} mois" if months is not None else ""
+            tree.insert('', tk.END, iid=str(cv_id), text=f"{first_name} {last_name}",
+                        values=(title, experience, position or ""))
 
     # -----------------------
     # Preview / UI helpers
     # -----------------------
     def update_preview(self, event=None):
-        """Met à jour l'aperçu en direct (rendu texte simple)"""
-        self.preview_canvas.delete("all")
-        lines = []
-        # Personal
-        first = self.personal_vars.get('personal_first_name').get() if 'personal_first_name' in self.personal_vars else ''
-        last = self.personal_vars.get('personal_last_name').get() if 'personal_last_name' in self.personal_vars else ''
-        title = self.personal_vars.get('personal_title').get() if 'personal_title' in self.personal_vars else ''
-        email = self.personal_vars.get('personal_email').get() if 'personal_email' in self.personal_vars else ''
-        desc = self.personal_description.get(1.0, tk.END).strip()
-
-        lines.append(f"{first} {last}")
-        if title:
-            lines.append(title)
-        if email:
-            lines.append(email)
-        if desc:
-            lines.append("")
-            lines.append(desc[:500])
-
-        lines.append("\nExpériences:")
-        for exp in self.experience_data[:5]:
-            lines.append(f"- {exp.get('position','')} at {exp.get('company','')} ({exp.get('start_date','')} - {exp.get('end_date','') or 'Présent'})")
-
-        lines.append("\nFormations:")
-        for ed in self.education_data[:5]:
-            lines.append(f"- {ed.get('degree','')} - {ed.get('school','')} ({ed.get('start_year','')})")
-
-        lines.append("\nCompétences:")
-        if isinstance(self.skills_data, list):
-            lines.append(", ".join(self.skills_data[:20]))
-        else:
-            lines.append("")
+        """Programme la mise à jour de l'aperçu (un rendu pour plusieurs frappes rapprochées)"""
+        if self.preview_job is None:
+            self.preview_job = self.root.after(self.PREVIEW_DELAY_MS, self.render_preview)
 
-        lines.append("\nLangues:")
-        for l in self.languages_data[:5]:
-            lines.append(f"- {l.get('name')} ({l.get('level')})")
+    def render_preview(self):
+        """Aperçu identique à l'export PDF (cv_layout): template, colonnes, photo, pages.
 
-        # draw text
-        text = "\n".join(lines)
-        self.preview_canvas.create_text(10, 10, anchor='nw', text=text, font=("Arial", 10), fill="black")
+        La mise en page réutilise le découpage des paragraphes inchangés et
+        le Canvas n'est modifié que là où le rendu a changé.
+        """
+        self.preview_job = None
+        personal = {key.replace('personal_', ''): var.get() for key, var in self.personal_vars.items()}
+        personal['description'] = self.personal_description.get(1.0, tk.END).strip()
+        data = {'personal': personal, 'experience': self.experience_data, 'education': self.education_data,
+                'skills': self.skills_data, 'languages': self.languages_data}
+        self.preview_document = self.service.layout.layout(data, self.template_var.get(), self.photo_path)
+        self.preview_renderer.render(self.preview_document, self.preview_canvas.winfo_width())
+
+    def show_preview_anchor(self, section, index):
+        """Fait défiler l'aperçu jusqu'à une entrée (expérience, formation, langue)"""
+        document = self.preview_document
+        anchor = document.anchors.get((section, index)) if document else None
+        if anchor is None:
+            return
+        height = self.preview_renderer.page_top(document.pages)
+        self.preview_canvas.yview_moveto(max(self.preview_renderer.y_of(anchor) - 20, 0) / height)
 
     def clear_all_forms(self):
         """Réinitialise tous les formulaires"""
+        self.journal.discard()
+        self.history.reset({})
+        self.journaled_personal = {}
+        self.public_var.set(False)
         for v in self.personal_vars.values():
             v.set('')
         self.personal_description.delete(1.0, tk.END)
-        self.experience_data = []
+        self.set_cv_model(CVModel())
         self.refresh_experience_list()
-        self.education_data = []
         try:
             self.refresh_education_list()
         except Exception:
             pass
-        self.skills_data = []
-        self.languages_data = []
         self.refresh_languages_list()
         self.photo_path = None
         self.load_photo()
@@ -1717,23 +2461,107 @@ Dernière vue: {last_view[:10] if last_view else 'Jamais'}"""
 
         # démarrer la boucle après 30s
         self.root.after(30000, autosave)
-        
- 
-    def change_template(self, event=None):
-        """
-        Change le modèle de CV en fonction de la sélection.
-        Pour l'instant c'est une version de démonstration.
-        """
-        if hasattr(self, "template_var"):
-            selected_template = self.template_var.get()
-            print(f"[DEBUG] Nouveau modèle choisi : {selected_template}")
-            messagebox.showinfo("Template", f"Modèle sélectionné : {selected_template}")
-        else:
-            print("[DEBUG] Aucun template sélectionné.")
 
-        
-        
-        
+    def on_close(self):
+        """Ferme les connexions et quitte l'application"""
+        if self.watchdog:
+            try:
+                self.watchdog.stop()
+            except OSError as e:
+                print(f"[DEBUG] Rapport de blocages impossible: {e}")
+        try:
+            self.tracer.close()
+        except OSError as e:
+            print(f"[DEBUG] Export traces UI impossible: {e}")
+        self.background.shutdown()
+        # une tâche interrompue sera reprise à l'expiration de son bail
+        self.job_worker.stop()
+        self.save_session_snapshot()
+        # le journal reste sur disque: les modifications non sauvegardées seront rejouées
+        self.journal.close()
+        self.deferred_writer.close()
+        if self.query_stats_file:
+            try:
+                self.query_stats.dump(self.query_stats_file)
+            except OSError as e:
+                print(f"[DEBUG] Export statistiques SQL impossible: {e}")
+        try:
+            self.db.close()
+        except sqlite3.Error:
+            pass
+        self.root.destroy()
+
+    # -----------------------
+    # Debug: statistiques SQL
+    # -----------------------
+    def show_query_stats(self, event=None):
+        """Affiche le panneau de debug des statistiques SQL"""
+        win = tk.Toplevel(self.root)
+        win.title("Statistiques SQL")
+        win.geometry("1000x500")
+
+        columns = ('calls', 'rows', 'p50', 'p95', 'p99', 'max', 'total')
+        tree = ttk.Treeview(win, columns=columns, height=15)
+        tree.heading('#0', text='Requête')
+        tree.column('#0', width=420)
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=70, anchor='e')
+        tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+        plan_text = scrolledtext.ScrolledText(win, height=6)
+        plan_text.pack(fill=tk.X, padx=5, pady=5)
+
+        rows = {}
+
+        def refresh():
+            tree.delete(*tree.get_children())
+            rows.clear()
+            for st in self.query_stats.snapshot():
+                total = st['mean_ms'] * st['calls']
+                iid = tree.insert('', 'end', text=st['sql'][:200],
+                                  values=(st['calls'], st['rows'], st['p50_ms'], st['p95_ms'],
+                                          st['p99_ms'], st['max_ms'], round(total, 1)))
+                rows[iid] = st
+
+        def on_select(event=None):
+            sel = tree.selection()
+            plan_text.delete(1.0, tk.END)
+            if sel:
+                st = rows[sel[0]]
+                plan = st.get('plan')
+                plan_text.insert(1.0, st['sql'] + "\n\n" + ("\n".join(plan) if plan else "(requête non lente)"))
+
+        def dump():
+            filename = filedialog.asksaveasfilename(defaultextension=".json",
+                                                    filetypes=[("JSON", "*.json")],
+                                                    title="Exporter les statistiques SQL")
+            if filename:
+                self.query_stats.dump(filename)
+
+        tree.bind('<<TreeviewSelect>>', on_select)
+        btn_frame = tk.Frame(win)
+        btn_frame.pack(fill=tk.X, pady=5)
+        tk.Button(btn_frame, text="Rafraîchir", command=refresh).pack(side=tk.LEFT, padx=5)
+        tk.Button(btn_frame, text="Réinitialiser", command=lambda: (self.query_stats.reset(), refresh())).pack(side=tk.LEFT, padx=5)
+        tk.Button(btn_frame, text="Exporter JSON", command=dump).pack(side=tk.LEFT, padx=5)
+        refresh()
+
+    def toggle_public(self):
+        """Publie ou retire le CV courant du service public (/cv/<id>)"""
+        if not self.current_cv_id:
+            self.public_var.set(False)
+            messagebox.showwarning("Attention", "Enregistrez d'abord le CV")
+            return
+        try:
+            self.service.set_cv_public(self.current_cv_id, self.public_var.get())
+        except sqlite3.Error as e:
+            self.public_var.set(not self.public_var.get())
+            messagebox.showerror("Erreur", f"Impossible de modifier la publication: {e}")
+
+    def change_template(self, event=None):
+        """Applique le modèle choisi à l'aperçu (enregistré avec le CV)"""
+        self.update_preview()
 
 
 # -----------------------
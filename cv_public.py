@@ -0,0 +1,472 @@
+"""Service HTTP des CVs publics (asyncio, sans Tk).
+
+    python cv_public.py publish --db cv_platform.db --cv 12 13   (ou --first 1000)
+    python cv_public.py serve --db cv_platform.db --port 8080
+    python cv_public.py loadtest --db cv_platform.db --concurrency 1 10 50 --duration 10
+
+Routes: /cv/<id> (HTML), /cv/<id>.pdf, /cv/<id>.json, /healthz, /metrics.
+Seuls les CVs publiés (cvs.is_public) sont servis.
+
+Chaque réponse porte un ETag dérivé de cvs.version (et du template): un
+client qui renvoie If-None-Match reçoit 304 sans que le CV soit relu ni
+rendu. Les rendus sont gardés dans un cache LRU borné en octets; deux
+requêtes simultanées pour un même rendu absent n'en déclenchent qu'un.
+SQLite et le rendu tournent dans un pool de threads, hors de la boucle.
+Les vues (HTML et PDF, 304 compris) sont comptées en mémoire et écrites
+par lots (cv_views, view_count), une transaction par seconde au plus.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+
+from cv_db import ConnectionManager
+from cv_metrics import LatencyHistogram
+from cv_session import utc_now
+
+CONTENT_TYPES = {
+    'html': 'text/html; charset=utf-8',
+    'pdf': 'application/pdf',
+    'json': 'application/json; charset=utf-8',
+}
+# formats comptés comme une vue du CV
+VIEW_FORMATS = ('html', 'pdf')
+MAX_HEADER_BYTES = 16384
+# corps de requête lu puis ignoré (GET/HEAD): au-delà, 400 et fermeture
+MAX_BODY_BYTES = 65536
+KEEPALIVE_TIMEOUT_S = 15.0
+
+# identifiant borné: au-delà, l'entier ne tient pas dans SQLite (404, pas 500)
+_CV_PATH = re.compile(r'^/cv/(\d{1,18})(?:\.(html|pdf|json))?$')
+_REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+            405: 'Method Not Allowed', 431: 'Request Header Fields Too Large', 500: 'Internal Server Error'}
+
+
+def make_etag(cv_id, fmt, version, template):
+    digest = hashlib.sha1(f"{version}|{template}".encode('utf-8')).hexdigest()[:16]
+    return f'"{cv_id}-{fmt}-{digest}"'
+
+
+def etag_matches(if_none_match, etag):
+    """Comparaison faible d'If-None-Match (liste d'ETags ou *)"""
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == '*' or candidate == etag:
+            return True
+    return False
+
+
+class RenderCache:
+    """Cache LRU des rendus, borné par la taille totale des corps (octets)"""
+
+    def __init__(self, max_bytes=32 * 2**20):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+
+    def get(self, key):
+        body = self._items.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        old = self._items.pop(key, None)
+        if old is not None:
+            self.bytes -= len(old)
+        self._items[key] = body
+        self.bytes += len(body)
+        while self.bytes > self.max_bytes:
+            _, evicted = self._items.popitem(last=False)
+            self.bytes -= len(evicted)
+            self.evictions += 1
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {'entries': len(self._items), 'bytes': self.bytes, 'max_bytes': self.max_bytes,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'hit_ratio': round(self.hits / total, 3) if total else None}
+
+
+class ViewCounter:
+    """Vues accumulées en mémoire, écrites par lots hors de la boucle"""
+
+    def __init__(self, service, executor, interval=1.0):
+        self.service = service
+        self.executor = executor
+        self.interval = interval
+        self.flushed = 0
+        self._pending = []
+
+    def add(self, cv_id, ip):
+        self._pending.append((cv_id, ip, utc_now()))
+
+    async def flush(self):
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self.service.record_views, batch)
+            self.flushed += len(batch)
+        except Exception as e:
+            print(f"[DEBUG] Enregistrement des vues: {e}")
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+
+class PublicCVServer:
+    """Serveur HTTP/1.1 minimal (GET/HEAD, keep-alive) des CVs publics"""
+
+    def __init__(self, service, cache_bytes=32 * 2**20, threads=4, view_interval=1.0):
+        self.service = service
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="cv-public")
+        self.cache = RenderCache(cache_bytes)
+        self.views = ViewCounter(service, self.executor, view_interval)
+        self.latency = {}
+        self.statuses = Counter()
+        self._inflight = {}
+        self._date = (0, '')
+
+    # -----------------------
+    # Rendu
+    # -----------------------
+    def _render(self, cv_id, fmt, version):
+        """Corps d'un CV (thread du pool); None si le CV a disparu"""
+        cv = self.service.get_cv(cv_id, version)
+        if cv is None:
+            return None
+        if fmt == 'json':
+            return json.dumps(cv['data'], ensure_ascii=False).encode('utf-8')
+        if fmt == 'pdf':
+            return self.service.build_pdf(cv['data'], cv['template'], cv['photo_path']).output(dest='S').encode('latin-1')
+        return self.service.build_html(cv['data'], cv['template']).encode('utf-8')
+
+    async def _body(self, key, cv_id, fmt, version):
+        body = self.cache.get(key)
+        if body is not None:
+            return body
+        future = self._inflight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._inflight[key] = loop.run_in_executor(self.executor, self._render, cv_id, fmt, version)
+            try:
+                body = await future
+            finally:
+                del self._inflight[key]
+            if body is not None:
+                self.cache.put(key, body)
+            return body
+        return await future
+
+    # -----------------------
+    # Requêtes
+    # -----------------------
+    async def respond(self, method, path, headers, peer):
+        """Retourne (statut, en-têtes, corps, route)"""
+        if method not in ('GET', 'HEAD'):
+            return 405, {'Allow': 'GET, HEAD'}, b'', 'other'
+        path = path.split('?', 1)[0]
+        if path == '/healthz':
+            return 200, {'Content-Type': 'text/plain'}, b'ok', 'healthz'
+        if path == '/metrics':
+            return 200, {'Content-Type': CONTENT_TYPES['json']}, json.dumps(self.metrics()).encode(), 'metrics'
+        m = _CV_PATH.match(path)
+        if not m:
+            return 404, {'Content-Type': 'text/plain'}, b'not found', 'other'
+        cv_id, fmt = int(m.group(1)), m.group(2) or 'html'
+        loop = asyncio.get_running_loop()
+        current = await loop.run_in_executor(self.executor, self.service.public_cv_version, cv_id)
+        if current is None:
+            return 404, {'Content-Type': 'text/plain'}, b'not found', fmt
+        version, template = current
+        etag = make_etag(cv_id, fmt, version, template)
+        response_headers = {'ETag': etag, 'Cache-Control': 'public, no-cache'}
+        if etag_matches(headers.get('if-none-match', ''), etag):
+            if fmt in VIEW_FORMATS:
+                self.views.add(cv_id, peer)
+            return 304, response_headers, b'', fmt
+        body = await self._body((cv_id, fmt, version, template), cv_id, fmt, version)
+        if body is None:
+            return 404, {'Content-Type': 'text/plain'}, b'not found', fmt
+        if fmt in VIEW_FORMATS:
+            self.views.add(cv_id, peer)
+        response_headers['Content-Type'] = CONTENT_TYPES[fmt]
+        return 200, response_headers, body, fmt
+
+    def _http_date(self):
+        now = int(time.time())
+        if self._date[0] != now:
+            self._date = (now, formatdate(now, usegmt=True))
+        return self._date[1]
+
+    async def handle(self, reader, writer):
+        """Une connexion: requêtes successives (keep-alive)"""
+        peer = (writer.get_extra_info('peername') or ('',))[0]
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEPALIVE_TIMEOUT_S)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    await self._reply(writer, 'HEAD', 431, {}, b'', False, 'other', time.perf_counter())
+                    return
+                start = time.perf_counter()
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, path, version = lines[0].split(' ')
+                except ValueError:
+                    await self._reply(writer, 'GET', 400, {}, b'bad request', False, 'other', start)
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    if ':' in line:
+                        name, value = line.split(':', 1)
+                        headers[name.strip().lower()] = value.strip()
+                length = headers.get('content-length', '0')
+                if not (length.isascii() and length.isdigit() and int(length) <= MAX_BODY_BYTES) \
+                        or 'transfer-encoding' in headers:
+                    await self._reply(writer, 'GET', 400, {}, b'bad request', False, 'other', start)
+                    return
+                if int(length):
+                    try:
+                        await asyncio.wait_for(reader.readexactly(int(length)), KEEPALIVE_TIMEOUT_S)
+                    except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                        return
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+                try:
+                    status, response_headers, body, route = await self.respond(method, path, headers, peer)
+                except Exception as e:
+                    print(f"[DEBUG] {method} {path}: {e}")
+                    status, response_headers, body, route = 500, {'Content-Type': 'text/plain'}, b'error', 'other'
+                await self._reply(writer, method, status, response_headers, body, keep_alive, route, start)
+                if not keep_alive:
+                    return
+        finally:
+            writer.close()
+
+    async def _reply(self, writer, method, status, headers, body, keep_alive, route, start):
+        """Envoie la réponse et la comptabilise (statut, latence par route)"""
+        await self._send(writer, method, status, headers, body, keep_alive)
+        self.statuses[status] += 1
+        hist = self.latency.get(route)
+        if hist is None:
+            hist = self.latency[route] = LatencyHistogram()
+        hist.observe((time.perf_counter() - start) * 1000)
+
+    async def _send(self, writer, method, status, headers, body, keep_alive):
+        lines = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}", f"Date: {self._http_date()}",
+                 "Server: cv-public", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if status != 304:
+            lines.append(f"Content-Length: {len(body)}")
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        if method != 'HEAD' and status != 304:
+            writer.write(body)
+        await writer.drain()
+
+    def metrics(self):
+        return {
+            'statuses': {str(k): v for k, v in sorted(self.statuses.items())},
+            'latency': {route: hist.summary() for route, hist in sorted(self.latency.items())},
+            'cache': self.cache.stats(),
+            'views': {'pending': len(self.views._pending), 'flushed': self.views.flushed},
+        }
+
+    async def serve(self, host='127.0.0.1', port=8080, ready=None):
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_BYTES)
+        flusher = asyncio.create_task(self.views.run())
+        if ready is not None:
+            ready(server.sockets[0].getsockname()[1])
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            flusher.cancel()
+            await self.views.flush()
+            self.executor.shutdown(wait=True)
+
+
+# -----------------------
+# Test de charge
+# -----------------------
+async def _http_get(reader, writer, path, etag=None):
+    """Requête keep-alive minimale: retourne (statut, ETag)"""
+    extra = f"If-None-Match: {etag}\r\n" if etag else ""
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n{extra}\r\n".encode('latin-1'))
+    head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1')
+    status = int(head.split(' ', 2)[1])
+    length = 0
+    response_etag = None
+    for line in head.split('\r\n')[1:]:
+        name, _, value = line.partition(':')
+        name = name.lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'etag':
+            response_etag = value.strip()
+    if length:
+        await reader.readexactly(length)
+    return status, response_etag
+
+
+async def _load(port, paths, concurrency, duration, conditional, seed):
+    rng = random.Random(seed)
+    latency = LatencyHistogram()
+    statuses = Counter()
+    etags = {}
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        try:
+            while time.perf_counter() < deadline:
+                path = rng.choice(paths)
+                etag = etags.get(path) if rng.random() < conditional else None
+                start = time.perf_counter()
+                status, response_etag = await _http_get(reader, writer, path, etag)
+                latency.observe((time.perf_counter() - start) * 1000)
+                statuses[status] += 1
+                if response_etag:
+                    etags[path] = response_etag
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    summary = latency.summary()
+    return {'concurrency': concurrency, 'requests': latency.count,
+            'requests_per_sec': round(latency.count / elapsed, 1),
+            'p50_ms': summary['p50_ms'], 'p99_ms': summary['p99_ms'], 'max_ms': summary['max_ms'],
+            'statuses': {str(k): v for k, v in sorted(statuses.items())}}
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def loadtest(args):
+    """Lance le serveur dans un sous-processus et mesure débit et latences"""
+    db = ConnectionManager(args.db)
+    try:
+        with db.read() as cursor:
+            cursor.execute('SELECT id FROM cvs WHERE is_public = 1 ORDER BY id LIMIT ?', (args.cvs,))
+            ids = [row[0] for row in cursor.fetchall()]
+    finally:
+        db.close()
+    if not ids:
+        sys.exit("Aucun CV public: python cv_public.py publish --db ... --first 1000")
+    # surtout des pages HTML, quelques JSON et PDF
+    paths = [f"/cv/{cv_id}" for cv_id in ids] * 8 + [f"/cv/{cv_id}.json" for cv_id in ids] \
+        + [f"/cv/{cv_id}.pdf" for cv_id in ids]
+
+    port = _free_port()
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), 'serve', '--db', args.db,
+                               '--port', str(port), '--cache-mb', str(args.cache_mb)])
+    try:
+        for _ in range(100):
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        results = [asyncio.run(_load(port, paths, c, args.duration, args.conditional, args.seed))
+                   for c in args.concurrency]
+
+        async def fetch_metrics():
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+            data = await reader.read()
+            writer.close()
+            return json.loads(data.split(b'\r\n\r\n', 1)[1])
+
+        metrics = asyncio.run(fetch_metrics())
+    finally:
+        server.terminate()
+        server.wait()
+    print(json.dumps({'public_cvs': len(ids), 'conditional': args.conditional, 'results': results,
+                      'server': {'cache': metrics['cache'], 'views': metrics['views']}}, indent=2))
+
+
+def main():
+    from cv_services import CVService
+
+    parser = argparse.ArgumentParser(description="Service HTTP des CVs publics")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("serve")
+    p.add_argument("--db", default="cv_platform.db")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8080)
+    p.add_argument("--cache-mb", type=float, default=32)
+    p.add_argument("--threads", type=int, default=4)
+    p = sub.add_parser("publish", help="rend des CVs publics")
+    p.add_argument("--db", default="cv_platform.db")
+    p.add_argument("--cv", type=int, nargs="*", default=[])
+    p.add_argument("--first", type=int, default=0, help="publie les N premiers CVs")
+    p = sub.add_parser("loadtest", help="débit et latences sur localhost")
+    p.add_argument("--db", default="cv_platform.db")
+    p.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    p.add_argument("--duration", type=float, default=10)
+    p.add_argument("--cvs", type=int, default=1000, help="CVs publics interrogés")
+    p.add_argument("--conditional", type=float, default=0.5, help="part des requêtes avec If-None-Match")
+    p.add_argument("--cache-mb", type=float, default=32)
+    p.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.command == "loadtest":
+        loadtest(args)
+        return
+
+    db = ConnectionManager(args.db, pool_size=max(4, getattr(args, 'threads', 4)))
+    service = CVService(db)
+    service.init_schema()
+    try:
+        if args.command == "publish":
+            ids = list(args.cv)
+            if args.first:
+                with db.read() as cursor:
+                    cursor.execute('SELECT id FROM cvs ORDER BY id LIMIT ?', (args.first,))
+                    ids += [row[0] for row in cursor.fetchall()]
+            for cv_id in ids:
+                service.set_cv_public(cv_id, True)
+            print(f"{len(ids)} CV(s) publié(s)")
+            return
+        server = PublicCVServer(service, int(args.cache_mb * 2**20), args.threads)
+        print(f"CVs publics sur http://{args.host}:{args.port}/cv/<id>", file=sys.stderr)
+        try:
+            asyncio.run(server.serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1229 @@
+import datetime
+import hashlib
+import html
+import json
+import os
+import secrets
+import threading
+import urllib.parse
+from collections import Counter, OrderedDict
+
+from cv_codec import CVCodec
+from cv_facets import FacetIndex, document_facets, experience_bucket, level_value
+from cv_layout import CVLayout, render_pdf
+from cv_model import CVModel
+from cv_similarity import DEFAULT_THRESHOLD, LSHIndex, band_keys, from_blob, signature, similarity
+from cv_timeline import compute_timeline, current_month, timeline_row
+
+# Version du schéma (PRAGMA user_version): les CREATE TABLE ne sont rejoués que si elle change
+SCHEMA_VERSION = 13
+
+# Catalogue de compétences livré avec l'application (JSONL, 1re ligne = en-tête versionné)
+SKILL_CATALOG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "skills_catalog.jsonl")
+
+# Version du balisage de build_html: à incrémenter à chaque changement du
+# rendu (l'export statique régénère alors toutes ses pages)
+HTML_RENDERER_VERSION = 1
+
+# Feuille de style des pages HTML (build_html); la classe du body est le template
+HTML_STYLE = (
+    "body{font-family:Arial,sans-serif;margin:0;background:#f5f6fa;color:#2c3e50}"
+    "main{max-width:800px;margin:2em auto;background:#fff;padding:2em}"
+    "h1{margin:0}h2{border-bottom:2px solid #3498db;padding-bottom:.2em}h3{margin:.6em 0 .2em}"
+    ".headline{font-size:1.2em;color:#3498db}.period{color:#7f8c8d;margin:0}"
+    ".tags li{display:inline-block;background:#ecf0f1;margin:.2em;padding:.2em .6em}"
+    ".modern h2{border-color:#27ae60}.creative h2{border-color:#9b59b6}.professional h2{border-color:#2c3e50}"
+)
+
+
+def hash_password(password):
+    """Hash un mot de passe avec SHA-256"""
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def html_link(url):
+    """Lien HTML vers une URL http(s); tout autre valeur est affichée comme texte"""
+    esc = html.escape
+    try:
+        scheme = urllib.parse.urlsplit(url.strip()).scheme.lower()
+    except ValueError:
+        scheme = ''
+    if scheme in ('http', 'https'):
+        return f'<a href="{esc(url.strip())}" rel="nofollow noopener">{esc(url)}</a>'
+    return esc(url)
+
+
+def filter_skill_names(names, search_term, limit=None):
+    """Filtre une liste de noms de compétences (recherche insensible à la casse)"""
+    search_term = (search_term or '').lower()
+    result = []
+    for name in names:
+        if search_term in name.lower():
+            result.append(name)
+            if limit is not None and len(result) >= limit:
+                break
+    return result
+
+
+def read_catalog_header(path):
+    """Lit uniquement l'en-tête (version) du catalogue, sans parcourir les compétences"""
+    with open(path, encoding='utf-8') as f:
+        return json.loads(f.readline())
+
+
+def iter_catalog(path):
+    """Itère sur les compétences du catalogue (name, category, description)"""
+    with open(path, encoding='utf-8') as f:
+        f.readline()  # en-tête
+        for line in f:
+            line = line.strip()
+            if line:
+                skill = json.loads(line)
+                yield skill['name'], skill.get('category'), skill.get('description')
+
+
+def _copy_cv_data(data):
+    """Copie les sections d'un CV (listes/dicts), pas les entrées elles-mêmes.
+
+    L'éditeur remplace les entrées modifiées mais ajoute/supprime dans les
+    listes de sections: chaque lecteur du cache reçoit donc ses propres listes.
+    """
+    return {key: list(value) if isinstance(value, list) else dict(value) if isinstance(value, dict) else value
+            for key, value in data.items()}
+
+
+class CVCache:
+    """LRU borné de CVs décodés, indexé par cv_id et validé par la version (cvs.version)"""
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # cv_id -> (version, cv)
+        self._lock = threading.Lock()
+
+    def get(self, cv_id, version=None):
+        """CV en cache (copie), ou None si absent ou périmé (version différente)"""
+        with self._lock:
+            entry = self._entries.get(cv_id)
+            if entry is None or (version is not None and entry[0] != version):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(cv_id)
+            self.hits += 1
+        cv = dict(entry[1])
+        cv['data'] = _copy_cv_data(cv['data'])
+        return cv
+
+    def put(self, cv_id, version, cv):
+        cv = dict(cv)
+        cv['data'] = _copy_cv_data(cv['data'])
+        with self._lock:
+            self._entries[cv_id] = (version, cv)
+            self._entries.move_to_end(cv_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, cv_id):
+        with self._lock:
+            self._entries.pop(cv_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# -----------------------
+# Service CV (sans Tk)
+# -----------------------
+class CVService:
+    """Accès aux données de la plateforme, indépendant de l'interface.
+
+    Utilisé par CVGeneratorApp et par les outils en ligne de commande
+    (benchmarks, ...). Les erreurs SQLite sont propagées à l'appelant.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        # Cache nom <-> id des compétences (chargé au premier usage)
+        self._skill_ids = None
+        self._skill_names = None
+        self._sorted_skill_names = None
+        # Codec des documents CV (chargé au premier usage)
+        self._codec = None
+        # CVs décodés récemment (évite requête + décompression + JSON)
+        self.cv_cache = CVCache()
+        # Écritures non urgentes (cv_db.DeferredWriter), None = immédiates
+        self.deferred = None
+        # Index de facettes des candidats (chargé par load_facet_index)
+        self.facets = None
+        self._facet_lock = threading.Lock()
+        self._facet_pending = None
+        # Mois jusqu'auquel les frises ont été avancées (refresh_timelines)
+        self.timelines_as_of = None
+        # Mise en page des exports PDF, partagée avec l'aperçu de l'éditeur
+        self.layout = CVLayout()
+
+    # -----------------------
+    # Schéma
+    # -----------------------
+    def init_schema(self):
+        """Crée les tables si la version du schéma a changé"""
+        with self.db.read() as cursor:
+            cursor.execute('PRAGMA user_version')
+            version = cursor.fetchone()[0]
+            if version >= SCHEMA_VERSION:
+                return
+
+        with self.db.write() as cursor:
+            # Table utilisateurs
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    email TEXT UNIQUE NOT NULL,
+                    password_hash TEXT NOT NULL,
+                    first_name TEXT NOT NULL,
+                    last_name TEXT NOT NULL,
+                    role TEXT DEFAULT 'candidate',
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    last_login DATETIME,
+                    is_active BOOLEAN DEFAULT 1
+                )
+            ''')
+
+            # Table CVs
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS cvs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    title TEXT NOT NULL,
+                    template TEXT DEFAULT 'classic',
+                    data TEXT NOT NULL,
+                    photo_path TEXT,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    is_public BOOLEAN DEFAULT 0,
+                    view_count INTEGER DEFAULT 0,
+                    version INTEGER NOT NULL DEFAULT 1,
+                    FOREIGN KEY (user_id) REFERENCES users (id)
+                )
+            ''')
+            # Version du contenu, incrémentée à chaque écriture (updated_at n'a
+            # qu'une précision d'une seconde): caches, ETags, miniatures
+            cursor.execute('PRAGMA table_info(cvs)')
+            if 'version' not in {row[1] for row in cursor.fetchall()}:
+                cursor.execute('ALTER TABLE cvs ADD COLUMN version INTEGER NOT NULL DEFAULT 1')
+
+            # Table compétences
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS skills (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT UNIQUE NOT NULL,
+                    category TEXT,
+                    description TEXT
+                )
+            ''')
+
+            # Table compétences utilisateur
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS user_skills (
+                    user_id INTEGER NOT NULL,
+                    skill_id INTEGER NOT NULL,
+                    level INTEGER DEFAULT 1,
+                    experience_years INTEGER DEFAULT 0,
+                    last_used INTEGER,
+                    updated_at DATETIME,
+                    PRIMARY KEY (user_id, skill_id),
+                    FOREIGN KEY (user_id) REFERENCES users (id),
+                    FOREIGN KEY (skill_id) REFERENCES skills (id)
+                )
+            ''')
+            # Date de dernière modification (repère de l'export incrémental)
+            cursor.execute('PRAGMA table_info(user_skills)')
+            if 'updated_at' not in {row[1] for row in cursor.fetchall()}:
+                cursor.execute('ALTER TABLE user_skills ADD COLUMN updated_at DATETIME')
+                cursor.execute('UPDATE user_skills SET updated_at = CURRENT_TIMESTAMP')
+
+            # Lignes supprimées (CVs, compétences utilisateur) pour l'export
+            # incrémental (cv_export.py): row_key = clé primaire en JSON
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS deletions (
+                    id INTEGER PRIMARY KEY,
+                    table_name TEXT NOT NULL,
+                    row_key TEXT NOT NULL,
+                    deleted_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+
+            # Table historique CV
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS cv_history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    cv_id INTEGER NOT NULL,
+                    data TEXT NOT NULL,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (cv_id) REFERENCES cvs (id)
+                )
+            ''')
+
+            # Table vues CV
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS cv_views (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    cv_id INTEGER NOT NULL,
+                    viewer_id INTEGER,
+                    viewed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    ip_address TEXT,
+                    FOREIGN KEY (cv_id) REFERENCES cvs (id),
+                    FOREIGN KEY (viewer_id) REFERENCES users (id)
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_cv_views_cv_id ON cv_views (cv_id, viewed_at)')
+
+            # Liste des CVs d'un utilisateur (tableau de bord), plus récents d'abord
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_cvs_user_id ON cvs (user_id, updated_at)')
+
+            # Export incrémental des CVs modifiés (cv_export.py)
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_cvs_updated_at ON cvs (updated_at)')
+
+            # Sessions "se souvenir de moi" (seul le hash du jeton est stocké)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sessions (
+                    token_hash TEXT PRIMARY KEY,
+                    user_id INTEGER NOT NULL,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    expires_at DATETIME NOT NULL,
+                    FOREIGN KEY (user_id) REFERENCES users (id)
+                )
+            ''')
+
+            # Dictionnaires de compression des documents CV (cv_codec.py)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS cv_dictionaries (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    data BLOB NOT NULL,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+
+            # Frise de carrière précalculée (cv_timeline.py), mise à jour à chaque enregistrement
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS cv_timeline (
+                    cv_id INTEGER PRIMARY KEY,
+                    experience_months INTEGER NOT NULL,
+                    has_current BOOLEAN NOT NULL,
+                    current_position TEXT,
+                    current_company TEXT,
+                    first_start INTEGER,
+                    last_end INTEGER,
+                    gap_months INTEGER NOT NULL,
+                    largest_gap_months INTEGER NOT NULL,
+                    education_end INTEGER,
+                    unparsed_dates INTEGER NOT NULL,
+                    entry_keys TEXT NOT NULL,
+                    as_of INTEGER NOT NULL,
+                    FOREIGN KEY (cv_id) REFERENCES cvs (id)
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_cv_timeline_experience ON cv_timeline (experience_months)')
+
+            # Facettes tirées du document CV (cv_facets.py): langues, ville, diplômes
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS cv_facets (
+                    cv_id INTEGER NOT NULL,
+                    facet TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    PRIMARY KEY (cv_id, facet, value)
+                ) WITHOUT ROWID
+            ''')
+
+            # Signatures MinHash et bandes LSH (cv_similarity.py): CVs quasi identiques
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS cv_signatures (
+                    cv_id INTEGER PRIMARY KEY,
+                    signature BLOB NOT NULL,
+                    FOREIGN KEY (cv_id) REFERENCES cvs (id)
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS cv_lsh (
+                    band INTEGER NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    cv_id INTEGER NOT NULL,
+                    PRIMARY KEY (band, bucket, cv_id)
+                ) WITHOUT ROWID
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_cv_lsh_cv ON cv_lsh (cv_id)')
+
+            # File de tâches durable (cv_jobs.py): exports, imports, réindexation
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    state TEXT NOT NULL DEFAULT 'queued',
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    available_at REAL NOT NULL,
+                    enqueued_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    worker TEXT,
+                    owner TEXT,
+                    result TEXT,
+                    last_error TEXT
+                )
+            ''')
+            # owner: worker seul autorisé à réclamer la tâche (fichiers locaux), NULL: n'importe lequel
+            cursor.execute('PRAGMA table_info(jobs)')
+            if 'owner' not in {row[1] for row in cursor.fetchall()}:
+                cursor.execute('ALTER TABLE jobs ADD COLUMN owner TEXT')
+            # tâches réclamables (en file, ou bail à surveiller), par priorité
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (priority DESC, available_at)
+                WHERE state IN ('queued', 'running')
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (finished_at) WHERE state = \'done\'')
+
+            # Miniature courante de chaque CV (cv_thumbnails.py): hash du contenu et version représentée
+            if version == 10:
+                # schéma 10: miniatures repérées par updated_at, régénérées à la demande
+                cursor.execute('DROP TABLE IF EXISTS cv_thumbnails')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS cv_thumbnails (
+                    cv_id INTEGER PRIMARY KEY,
+                    content_hash TEXT NOT NULL,
+                    version INTEGER NOT NULL
+                )
+            ''')
+
+            # Métadonnées (versions des données livrées)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            ''')
+
+            cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+        # CVs enregistrés avant la frise de carrière / les facettes / les signatures
+        if version < 8:
+            self.rebuild_cv_index()
+
+    def get_meta(self, key, default=None):
+        with self.db.read() as cursor:
+            cursor.execute('SELECT value FROM meta WHERE key = ?', (key,))
+            row = cursor.fetchone()
+        return row[0] if row else default
+
+    # -----------------------
+    # Compression des CVs
+    # -----------------------
+    @property
+    def codec(self):
+        """Codec des documents CV (dictionnaire actif lu dans meta)"""
+        if self._codec is None:
+            active = self.get_meta('cv_codec_dict')
+            self._codec = CVCodec(active_dict=int(active) if active is not None else None,
+                                  loader=self._load_cv_dictionary)
+        return self._codec
+
+    def _load_cv_dictionary(self, dict_id):
+        with self.db.read() as cursor:
+            cursor.execute('SELECT data FROM cv_dictionaries WHERE id = ?', (dict_id,))
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    def add_cv_dictionary(self, zdict):
+        """Enregistre un dictionnaire et l'active pour les prochains encodages"""
+        with self.db.write() as cursor:
+            cursor.execute('INSERT INTO cv_dictionaries (data) VALUES (?)', (zdict,))
+            dict_id = cursor.lastrowid
+            cursor.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                           ('cv_codec_dict', str(dict_id)))
+        self._codec = None
+        return dict_id
+
+    def sync_skill_catalog(self, path=SKILL_CATALOG_FILE, batch_size=5000):
+        """Charge le catalogue de compétences si sa version a changé.
+
+        Seul l'en-tête est lu quand la version est inchangée, le coût au
+        démarrage ne dépend donc pas de la taille du catalogue. Sinon, les
+        compétences sont chargées par lots (executemany) dans une seule
+        transaction. Retourne True si le catalogue a été (re)chargé.
+        """
+        if not os.path.exists(path):
+            return False
+        version = str(read_catalog_header(path)['version'])
+        if self.get_meta('skills_catalog_version') == version:
+            return False
+
+        with self.db.write() as cursor:
+            batch = []
+            for skill in iter_catalog(path):
+                batch.append(skill)
+                if len(batch) >= batch_size:
+                    self._upsert_skills(cursor, batch)
+                    batch = []
+            if batch:
+                self._upsert_skills(cursor, batch)
+            cursor.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                           ('skills_catalog_version', version))
+        self._skill_ids = None
+        return True
+
+    def _upsert_skills(self, cursor, rows):
+        cursor.executemany('''
+            INSERT INTO skills (name, category, description) VALUES (?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET category = excluded.category,
+                                            description = excluded.description
+        ''', rows)
+
+    # -----------------------
+    # Utilisateurs
+    # -----------------------
+    def authenticate(self, email, password):
+        """Retourne l'utilisateur (dict) si les identifiants sont valides, sinon None"""
+        with self.db.read() as cursor:
+            cursor.execute('SELECT id, first_name, last_name, role FROM users WHERE email = ? AND password_hash = ? AND is_active = 1',
+                           (email, hash_password(password)))
+            user = cursor.fetchone()
+        if not user:
+            return None
+        return {
+            'id': user[0],
+            'first_name': user[1],
+            'last_name': user[2],
+            'role': user[3],
+            'email': email
+        }
+
+    def touch_last_login(self, user_id):
+        """Met à jour la date de dernière connexion (différée si self.deferred est défini)"""
+        if self.deferred is not None:
+            # horodatage pris à l'écriture du lot: une date antérieure au commit
+            # pourrait passer sous le repère de l'export incrémental (cv_export.py)
+            self.deferred.submit(('last_login', user_id), 'UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?',
+                                 (user_id,))
+            return
+        with self.db.write() as cursor:
+            cursor.execute('UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?', (user_id,))
+
+    def create_user(self, email, password, first_name, last_name, role):
+        """Crée un utilisateur; retourne son ID, ou None si l'email est déjà utilisé"""
+        password_hash = hash_password(password)
+        with self.db.write() as cursor:
+            cursor.execute('SELECT id FROM users WHERE email = ?', (email,))
+            if cursor.fetchone():
+                return None
+            cursor.execute('INSERT INTO users (email, password_hash, first_name, last_name, role) VALUES (?, ?, ?, ?, ?)',
+                           (email, password_hash, first_name, last_name, role))
+            return cursor.lastrowid
+
+    def create_session(self, user_id, days=30):
+        """Crée une session persistante; retourne (jeton, date d'expiration UTC)"""
+        token = secrets.token_urlsafe(32)
+        expires_at = (datetime.datetime.now(datetime.timezone.utc)
+                      + datetime.timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+        with self.db.write() as cursor:
+            cursor.execute('DELETE FROM sessions WHERE expires_at <= CURRENT_TIMESTAMP')
+            cursor.execute('INSERT INTO sessions (token_hash, user_id, expires_at) VALUES (?, ?, ?)',
+                           (hash_password(token), user_id, expires_at))
+        return token, expires_at
+
+    def resume_session(self, token):
+        """Retourne l'utilisateur (dict) d'une session valide, sinon None"""
+        with self.db.read() as cursor:
+            cursor.execute('''
+                SELECT u.id, u.first_name, u.last_name, u.role, u.email
+                FROM sessions s JOIN users u ON u.id = s.user_id
+                WHERE s.token_hash = ? AND s.expires_at > CURRENT_TIMESTAMP AND u.is_active = 1
+            ''', (hash_password(token),))
+            user = cursor.fetchone()
+        if not user:
+            return None
+        return {
+            'id': user[0],
+            'first_name': user[1],
+            'last_name': user[2],
+            'role': user[3],
+            'email': user[4]
+        }
+
+    def delete_session(self, token):
+        with self.db.write() as cursor:
+            cursor.execute('DELETE FROM sessions WHERE token_hash = ?', (hash_password(token),))
+
+    # -----------------------
+    # CVs
+    # -----------------------
+    def list_user_cvs(self, user_id):
+        """Liste (id, titre, date de création, version) des CVs d'un utilisateur, plus récents d'abord"""
+        with self.db.read() as cursor:
+            cursor.execute('SELECT id, title, created_at, version FROM cvs WHERE user_id = ? ORDER BY updated_at DESC',
+                           (user_id,))
+            return cursor.fetchall()
+
+    def get_cv(self, cv_id, version=None):
+        """Retourne {'data', 'photo_path', 'template'} pour un CV, ou None s'il n'existe pas.
+
+        Servi depuis le cache si possible; version (connue par
+        list_user_cvs) permet d'écarter une version modifiée ailleurs.
+        """
+        cv = self.cv_cache.get(cv_id, version)
+        if cv is not None:
+            return cv
+        with self.db.read() as cursor:
+            cursor.execute('SELECT data, photo_path, template, version FROM cvs WHERE id = ?', (cv_id,))
+            row = cursor.fetchone()
+        if not row:
+            return None
+        data, photo_path, template, version = row
+        cv = {
+            'data': self.codec.decode(data),
+            'photo_path': photo_path,
+            'template': template
+        }
+        self.cv_cache.put(cv_id, version, cv)
+        return cv
+
+    def get_cv_model(self, cv_id, version=None):
+        """Comme get_cv, avec data validé en CVModel (lève InvalidCV)"""
+        cv = self.get_cv(cv_id, version)
+        if cv is None:
+            return None
+        cv['data'] = CVModel.from_dict(cv['data'])
+        return cv
+
+    def cv_version(self, cv_id):
+        """(version, date de modification) d'un CV, ou None s'il n'existe pas"""
+        with self.db.read() as cursor:
+            cursor.execute('SELECT version, updated_at FROM cvs WHERE id = ?', (cv_id,))
+            return cursor.fetchone()
+
+    def create_cv(self, user_id, title, data, template):
+        """Crée un CV et retourne son ID"""
+        with self.db.write() as cursor:
+            cursor.execute('INSERT INTO cvs (user_id, title, data, template) VALUES (?, ?, ?, ?)',
+                           (user_id, title, self.codec.encode(data), template))
+            cv_id = cursor.lastrowid
+            self._save_derived(cursor, [(cv_id, data)])
+        self._touch_facets([cv_id])
+        return cv_id
+
+    def import_cvs(self, records, password_hash, attach_existing=True):
+        """Crée utilisateurs et CVs pour un lot de records, en une transaction.
+
+        records: liste de dicts {email, first_name, last_name, title,
+        template, data}. Les utilisateurs sont retrouvés par email; ceux
+        qui existent déjà reçoivent le CV si attach_existing, sinon leurs
+        records sont ignorés. Retourne (utilisateurs créés, CVs créés, ignorés).
+        """
+        emails = list(dict.fromkeys(r['email'] for r in records))
+        with self.db.write() as cursor:
+            existing = {}
+            for start in range(0, len(emails), 500):
+                chunk = emails[start:start + 500]
+                placeholders = ', '.join('?' * len(chunk))
+                cursor.execute(f'SELECT email, id FROM users WHERE email IN ({placeholders})', chunk)
+                existing.update(cursor.fetchall())
+
+            new_users = {}
+            for r in records:
+                if r['email'] not in existing and r['email'] not in new_users:
+                    new_users[r['email']] = (r['email'], password_hash, r['first_name'], r['last_name'], 'candidat')
+            cursor.executemany('INSERT INTO users (email, password_hash, first_name, last_name, role) VALUES (?, ?, ?, ?, ?)',
+                               list(new_users.values()))
+
+            user_ids = dict(existing)
+            new_emails = list(new_users)
+            for start in range(0, len(new_emails), 500):
+                chunk = new_emails[start:start + 500]
+                placeholders = ', '.join('?' * len(chunk))
+                cursor.execute(f'SELECT email, id FROM users WHERE email IN ({placeholders})', chunk)
+                user_ids.update(cursor.fetchall())
+
+            kept = [r for r in records if attach_existing or r['email'] not in existing]
+            rows = [(user_ids[r['email']], r['title'], self.codec.encode(r['data']), r['template'])
+                    for r in kept]
+            cursor.executemany('INSERT INTO cvs (user_id, title, data, template) VALUES (?, ?, ?, ?)', rows)
+            # ids consécutifs: insertion dans une seule transaction d'écriture
+            cursor.execute('SELECT last_insert_rowid()')
+            first_id = cursor.fetchone()[0] - len(kept) + 1
+            self._save_derived(cursor, [(first_id + i, r['data']) for i, r in enumerate(kept)])
+        self._touch_facets(range(first_id, first_id + len(kept)))
+        return len(new_users), len(rows), len(records) - len(rows)
+
+    def save_cv(self, cv_id, data, photo_path, template):
+        """Enregistre le CV et ajoute une entrée d'historique (même transaction).
+
+        data: dict, ou CVModel (seules ses sections modifiées sont resérialisées).
+        Retourne la nouvelle version du CV (cvs.version); si document, photo et
+        template sont inchangés, rien n'est écrit et la version reste la même.
+        """
+        if isinstance(data, CVModel):
+            blob = self.codec.encode_json(data.to_json())
+        else:
+            blob = self.codec.encode(data)
+        with self.db.write() as cursor:
+            cursor.execute('''
+                UPDATE cvs SET data = ?, updated_at = CURRENT_TIMESTAMP, version = version + 1,
+                               photo_path = ?, template = ?
+                WHERE id = ? AND (data IS NOT ? OR photo_path IS NOT ? OR template IS NOT ?)
+            ''', (blob, photo_path, template, cv_id, blob, photo_path, template))
+            changed = cursor.rowcount > 0
+            if changed:
+                cursor.execute('INSERT INTO cv_history (cv_id, data) VALUES (?, ?)',
+                               (cv_id, blob))
+                self._save_derived(cursor, [(cv_id, data)])
+            cursor.execute('SELECT version FROM cvs WHERE id = ?', (cv_id,))
+            row = cursor.fetchone()
+        if not row:
+            return None
+        if not changed:
+            return row[0]
+        self._touch_facets([cv_id])
+        if isinstance(data, CVModel):
+            self.cv_cache.invalidate(cv_id)
+        else:
+            self.cv_cache.put(cv_id, row[0], {'data': data, 'photo_path': photo_path, 'template': template})
+        return row[0]
+
+    def delete_cv(self, cv_id):
+        """Supprime un CV; retourne le chemin de sa photo (à supprimer par l'appelant)"""
+        with self.db.write() as cursor:
+            cursor.execute('SELECT photo_path FROM cvs WHERE id = ?', (cv_id,))
+            row = cursor.fetchone()
+            cursor.execute('DELETE FROM cvs WHERE id = ?', (cv_id,))
+            if row:
+                cursor.execute("INSERT INTO deletions (table_name, row_key) VALUES ('cvs', ?)",
+                               (json.dumps({'id': cv_id}),))
+            cursor.execute('DELETE FROM cv_timeline WHERE cv_id = ?', (cv_id,))
+            cursor.execute('DELETE FROM cv_facets WHERE cv_id = ?', (cv_id,))
+            cursor.execute('DELETE FROM cv_signatures WHERE cv_id = ?', (cv_id,))
+            cursor.execute('DELETE FROM cv_lsh WHERE cv_id = ?', (cv_id,))
+            cursor.execute('DELETE FROM cv_thumbnails WHERE cv_id = ?', (cv_id,))
+        self.cv_cache.invalidate(cv_id)
+        self._touch_facets([cv_id])
+        return row[0] if row else None
+
+    # -----------------------
+    # Miniatures
+    # -----------------------
+    def set_cv_thumbnail(self, cv_id, content_hash, version):
+        """Associe un CV (s'il existe encore) à sa miniature pour la version donnée"""
+        with self.db.write() as cursor:
+            cursor.execute('''
+                INSERT INTO cv_thumbnails (cv_id, content_hash, version)
+                SELECT id, ?, ? FROM cvs WHERE id = ?
+                ON CONFLICT (cv_id) DO UPDATE SET content_hash = excluded.content_hash,
+                                                  version = excluded.version
+            ''', (content_hash, version, cv_id))
+
+    def cv_thumbnails(self, cv_ids):
+        """{cv_id: (hash du contenu, version représentée)} des CVs qui ont une miniature"""
+        if not cv_ids:
+            return {}
+        with self.db.read() as cursor:
+            cursor.execute(f'''
+                SELECT cv_id, content_hash, version FROM cv_thumbnails
+                WHERE cv_id IN ({', '.join('?' * len(cv_ids))})
+            ''', list(cv_ids))
+            return {cv_id: (key, version) for cv_id, key, version in cursor.fetchall()}
+
+    def thumbnail_hashes(self):
+        with self.db.read() as cursor:
+            cursor.execute('SELECT DISTINCT content_hash FROM cv_thumbnails')
+            return {row[0] for row in cursor.fetchall()}
+
+    def set_cv_public(self, cv_id, public):
+        """Publie (ou retire) un CV du service public (cv_public.py)"""
+        with self.db.write() as cursor:
+            cursor.execute('UPDATE cvs SET is_public = ? WHERE id = ?', (int(bool(public)), cv_id))
+
+    def is_cv_public(self, cv_id):
+        with self.db.read() as cursor:
+            cursor.execute('SELECT is_public FROM cvs WHERE id = ?', (cv_id,))
+            row = cursor.fetchone()
+        return bool(row and row[0])
+
+    def public_cv_version(self, cv_id):
+        """(version, template) d'un CV public, ou None (inexistant ou privé)"""
+        with self.db.read() as cursor:
+            cursor.execute('SELECT version, template FROM cvs WHERE id = ? AND is_public = 1', (cv_id,))
+            return cursor.fetchone()
+
+    def record_views(self, views):
+        """Enregistre un lot de vues [(cv_id, adresse IP, horodatage UTC)] en une transaction"""
+        if not views:
+            return
+        counts = Counter(cv_id for cv_id, _, _ in views)
+        with self.db.write() as cursor:
+            cursor.executemany('INSERT INTO cv_views (cv_id, ip_address, viewed_at) VALUES (?, ?, ?)', views)
+            cursor.executemany('UPDATE cvs SET view_count = view_count + ? WHERE id = ?',
+                               [(n, cv_id) for cv_id, n in counts.items()])
+
+    def set_cv_photo(self, cv_id, photo_path):
+        """Change la photo d'un CV; retourne sa nouvelle version (None s'il n'existe pas)"""
+        with self.db.write() as cursor:
+            cursor.execute('UPDATE cvs SET photo_path = ?, updated_at = CURRENT_TIMESTAMP, version = version + 1 WHERE id = ?',
+                           (photo_path, cv_id))
+            cursor.execute('SELECT version FROM cvs WHERE id = ?', (cv_id,))
+            row = cursor.fetchone()
+        self.cv_cache.invalidate(cv_id)
+        return row[0] if row else None
+
+    # -----------------------
+    # Données dérivées: frise de carrière (cv_timeline.py), facettes
+    # (cv_facets.py), signatures (cv_similarity.py)
+    # -----------------------
+    def _save_derived(self, cursor, items, now=None):
+        """Écrit frise, facettes de document et signature pour items [(cv_id, data)]"""
+        if not items:
+            return
+        now = current_month() if now is None else now
+        timelines = []
+        facets = []
+        signatures = []
+        bands = []
+        for cv_id, data in items:
+            timelines.append(timeline_row(cv_id, compute_timeline(data, now)))
+            facets.extend((cv_id, facet, value) for facet, value in document_facets(data))
+            sig = signature(data)
+            if sig is not None:
+                signatures.append((cv_id, sig.tobytes()))
+                bands.extend((band, bucket, cv_id) for band, bucket in band_keys(sig))
+        cv_ids = [(cv_id,) for cv_id, _ in items]
+        cursor.executemany('INSERT OR REPLACE INTO cv_timeline VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', timelines)
+        cursor.executemany('DELETE FROM cv_facets WHERE cv_id = ?', cv_ids)
+        cursor.executemany('INSERT OR IGNORE INTO cv_facets (cv_id, facet, value) VALUES (?, ?, ?)', facets)
+        cursor.executemany('DELETE FROM cv_signatures WHERE cv_id = ?', cv_ids)
+        cursor.executemany('DELETE FROM cv_lsh WHERE cv_id = ?', cv_ids)
+        cursor.executemany('INSERT INTO cv_signatures (cv_id, signature) VALUES (?, ?)', signatures)
+        cursor.executemany('INSERT OR IGNORE INTO cv_lsh (band, bucket, cv_id) VALUES (?, ?, ?)', bands)
+
+    def rebuild_cv_index(self, batch_size=500, progress=None):
+        """Recalcule frise, facettes et signatures de tous les CVs, par lots d'ID; retourne le nombre de CVs"""
+        last_id = 0
+        count = 0
+        now = current_month()
+        while True:
+            with self.db.read() as cursor:
+                cursor.execute('SELECT id, data FROM cvs WHERE id > ? ORDER BY id LIMIT ?', (last_id, batch_size))
+                rows = cursor.fetchall()
+            if not rows:
+                return count
+            last_id = rows[-1][0]
+            items = []
+            for cv_id, value in rows:
+                try:
+                    items.append((cv_id, self.codec.decode(value)))
+                except ValueError:
+                    continue
+            with self.db.write() as cursor:
+                self._save_derived(cursor, items, now)
+            count += len(items)
+            if progress is not None:
+                progress(count)
+
+    def refresh_timelines(self, now=None):
+        """Fait vieillir les expériences en cours jusqu'au mois courant.
+
+        Une expérience en cours couvre tous les mois jusqu'à as_of: passer
+        au mois now ajoute exactement now - as_of mois au cumul.
+        """
+        now = current_month() if now is None else now
+        with self.db.write() as cursor:
+            cursor.execute('SELECT cv_id FROM cv_timeline WHERE has_current = 1 AND as_of < ?', (now,))
+            cv_ids = [row[0] for row in cursor.fetchall()]
+            cursor.execute('''
+                UPDATE cv_timeline
+                SET experience_months = experience_months + (? - as_of), last_end = ?, as_of = ?
+                WHERE has_current = 1 AND as_of < ?
+            ''', (now, now, now, now))
+        self.timelines_as_of = now
+        # tranche d'expérience des facettes
+        self._touch_facets(cv_ids)
+        return len(cv_ids)
+
+    def ensure_timelines_current(self):
+        """Avance les frises si le mois a changé depuis le dernier refresh_timelines"""
+        if self.timelines_as_of != current_month():
+            self.refresh_timelines()
+
+    def get_timeline(self, cv_id):
+        """Agrégats de la frise d'un CV (dict), ou None"""
+        with self.db.read() as cursor:
+            cursor.execute('''
+                SELECT experience_months, has_current, current_position, current_company,
+                       first_start, last_end, gap_months, largest_gap_months, education_end, unparsed_dates
+                FROM cv_timeline WHERE cv_id = ?
+            ''', (cv_id,))
+            row = cursor.fetchone()
+        if not row:
+            return None
+        keys = ('experience_months', 'has_current', 'current_position', 'current_company', 'first_start',
+                'last_end', 'gap_months', 'largest_gap_months', 'education_end', 'unparsed_dates')
+        return dict(zip(keys, row))
+
+    def cvs_with_experience(self, min_months, limit=100):
+        """CVs d'au moins min_months mois d'expérience (index), les plus expérimentés d'abord.
+
+        Retourne (cv_id, titre, user_id, mois d'expérience, poste actuel).
+        """
+        self.ensure_timelines_current()
+        with self.db.read() as cursor:
+            cursor.execute('''
+                SELECT t.cv_id, c.title, c.user_id, t.experience_months, t.current_position
+                FROM cv_timeline t JOIN cvs c ON c.id = t.cv_id
+                WHERE t.experience_months >= ?
+                ORDER BY t.experience_months DESC
+                LIMIT ?
+            ''', (min_months, limit))
+            return cursor.fetchall()
+
+    # -----------------------
+    # CVs quasi identiques (cv_similarity.py)
+    # -----------------------
+    def similar_cvs(self, cv_id, threshold=DEFAULT_THRESHOLD, same_user=False, limit=20):
+        """CVs proches d'un CV (candidats LSH vérifiés), les plus proches d'abord.
+
+        Retourne (cv_id, titre, user_id, similarité estimée).
+        """
+        with self.db.read() as cursor:
+            cursor.execute('SELECT s.signature, c.user_id FROM cv_signatures s JOIN cvs c ON c.id = s.cv_id WHERE s.cv_id = ?',
+                           (cv_id,))
+            row = cursor.fetchone()
+            if not row:
+                return []
+            sig = from_blob(row[0])
+            cursor.execute(f'''
+                SELECT c.id, c.title, c.user_id, s.signature
+                FROM cvs c JOIN cv_signatures s ON s.cv_id = c.id
+                WHERE c.id IN (
+                    SELECT o.cv_id FROM cv_lsh m
+                    JOIN cv_lsh o ON o.band = m.band AND o.bucket = m.bucket
+                    WHERE m.cv_id = ? AND o.cv_id != ?
+                ){' AND c.user_id = ?' if same_user else ''}
+            ''', (cv_id, cv_id, row[1]) if same_user else (cv_id, cv_id))
+            candidates = cursor.fetchall()
+        result = [(other_id, title, user_id, similarity(sig, from_blob(blob)))
+                  for other_id, title, user_id, blob in candidates]
+        result = [r for r in result if r[3] >= threshold]
+        result.sort(key=lambda r: -r[3])
+        return result[:limit]
+
+    def duplicate_clusters(self, user_id=None, threshold=DEFAULT_THRESHOLD):
+        """Groupes de CVs quasi identiques, d'un utilisateur ou de toute la plateforme.
+
+        Chaque groupe est une liste de (cv_id, titre, user_id); les plus
+        grands groupes d'abord.
+        """
+        index = LSHIndex()
+        rows = {}
+        with self.db.read() as cursor:
+            if user_id is None:
+                cursor.execute('SELECT c.id, c.title, c.user_id, s.signature FROM cvs c JOIN cv_signatures s ON s.cv_id = c.id')
+            else:
+                cursor.execute('''
+                    SELECT c.id, c.title, c.user_id, s.signature
+                    FROM cvs c JOIN cv_signatures s ON s.cv_id = c.id
+                    WHERE c.user_id = ?
+                ''', (user_id,))
+            for cv_id, title, owner, blob in cursor:
+                rows[cv_id] = (cv_id, title, owner)
+                index.add(cv_id, from_blob(blob))
+        return [[rows[cv_id] for cv_id in group] for group in index.clusters(threshold)]
+
+    def cv_stats(self, cv_id):
+        """Retourne (vues totales, visiteurs uniques, dernière vue)"""
+        with self.db.read() as cursor:
+            cursor.execute('SELECT view_count FROM cvs WHERE id = ?', (cv_id,))
+            row = cursor.fetchone()
+            view_count = row[0] if row else 0
+
+            cursor.execute('''
+                SELECT COUNT(DISTINCT viewer_id) as unique_viewers
+                FROM cv_views WHERE cv_id = ?
+            ''', (cv_id,))
+            unique_viewers = cursor.fetchone()[0]
+
+            cursor.execute('''
+                SELECT MAX(viewed_at) as last_view
+                FROM cv_views WHERE cv_id = ?
+            ''', (cv_id,))
+            last_view = cursor.fetchone()[0]
+        return view_count, unique_viewers, last_view
+
+    # -----------------------
+    # Compétences
+    # -----------------------
+    def list_user_skills(self, user_id):
+        """Liste (id, nom, niveau, années d'expérience) des compétences d'un utilisateur"""
+        with self.db.read() as cursor:
+            cursor.execute('''
+                SELECT s.id, s.name, us.level, us.experience_years
+                FROM user_skills us
+                JOIN skills s ON us.skill_id = s.id
+                WHERE us.user_id = ?
+                ORDER BY us.level DESC, us.experience_years DESC
+            ''', (user_id,))
+            return cursor.fetchall()
+
+    def _skill_cache(self):
+        """Correspondance nom -> id de toutes les compétences (chargée une fois)"""
+        if self._skill_ids is None:
+            with self.db.read() as cursor:
+                cursor.execute('SELECT id, name FROM skills')
+                rows = cursor.fetchall()
+            self._skill_ids = {name: skill_id for skill_id, name in rows}
+            self._skill_names = dict(rows)
+            self._sorted_skill_names = None
+        return self._skill_ids
+
+    def list_skill_names(self):
+        """Noms de toutes les compétences, triés"""
+        self._skill_cache()
+        if self._sorted_skill_names is None:
+            self._sorted_skill_names = sorted(self._skill_ids, key=str.casefold)
+        return self._sorted_skill_names
+
+    def skill_name(self, skill_id):
+        """Nom d'une compétence à partir de son ID, ou None"""
+        self._skill_cache()
+        return self._skill_names.get(skill_id)
+
+    def get_skill_id(self, skill_name, create=False):
+        """Retourne l'ID d'une compétence (créée si create=True), ou None"""
+        return self.get_skill_ids([skill_name], create=create).get(skill_name)
+
+    def get_skill_ids(self, skill_names, create=False):
+        """Retourne {nom: id} pour plusieurs compétences.
+
+        Les noms inconnus sont insérés en une seule transaction si
+        create=True, puis ajoutés au cache.
+        """
+        cache = self._skill_cache()
+        missing = [name for name in dict.fromkeys(skill_names) if name not in cache]
+        if missing and create:
+            with self.db.write() as cursor:
+                cursor.executemany('INSERT OR IGNORE INTO skills (name) VALUES (?)',
+                                   [(name,) for name in missing])
+                for start in range(0, len(missing), 500):
+                    chunk = missing[start:start + 500]
+                    placeholders = ', '.join('?' * len(chunk))
+                    cursor.execute(f'SELECT id, name FROM skills WHERE name IN ({placeholders})', chunk)
+                    for skill_id, name in cursor.fetchall():
+                        cache[name] = skill_id
+                        self._skill_names[skill_id] = name
+            self._sorted_skill_names = None
+        return {name: cache[name] for name in skill_names if name in cache}
+
+    def set_user_skills(self, user_id, rows):
+        """Ajoute ou met à jour plusieurs compétences (skill_id, niveau, années) en une transaction"""
+        with self.db.write() as cursor:
+            cursor.executemany('''
+                INSERT OR REPLACE INTO user_skills (user_id, skill_id, level, experience_years, updated_at)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ''', [(user_id, skill_id, level, years) for skill_id, level, years in rows])
+        self._touch_user_facets(user_id)
+
+    def set_user_skill(self, user_id, skill_id, level, experience_years):
+        """Ajoute ou met à jour une compétence utilisateur"""
+        self.set_user_skills(user_id, [(skill_id, level, experience_years)])
+
+    def delete_user_skills(self, user_id, skill_ids):
+        """Supprime plusieurs compétences utilisateur en une transaction"""
+        with self.db.write() as cursor:
+            # tombstones des lignes existantes (export incrémental)
+            cursor.executemany('''
+                INSERT INTO deletions (table_name, row_key)
+                SELECT 'user_skills', ? FROM user_skills WHERE user_id = ? AND skill_id = ?
+            ''', [(json.dumps({'user_id': user_id, 'skill_id': skill_id}), user_id, skill_id)
+                  for skill_id in skill_ids])
+            cursor.executemany('DELETE FROM user_skills WHERE user_id = ? AND skill_id = ?',
+                               [(user_id, skill_id) for skill_id in skill_ids])
+        self._touch_user_facets(user_id)
+
+    # -----------------------
+    # Recherche de candidats par facettes (cv_facets.py)
+    # -----------------------
+    def _facet_keys(self, cv_ids=None):
+        """{cv_id: [(facette, valeur)]} des CVs existants parmi cv_ids (None = tous)"""
+        queries = (
+            ('SELECT id FROM cvs', 'id'),
+            ('SELECT cv_id, facet, value FROM cv_facets', 'cv_id'),
+            ('''SELECT c.id, s.name, us.level FROM cvs c
+                JOIN user_skills us ON us.user_id = c.user_id
+                JOIN skills s ON s.id = us.skill_id''', 'c.id'),
+            ('SELECT cv_id, experience_months FROM cv_timeline', 'cv_id'),
+        )
+        chunks = [None] if cv_ids is None else [cv_ids[i:i + 500] for i in range(0, len(cv_ids), 500)]
+        docs = {}
+        with self.db.read() as cursor:
+            for n, (sql, column) in enumerate(queries):
+                for chunk in chunks:
+                    if chunk is None:
+                        cursor.execute(sql)
+                    else:
+                        cursor.execute(f"{sql} WHERE {column} IN ({', '.join('?' * len(chunk))})", chunk)
+                    for row in cursor:
+                        if n == 0:
+                            docs[row[0]] = []
+                            continue
+                        keys = docs.get(row[0])
+                        if keys is None:
+                            continue
+                        if n == 1:
+                            keys.append((row[1], row[2]))
+                        elif n == 2:
+                            keys += [('skill', row[1]), ('skill_level', level_value(row[1], row[2]))]
+                        else:
+                            keys.append(('experience', experience_bucket(row[1])))
+        return docs
+
+    def load_facet_index(self):
+        """Construit l'index de facettes de tous les CVs (long: à lancer hors du thread Tk).
+
+        Les CVs modifiés pendant la construction sont notés puis
+        rafraîchis une fois l'index en place.
+        """
+        with self._facet_lock:
+            self._facet_pending = set()
+        try:
+            index = FacetIndex.build(self._facet_keys().items())
+        except Exception:
+            with self._facet_lock:
+                self._facet_pending = None
+            raise
+        with self._facet_lock:
+            pending, self._facet_pending = self._facet_pending, None
+            self.facets = index
+        self._touch_facets(pending)
+        return index
+
+    def _touch_facets(self, cv_ids):
+        """Met à jour l'index (s'il est chargé) pour des CVs créés, modifiés ou supprimés"""
+        cv_ids = list(cv_ids)
+        with self._facet_lock:
+            if self._facet_pending is not None:
+                self._facet_pending.update(cv_ids)
+                return
+        index = self.facets
+        if index is None or not cv_ids:
+            return
+        docs = self._facet_keys(cv_ids)
+        for cv_id in cv_ids:
+            if cv_id in docs:
+                index.update(cv_id, docs[cv_id])
+            else:
+                index.remove(cv_id)
+
+    def _touch_user_facets(self, user_id):
+        """Compétences modifiées: rafraîchit les CVs de l'utilisateur"""
+        if self.facets is None and self._facet_pending is None:
+            return
+        with self.db.read() as cursor:
+            cursor.execute('SELECT id FROM cvs WHERE user_id = ?', (user_id,))
+            cv_ids = [row[0] for row in cursor.fetchall()]
+        self._touch_facets(cv_ids)
+
+    def search_candidates(self, filters, limit=50):
+        """Recherche par facettes: retourne (total, lignes, effectifs par facette).
+
+        filters: {facette: [valeurs]} (voir cv_facets.FACETS). Les lignes
+        sont (cv_id, titre, prénom, nom, mois d'expérience, poste actuel).
+        """
+        self.ensure_timelines_current()
+        index = self.facets or self.load_facet_index()
+        total, cv_ids, counts = index.search(filters, limit)
+        rows = {}
+        if cv_ids:
+            with self.db.read() as cursor:
+                cursor.execute(f'''
+                    SELECT c.id, c.title, u.first_name, u.last_name, t.experience_months, t.current_position
+                    FROM cvs c
+                    JOIN users u ON u.id = c.user_id
+                    LEFT JOIN cv_timeline t ON t.cv_id = c.id
+                    WHERE c.id IN ({', '.join('?' * len(cv_ids))})
+                ''', cv_ids)
+                rows = {row[0]: row for row in cursor.fetchall()}
+        return total, [rows[cv_id] for cv_id in cv_ids if cv_id in rows], counts
+
+    # -----------------------
+    # Export
+    # -----------------------
+    def build_pdf(self, cv_data, template='classic', photo_path=None):
+        """Construit le PDF d'un CV, avec la mise en page de l'aperçu (cv_layout)"""
+        # fpdf n'est chargé qu'au premier export (ou au premier aperçu)
+        return render_pdf(self.layout.layout(cv_data, template, photo_path))
+
+    def build_html(self, cv_data, template='classic', title=None):
+        """Page HTML autonome d'un CV (service public, export statique)"""
+        esc = html.escape
+        p = cv_data.get('personal', {})
+        name = f"{p.get('first_name', '')} {p.get('last_name', '')}".strip()
+        parts = [
+            '<!DOCTYPE html>',
+            '<html lang="fr"><head><meta charset="utf-8">',
+            '<meta name="viewport" content="width=device-width, initial-scale=1">',
+            f'<title>{esc(title or name or "CV")}</title>',
+            f'<style>{HTML_STYLE}</style>',
+            f'</head><body class="{esc(template or "classic")}"><main>',
+            f'<header><h1>{esc(name)}</h1>',
+        ]
+        if p.get('title'):
+            parts.append(f'<p class="headline">{esc(p["title"])}</p>')
+        contact = [esc(p[k]) for k in ('email', 'phone', 'address') if p.get(k)]
+        contact += [html_link(p[k]) for k in ('linkedin', 'website') if p.get(k)]
+        if contact:
+            parts.append(f'<p class="contact">{" · ".join(contact)}</p>')
+        parts.append('</header>')
+        if p.get('description'):
+            parts.append(f'<p>{esc(p["description"])}</p>')
+
+        if cv_data.get('experience'):
+            parts.append('<section><h2>Expériences</h2>')
+            for exp in cv_data.get('experience', []):
+                period = f"{exp.get('start_date', '')} - {exp.get('end_date', '') or 'Présent'}"
+                parts.append(f'<article><h3>{esc(exp.get("position", ""))} — {esc(exp.get("company", ""))}</h3>'
+                             f'<p class="period">{esc(period)} {esc(exp.get("location", ""))}</p>')
+                if exp.get('description'):
+                    parts.append(f'<p>{esc(exp["description"])}</p>')
+                parts.append('</article>')
+            parts.append('</section>')
+        if cv_data.get('education'):
+            parts.append('<section><h2>Formations</h2>')
+            for ed in cv_data.get('education', []):
+                period = f"{ed.get('start_year', '')} - {ed.get('end_year', '')}"
+                parts.append(f'<article><h3>{esc(ed.get("degree", ""))} — {esc(ed.get("school", ""))}</h3>'
+                             f'<p class="period">{esc(period)}</p>')
+                if ed.get('description'):
+                    parts.append(f'<p>{esc(ed["description"])}</p>')
+                parts.append('</article>')
+            parts.append('</section>')
+        if cv_data.get('skills'):
+            skills = ''.join(f'<li>{esc(s if isinstance(s, str) else s.get("name", ""))}</li>'
+                             for s in cv_data.get('skills', []))
+            parts.append(f'<section><h2>Compétences</h2><ul class="tags">{skills}</ul></section>')
+        if cv_data.get('languages'):
+            langs = ''.join(f'<li>{esc(l.get("name", ""))} ({esc(l.get("level", ""))})</li>'
+                            for l in cv_data.get('languages', []))
+            parts.append(f'<section><h2>Langues</h2><ul>{langs}</ul></section>')
+        parts.append('</main></body></html>')
+        return '\n'.join(parts)
+
+    def build_text(self, cv_data):
+        """Assemble le CV en texte simple (export Word)"""
+        lines = []
+        p = cv_data.get('personal', {})
+        lines.append(f"{p.get('first_name','')} {p.get('last_name','')}")
+        lines.append(p.get('description',''))
+        lines.append("\nExpériences:")
+        for exp in cv_data.get('experience', []):
+            lines.append(f"- {exp.get('position','')} at {exp.get('company','')} ({exp.get('start_date','')} - {exp.get('end_date','') or 'Présent'})")
+            if exp.get('description'):
+                lines.append(f"  {exp.get('description')}")
+        return "\n".join(lines)
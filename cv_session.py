@@ -0,0 +1,81 @@
+import base64
+import datetime
+import io
+import json
+import os
+
+from cv_codec import CVCodec
+
+# Fichier local de session ("se souvenir de moi"), à côté de la base
+SESSION_FILE = "session.json"
+SNAPSHOT_VERSION = 2    # 2: versions des CVs = cvs.version
+THUMBNAIL_SIZE = (100, 100)
+
+_codec = CVCodec()
+
+
+def utc_now():
+    """Horodatage UTC au format de CURRENT_TIMESTAMP"""
+    return datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def make_thumbnail(photo_path, size=THUMBNAIL_SIZE):
+    """Miniature PNG (base64) d'une photo, ou None; PIL importé à la demande"""
+    if not photo_path or not os.path.exists(photo_path):
+        return None
+    try:
+        from PIL import Image
+        img = Image.open(photo_path)
+        img = img.resize(size, Image.LANCZOS)
+        buf = io.BytesIO()
+        img.save(buf, "PNG", optimize=True)
+    except Exception:
+        return None
+    return base64.b64encode(buf.getvalue()).decode('ascii')
+
+
+def pack_cv_data(data):
+    """Document CV -> texte compact (zlib + base64)"""
+    return base64.b64encode(_codec.encode(data)).decode('ascii')
+
+
+def unpack_cv_data(text):
+    return _codec.decode(base64.b64decode(text))
+
+
+class SessionStore:
+    """Session mémorisée localement: jeton, utilisateur et instantané du dernier CV.
+
+    Le jeton n'est stocké en clair que dans ce fichier (droits 0600); la
+    base n'en conserve que le hash (table sessions).
+    """
+
+    def __init__(self, path=SESSION_FILE):
+        self.path = path
+
+    def load(self):
+        """Retourne la session si elle existe et n'a pas expiré, sinon None"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                session = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if session.get('version') != SNAPSHOT_VERSION or session.get('expires_at', '') <= utc_now():
+            self.clear()
+            return None
+        return session
+
+    def save(self, session):
+        """Écriture atomique, lisible uniquement par l'utilisateur"""
+        session = dict(session, version=SNAPSHOT_VERSION)
+        tmp = self.path + ".tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(session, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
@@ -0,0 +1,300 @@
+"""Détection des CVs quasi identiques: signatures MinHash et index LSH.
+
+Le texte d'un CV est découpé en shingles (suites de 3 mots normalisés).
+La signature MinHash est calculée par permutation unique ("one
+permutation hashing"): chaque shingle est haché une seule fois, les bits
+de poids fort du hachage désignent une des NUM_HASHES cases et chaque case
+garde la plus petite valeur reçue. Une case vide reprend la case non vide
+suivante (densification). La part de cases égales entre deux signatures
+estime la similarité de Jaccard des deux CVs.
+
+L'index LSH découpe la signature en BANDS bandes de ROWS valeurs. Deux CVs
+dont une bande est identique deviennent candidats, puis leur similarité
+estimée est vérifiée. Avec 20 bandes de 6 valeurs, une paire similaire à
+0,8 est candidate dans 99,8 % des cas, à 0,5 dans 27 %, à 0,3 dans 1,4 %.
+Le coût reste donc à peu près linéaire, au lieu de comparer toutes les
+paires de CVs.
+
+CVService enregistre signature et bandes (tables cv_signatures et cv_lsh)
+à chaque enregistrement d'un CV.
+
+    python cv_similarity.py clusters --db cv_platform.db [--user 12]
+    python cv_similarity.py similar --db cv_platform.db --cv 42
+    python cv_similarity.py bench --cvs 100000
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import time
+import zlib
+from array import array
+
+NUM_HASHES = 128
+BANDS = 20
+ROWS = 6
+SHINGLE_SIZE = 3
+DEFAULT_THRESHOLD = 0.8
+
+_BIN_BITS = 7                   # 2 ** 7 = NUM_HASHES cases
+_VALUE_BITS = 32 - _BIN_BITS
+_VALUE_MASK = (1 << _VALUE_BITS) - 1
+_EMPTY = 1 << 32
+_WORD = re.compile(r"\w+")
+
+
+def cv_text(data):
+    """Texte d'un document CV (dict ou CVModel) pris en compte pour la similarité"""
+    personal = data.get('personal') or {}
+    parts = [personal.get(field) for field in ('first_name', 'last_name', 'title', 'address', 'description')]
+    for section, fields in (('experience', ('position', 'company', 'location', 'description')),
+                            ('education', ('degree', 'school', 'description'))):
+        for entry in data.get(section) or []:
+            parts.extend(entry.get(field) for field in fields)
+    parts.extend(s if isinstance(s, str) else s.get('name') for s in data.get('skills') or [])
+    for lang in data.get('languages') or []:
+        parts.extend((lang.get('name'), lang.get('level')))
+    return ' '.join(str(part) for part in parts if part)
+
+
+def shingles(data, size=SHINGLE_SIZE):
+    """Ensemble des suites de size mots (mots seuls pour un texte très court)"""
+    words = _WORD.findall(cv_text(data).lower())
+    if len(words) < size:
+        return set(words)
+    return set(map(' '.join, zip(*(words[i:] for i in range(size)))))
+
+
+def signature(data):
+    """Signature MinHash (array de NUM_HASHES entiers 32 bits), None pour un CV vide"""
+    values = shingles(data)
+    if not values:
+        return None
+    bins = [_EMPTY] * NUM_HASHES
+    for h in map(zlib.crc32, map(str.encode, values)):
+        # crc32 puis multiplication par une constante impaire: bits de poids fort bien mélangés
+        h = (h * 0x9E3779B1) & 0xFFFFFFFF
+        b = h >> _VALUE_BITS
+        v = h & _VALUE_MASK
+        if v < bins[b]:
+            bins[b] = v
+    if _EMPTY in bins:
+        filled = list(bins)
+        for j, value in enumerate(bins):
+            if value == _EMPTY:
+                d = 1
+                while bins[(j + d) % NUM_HASHES] == _EMPTY:
+                    d += 1
+                # le décalage distingue une valeur empruntée de l'originale
+                filled[j] = bins[(j + d) % NUM_HASHES] + (d << _VALUE_BITS)
+        bins = filled
+    return array('I', bins)
+
+
+def from_blob(blob):
+    sig = array('I')
+    sig.frombytes(blob)
+    return sig
+
+
+def similarity(a, b):
+    """Similarité de Jaccard estimée entre deux signatures"""
+    return sum(x == y for x, y in zip(a, b)) / NUM_HASHES
+
+
+def band_keys(sig):
+    """[(bande, clé)] d'une signature"""
+    return [(band, zlib.crc32(sig[band * ROWS:(band + 1) * ROWS].tobytes())) for band in range(BANDS)]
+
+
+def candidate_probability(s):
+    """Probabilité qu'une paire de similarité s partage au moins une bande"""
+    return 1 - (1 - s ** ROWS) ** BANDS
+
+
+class LSHIndex:
+    """Index LSH en mémoire: regroupement des CVs quasi identiques d'un lot"""
+
+    def __init__(self):
+        self.signatures = {}
+        self.buckets = {}
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def add(self, item_id, sig):
+        self.signatures[item_id] = sig
+        for key in band_keys(sig):
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                self.buckets[key] = [item_id]
+            else:
+                bucket.append(item_id)
+
+    def similar(self, sig, threshold=DEFAULT_THRESHOLD):
+        """[(item_id, similarité)] des éléments proches d'une signature"""
+        found = set()
+        for key in band_keys(sig):
+            found.update(self.buckets.get(key, ()))
+        result = [(item_id, similarity(sig, self.signatures[item_id])) for item_id in found]
+        return sorted((item for item in result if item[1] >= threshold), key=lambda item: -item[1])
+
+    def clusters(self, threshold=DEFAULT_THRESHOLD):
+        """Groupes (listes d'ids, 2 éléments ou plus) de similarité >= threshold.
+
+        Dans chaque seau, un élément est comparé aux "meneurs" du seau
+        (éléments qui n'ont rejoint personne) et rattaché au premier
+        assez proche: linéaire si le seau ne contient que des doublons.
+        Les groupes sont fermés par transitivité (union-find).
+        """
+        parent = {}
+
+        def find(x):
+            root = x
+            while parent.get(root, root) != root:
+                root = parent[root]
+            while x != root:
+                parent[x], x = root, parent.get(x, x)
+            return root
+
+        signatures = self.signatures
+        for bucket in self.buckets.values():
+            if len(bucket) < 2:
+                continue
+            leaders = []
+            for item_id in bucket:
+                sig = signatures[item_id]
+                root = find(item_id)
+                for leader in leaders:
+                    leader_root = find(leader)
+                    if leader_root == root:
+                        break
+                    if similarity(sig, signatures[leader]) >= threshold:
+                        parent[root] = leader_root
+                        break
+                else:
+                    leaders.append(item_id)
+
+        groups = {}
+        for item_id in parent:
+            groups.setdefault(find(item_id), []).append(item_id)
+        clusters = [sorted(set(group) | {root}) for root, group in groups.items()]
+        clusters = [group for group in clusters if len(group) > 1]
+        clusters.sort(key=lambda group: (-len(group), group[0]))
+        return clusters
+
+
+# -----------------------
+# Benchmark
+# -----------------------
+def near_copy(rng, data):
+    """Copie retouchée d'un CV (titre, une description, une langue), comme un CV cloné puis adapté"""
+    copy = json.loads(json.dumps(data))
+    copy['personal']['title'] = rng.choice(("Développeur", "Chef de projet", "Consultant", "Analyste"))
+    if copy['experience']:
+        entry = rng.choice(copy['experience'])
+        words = entry['description'].split()
+        entry['description'] = ' '.join(words[:max(len(words) - 8, 0)] + ["Adapté", "pour", "cette", "offre."])
+    if copy['languages'] and rng.random() < 0.5:
+        copy['languages'].pop()
+    return copy
+
+
+def exact_jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def bench(args):
+    from benchmarks.generate_data import make_cv
+
+    rng = random.Random(args.seed)
+    originals = args.cvs - int(args.cvs * args.duplicates)
+    docs = [make_cv(rng, f"Prénom{i}", f"Nom{i}", f"user{i}@bench.example") for i in range(originals)]
+    planted = []
+    while len(docs) < args.cvs:
+        source = rng.randrange(originals)
+        planted.append((source, len(docs)))
+        docs.append(near_copy(rng, docs[source]))
+
+    start = time.perf_counter()
+    signatures = [signature(doc) for doc in docs]
+    sign_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = LSHIndex()
+    for i, sig in enumerate(signatures):
+        index.add(i, sig)
+    clusters = index.clusters(args.threshold)
+    cluster_s = time.perf_counter() - start
+
+    cluster_of = {i: n for n, group in enumerate(clusters) for i in group}
+    found = sum(1 for a, b in planted if a in cluster_of and cluster_of.get(a) == cluster_of.get(b))
+    sample = rng.sample(planted, min(200, len(planted)))
+    true_sims = sorted(exact_jaccard(shingles(docs[a]), shingles(docs[b])) for a, b in sample)
+
+    # paires comparées une à une (Jaccard exact) sur un échantillon, extrapolé au lot complet
+    n = min(args.pairwise_sample, len(docs))
+    sets = [shingles(doc) for doc in docs[:n]]
+    start = time.perf_counter()
+    for i in range(n):
+        for j in range(i + 1, n):
+            exact_jaccard(sets[i], sets[j])
+    pairwise_s = (time.perf_counter() - start) * (len(docs) / n) ** 2
+
+    print(json.dumps({
+        'cvs': len(docs),
+        'planted_duplicates': len(planted),
+        'planted_similarity_median': round(true_sims[len(true_sims) // 2], 2) if true_sims else None,
+        'signature_us_per_cv': round(sign_s / len(docs) * 1e6, 1),
+        'lsh_cluster_s': round(cluster_s, 2),
+        'clusters': len(clusters),
+        'recall': round(found / len(planted), 3) if planted else None,
+        'clustered_cvs': len(cluster_of),
+        'pairwise_estimate_s': round(pairwise_s),
+    }, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CVs quasi identiques (MinHash / LSH)")
+    parser.add_argument("command", choices=("clusters", "similar", "bench"))
+    parser.add_argument("--db", default="cv_platform.db")
+    parser.add_argument("--user", type=int, help="limiter aux CVs d'un utilisateur")
+    parser.add_argument("--cv", type=int, help="CV de référence (similar)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--cvs", type=int, default=100000)
+    parser.add_argument("--duplicates", type=float, default=0.05, help="part de copies retouchées (bench)")
+    parser.add_argument("--pairwise-sample", type=int, default=1500)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        bench(args)
+        return
+
+    from cv_db import ConnectionManager
+    from cv_services import CVService
+
+    db = ConnectionManager(args.db)
+    service = CVService(db)
+    service.init_schema()
+    try:
+        start = time.perf_counter()
+        if args.command == "clusters":
+            clusters = service.duplicate_clusters(args.user, args.threshold)
+            result = {'clusters': [[{'cv_id': r[0], 'title': r[1], 'user_id': r[2]} for r in group]
+                                   for group in clusters]}
+        else:
+            if args.cv is None:
+                parser.error("--cv est requis pour similar")
+            rows = service.similar_cvs(args.cv, args.threshold, same_user=args.user is not None)
+            result = {'similar': [{'cv_id': r[0], 'title': r[1], 'user_id': r[2], 'similarity': round(r[3], 3)}
+                                  for r in rows]}
+        result['seconds'] = round(time.perf_counter() - start, 3)
+    finally:
+        db.close()
+    print(json.dumps(result, indent=2, ensure_ascii=False), file=sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
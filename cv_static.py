@@ -0,0 +1,214 @@
+"""Export statique des CVs publics (hébergement sur un CDN).
+
+    python cv_static.py --db cv_platform.db --out site/ [--processes 4] [--full] [--no-wal]
+
+Chaque CV public devient site/cv/<id>.html (CVService.build_html) et
+site/index.html les liste. Le manifeste site/manifest.json garde, pour
+chaque page écrite, version (cvs.version) et template du CV ainsi que le nom affiché
+dans l'index: seules les pages nouvelles ou modifiées sont régénérées, et
+celles des CVs retirés ou supprimés sont effacées. L'index est refait à
+partir du manifeste, sans relire les CVs inchangés. Le manifeste garde
+aussi l'empreinte du rendu (HTML_STYLE, HTML_RENDERER_VERSION): si elle a
+changé, toutes les pages sont régénérées.
+
+Le rendu est réparti entre plusieurs processus; chacun lit ses CVs par
+paquets dans sa propre connexion et écrit les pages lui-même.
+"""
+import argparse
+import hashlib
+import html
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from cv_db import wal_enabled
+from cv_services import HTML_RENDERER_VERSION, HTML_STYLE
+
+MANIFEST = "manifest.json"
+MANIFEST_VERSION = 3    # 2: liens du contact limités à http(s); 3: pages repérées par cvs.version
+CHUNK_SIZE = 200
+
+_worker = None  # (db, service) d'un processus de rendu
+
+
+def renderer_key():
+    """Empreinte du rendu des pages (feuille de style et version de build_html)"""
+    return hashlib.sha1(f"{HTML_RENDERER_VERSION}|{HTML_STYLE}".encode('utf-8')).hexdigest()[:16]
+
+
+def load_manifest(out_dir):
+    """{cv_id: entrée} de la dernière construction ({} si absente, d'une autre
+    version ou d'un autre rendu)"""
+    path = os.path.join(out_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != MANIFEST_VERSION or manifest.get('renderer') != renderer_key():
+        return {}
+    return {int(cv_id): entry for cv_id, entry in manifest['pages'].items()}
+
+
+def save_manifest(out_dir, pages):
+    """Écrit le manifeste de façon atomique (fichier temporaire puis renommage)"""
+    path = os.path.join(out_dir, MANIFEST)
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump({'version': MANIFEST_VERSION, 'renderer': renderer_key(),
+                   'pages': {str(k): v for k, v in sorted(pages.items())}},
+                  f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(path + ".tmp", path)
+
+
+def write_file(path, text):
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(path + ".tmp", path)
+
+
+def page_path(out_dir, cv_id):
+    return os.path.join(out_dir, "cv", f"{cv_id}.html")
+
+
+# -----------------------
+# Rendu (processus workers)
+# -----------------------
+def _init_worker(db_file, wal=None):
+    global _worker
+    from cv_jobs import open_database
+    _worker = open_database(db_file, wal)
+
+
+def render_chunk(cv_ids, out_dir):
+    """Écrit les pages d'un paquet de CVs; retourne [(cv_id, entrée du manifeste)]"""
+    db, service = _worker
+    marks = ','.join('?' * len(cv_ids))
+    with db.read() as cursor:
+        cursor.execute(f'SELECT id, data, version, template FROM cvs WHERE id IN ({marks}) AND is_public = 1',
+                       cv_ids)
+        rows = cursor.fetchall()
+    entries = []
+    for cv_id, data, version, template in rows:
+        data = service.codec.decode(data)
+        personal = data.get('personal') or {}
+        name = f"{personal.get('first_name', '')} {personal.get('last_name', '')}".strip()
+        write_file(page_path(out_dir, cv_id), service.build_html(data, template))
+        entries.append((cv_id, {'version': version, 'template': template,
+                                'name': name, 'headline': personal.get('title', '')}))
+    return entries
+
+
+def build_index(pages):
+    """Page d'accueil: liste des CVs publics triés par nom"""
+    esc = html.escape
+    items = [f'<li><a href="cv/{cv_id}.html">{esc(entry["name"] or f"CV {cv_id}")}</a>'
+             + (f' — {esc(entry["headline"])}' if entry['headline'] else '') + '</li>'
+             for cv_id, entry in sorted(pages.items(), key=lambda item: (item[1]['name'].lower(), item[0]))]
+    return '\n'.join([
+        '<!DOCTYPE html>',
+        '<html lang="fr"><head><meta charset="utf-8">',
+        '<meta name="viewport" content="width=device-width, initial-scale=1">',
+        '<title>CVs</title>',
+        f'<style>{HTML_STYLE}</style>',
+        '</head><body><main>',
+        f'<h1>CVs ({len(pages)})</h1>',
+        '<ul>', *items, '</ul>',
+        '</main></body></html>',
+    ])
+
+
+# -----------------------
+# Construction
+# -----------------------
+def build_site(db_file, out_dir, processes=1, full=False, chunk_size=CHUNK_SIZE, wal=None):
+    """Met à jour le site statique; retourne un résumé (pages écrites, supprimées, durée).
+    wal: None pour suivre CV_DB_WAL"""
+    from cv_jobs import open_database
+
+    start = time.perf_counter()
+    os.makedirs(os.path.join(out_dir, "cv"), exist_ok=True)
+    pages = load_manifest(out_dir)
+
+    db, service = open_database(db_file, wal)
+    try:
+        with db.read() as cursor:
+            cursor.execute('SELECT id, version, template FROM cvs WHERE is_public = 1 ORDER BY id')
+            public = cursor.fetchall()
+    finally:
+        db.close()
+
+    public_ids = {cv_id for cv_id, _, _ in public}
+    removed = [cv_id for cv_id in pages if cv_id not in public_ids]
+    for cv_id in removed:
+        del pages[cv_id]
+        try:
+            os.remove(page_path(out_dir, cv_id))
+        except FileNotFoundError:
+            pass
+
+    stale = []
+    for cv_id, version, template in public:
+        entry = pages.get(cv_id)
+        if full or entry is None or entry['version'] != version or entry['template'] != template \
+                or not os.path.exists(page_path(out_dir, cv_id)):
+            stale.append(cv_id)
+    chunks = [stale[i:i + chunk_size] for i in range(0, len(stale), chunk_size)]
+    scanned_s = time.perf_counter() - start
+
+    rendered = set()
+    if chunks:
+        if processes > 1:
+            with multiprocessing.Pool(processes, _init_worker, (db_file, wal)) as pool:
+                for entries in pool.starmap(render_chunk, [(chunk, out_dir) for chunk in chunks]):
+                    pages.update(entries)
+                    rendered.update(cv_id for cv_id, _ in entries)
+        else:
+            global _worker
+            _init_worker(db_file, wal)
+            try:
+                for chunk in chunks:
+                    entries = render_chunk(chunk, out_dir)
+                    pages.update(entries)
+                    rendered.update(cv_id for cv_id, _ in entries)
+            finally:
+                _worker[0].close()
+                _worker = None
+    # CVs retirés entre la lecture de la liste et le rendu
+    for cv_id in set(stale) - rendered:
+        pages.pop(cv_id, None)
+        removed.append(cv_id)
+        try:
+            os.remove(page_path(out_dir, cv_id))
+        except FileNotFoundError:
+            pass
+
+    index_path = os.path.join(out_dir, "index.html")
+    if rendered or removed or not os.path.exists(index_path):
+        write_file(index_path, build_index(pages))
+        save_manifest(out_dir, pages)
+    return {
+        'public_cvs': len(public),
+        'written': len(rendered),
+        'removed': len(removed),
+        'unchanged': len(public) - len(stale),
+        'scan_s': round(scanned_s, 3),
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export statique des CVs publics")
+    parser.add_argument("--db", default="cv_platform.db")
+    parser.add_argument("--out", default="site", help="dossier du site")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--full", action="store_true", help="régénère toutes les pages")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--no-wal", action="store_true", help="journal classique (base sur un partage réseau)")
+    args = parser.parse_args()
+    wal = not args.no_wal and wal_enabled()
+    print(json.dumps(build_site(args.db, args.out, args.processes, args.full, args.chunk_size, wal), indent=2))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""Miniatures des CVs (première page) pour le tableau de bord.
+
+Une miniature est l'image de la première page telle que la met en page
+cv_layout (template, colonnes, photo), le texte étant figuré par des
+barres. Elle est générée en arrière-plan par la tâche "thumbnail" de la
+file (cv_jobs.py), après chaque sauvegarde ou à la première demande. Les
+fichiers étant locaux, ces tâches sont réservées au worker intégré à
+l'application (owner): un worker d'une autre machine écrirait l'image
+dans son propre dossier.
+
+Les fichiers PNG sont rangés dans thumbnails/ sous le hash du contenu
+(document, template, photo): deux versions identiques partagent la même
+image et une image n'est jamais régénérée pour un contenu déjà vu. La
+table cv_thumbnails associe chaque CV au hash de sa dernière miniature et
+à la version (cvs.version) qu'elle représente. L'interface lit les PNG
+avec Tk, sans charger PIL.
+
+    python cv_thumbnails.py build --db cv_platform.db [--limit 500]
+    python cv_thumbnails.py prune --db cv_platform.db
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+from cv_layout import PAGE_H, PAGE_W, PT
+
+THUMBNAIL_DIR = "thumbnails"
+THUMBNAIL_VERSION = 1
+LARGE_WIDTH = 280       # panneau d'aperçu
+SMALL_WIDTH = 54        # liste des CVs
+SUPERSAMPLE = 2
+
+
+def thumbnail_size(width):
+    return width, round(width * PAGE_H / PAGE_W)
+
+
+def content_hash(data, template, photo_path):
+    """Hash du contenu affiché: document, template et fichier photo (taille, date)"""
+    h = hashlib.sha1(f"v{THUMBNAIL_VERSION}|{template}|".encode('utf-8'))
+    h.update(json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    if photo_path and os.path.exists(photo_path):
+        stat = os.stat(photo_path)
+        h.update(f"|{photo_path}|{stat.st_size}|{stat.st_mtime_ns}".encode('utf-8'))
+    return h.hexdigest()
+
+
+def thumbnail_paths(key, folder=THUMBNAIL_DIR):
+    """(petite, grande) miniature d'un hash de contenu"""
+    return os.path.join(folder, f"{key}_s.png"), os.path.join(folder, f"{key}_l.png")
+
+
+def _light(color, amount):
+    """Couleur éclaircie (mélange avec du blanc)"""
+    r, g, b = (int(color[i:i + 2], 16) for i in (1, 3, 5))
+    return tuple(round(c + (255 - c) * amount) for c in (r, g, b))
+
+
+def render_page(document, metrics, width=LARGE_WIDTH):
+    """Image PIL de la première page d'un Document (texte figuré par des barres)"""
+    from PIL import Image, ImageDraw
+
+    s = width * SUPERSAMPLE / PAGE_W
+    img = Image.new('RGB', (round(PAGE_W * s), round(PAGE_H * s)), 'white')
+    draw = ImageDraw.Draw(img)
+    for op in document.ops:
+        if op[1] != 0:
+            continue
+        kind = op[0]
+        if kind == 'rect':
+            _, _, x, y, w, h, color = op
+            draw.rectangle([x * s, y * s, (x + w) * s, (y + h) * s], fill=color)
+        elif kind == 'line':
+            _, _, x1, y1, x2, y2, color, line_w = op
+            draw.line([x1 * s, y1 * s, x2 * s, y2 * s], fill=color, width=max(1, round(line_w * s)))
+        elif kind == 'image':
+            _, _, x, y, w, h, path = op
+            try:
+                with Image.open(path) as photo:
+                    img.paste(photo.convert('RGB').resize((round(w * s), round(h * s))), (round(x * s), round(y * s)))
+            except Exception as e:
+                print(f"[DEBUG] Photo de la miniature ({path}): {e}")
+        else:
+            _, _, x, y, text, style, size, color = op
+            em = size * PT * s
+            length = metrics.width(text, style, size) * s
+            top = y * s + em * 0.3
+            draw.rectangle([x * s, top, x * s + length, top + em * 0.55],
+                           fill=_light(color, 0.2 if 'B' in style else 0.5))
+    img = img.resize(thumbnail_size(width), Image.LANCZOS)
+    ImageDraw.Draw(img).rectangle([0, 0, img.width - 1, img.height - 1], outline='#bdc3c7')
+    return img
+
+
+def _save_png(img, path):
+    img.save(path + ".tmp", "PNG", optimize=True)
+    os.replace(path + ".tmp", path)
+
+
+def ensure_thumbnail(service, cv_id, folder=THUMBNAIL_DIR):
+    """Miniatures d'un CV à jour (rendues seulement si le contenu est nouveau).
+
+    Retourne {'cv_id', 'hash', 'version', 'rendered'}, ou None si le CV
+    n'existe plus.
+    """
+    current = service.cv_version(cv_id)
+    if current is None:
+        return None
+    version = current[0]
+    cv = service.get_cv(cv_id, version)
+    if cv is None:
+        return None
+    key = content_hash(cv['data'], cv['template'], cv['photo_path'])
+    small, large = thumbnail_paths(key, folder)
+    rendered = not (os.path.exists(small) and os.path.exists(large))
+    if rendered:
+        from PIL import Image
+
+        os.makedirs(folder, exist_ok=True)
+        document = service.layout.layout(cv['data'], cv['template'], cv['photo_path'])
+        img = render_page(document, service.layout.metrics, LARGE_WIDTH)
+        _save_png(img, large)
+        _save_png(img.resize(thumbnail_size(SMALL_WIDTH), Image.LANCZOS), small)
+    service.set_cv_thumbnail(cv_id, key, version)
+    return {'cv_id': cv_id, 'hash': key, 'version': version, 'rendered': rendered}
+
+
+def prune(service, folder=THUMBNAIL_DIR):
+    """Supprime les fichiers dont le hash n'est plus référencé; retourne leur nombre"""
+    keep = service.thumbnail_hashes()
+    removed = 0
+    for name in os.listdir(folder) if os.path.isdir(folder) else []:
+        if name.endswith('.png') and name.rsplit('_', 1)[0] not in keep:
+            os.remove(os.path.join(folder, name))
+            removed += 1
+    return removed
+
+
+def main():
+    from cv_db import ConnectionManager
+    from cv_services import CVService
+
+    parser = argparse.ArgumentParser(description="Miniatures des CVs")
+    parser.add_argument("command", choices=("build", "prune"))
+    parser.add_argument("--db", default="cv_platform.db")
+    parser.add_argument("--dir", default=THUMBNAIL_DIR)
+    parser.add_argument("--limit", type=int, default=500, help="CVs traités (build)")
+    args = parser.parse_args()
+
+    db = ConnectionManager(args.db)
+    service = CVService(db)
+    service.init_schema()
+    try:
+        if args.command == "prune":
+            print(json.dumps({'removed': prune(service, args.dir)}))
+            return
+        with db.read() as cursor:
+            cursor.execute('SELECT id FROM cvs ORDER BY id LIMIT ?', (args.limit,))
+            cv_ids = [row[0] for row in cursor.fetchall()]
+        # 1er passage: rendu des contenus nouveaux; 2e: tout est déjà sur disque
+        passes = []
+        for _ in range(2):
+            start = time.perf_counter()
+            rendered = sum(ensure_thumbnail(service, cv_id, args.dir)['rendered'] for cv_id in cv_ids)
+            elapsed = time.perf_counter() - start
+            passes.append({'rendered': rendered, 'ms_per_cv': round(elapsed / max(len(cv_ids), 1) * 1000, 2)})
+        print(json.dumps({'cvs': len(cv_ids), 'passes': passes}, indent=2))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""Dates normalisées et frise de carrière précalculée (table cv_timeline).
+
+Les dates des expériences ("03/2019", "2019-03", "mars 2019", "2019",
+"Présent"...) sont converties en clés de mois triables:
+
+    clé = année * 12 + (mois - 1)
+
+À chaque enregistrement d'un CV, CVService calcule la frise (clés de
+chaque entrée, mois d'expérience cumulés sans double compte des périodes
+qui se chevauchent, poste actuel, interruptions) et l'enregistre dans
+cv_timeline. Les filtres recruteur ("≥ 5 ans d'expérience") utilisent
+l'index sur experience_months au lieu de relire tous les CVs.
+
+    python cv_timeline.py rebuild --db cv_platform.db
+    python cv_timeline.py query --db cv_platform.db --min-years 5
+"""
+import argparse
+import datetime
+import json
+import re
+import sys
+import time
+
+MONTHS = {
+    'janvier': 1, 'janv': 1, 'jan': 1, 'january': 1,
+    'février': 2, 'fevrier': 2, 'févr': 2, 'fevr': 2, 'fév': 2, 'fev': 2, 'feb': 2, 'february': 2,
+    'mars': 3, 'mar': 3, 'march': 3,
+    'avril': 4, 'avr': 4, 'apr': 4, 'april': 4,
+    'mai': 5, 'may': 5,
+    'juin': 6, 'jun': 6, 'june': 6,
+    'juillet': 7, 'juil': 7, 'jul': 7, 'july': 7,
+    'août': 8, 'aout': 8, 'aug': 8, 'august': 8,
+    'septembre': 9, 'sept': 9, 'sep': 9, 'september': 9,
+    'octobre': 10, 'oct': 10, 'october': 10,
+    'novembre': 11, 'nov': 11, 'november': 11,
+    'décembre': 12, 'decembre': 12, 'déc': 12, 'dec': 12, 'december': 12,
+}
+PRESENT = {'présent', 'present', "aujourd'hui", 'aujourdhui', 'en cours', 'actuel', 'actuellement',
+           'now', 'current', 'today'}
+
+_MONTH_YEAR = re.compile(r'^(\d{1,2})\s*[/.\-]\s*(\d{4})$')
+_YEAR_MONTH = re.compile(r'^(\d{4})\s*[/.\-]\s*(\d{1,2})(?:\s*[/.\-]\s*\d{1,2})?$')
+_YEAR = re.compile(r'^(\d{4})$')
+_NAMED = re.compile(r'^([^\W\d_]+)\.?\s+(\d{4})$')
+
+
+class Present:
+    """Marqueur de date de fin "Présent" retourné par month_key"""
+
+
+def month_key(text, default_month=1):
+    """Texte libre -> clé de mois (int), Present, ou None si illisible/vide.
+
+    default_month: mois retenu pour une année seule (1 pour un début,
+    12 pour une fin).
+    """
+    if not text:
+        return None
+    value = str(text).strip().lower()
+    if value in PRESENT:
+        return Present
+    m = _MONTH_YEAR.match(value)
+    if m:
+        month, year = int(m.group(1)), int(m.group(2))
+    else:
+        m = _YEAR_MONTH.match(value)
+        if m:
+            year, month = int(m.group(1)), int(m.group(2))
+        else:
+            m = _YEAR.match(value)
+            if m:
+                year, month = int(m.group(1)), default_month
+            else:
+                m = _NAMED.match(value)
+                if not m or m.group(1) not in MONTHS:
+                    return None
+                year, month = int(m.group(2)), MONTHS[m.group(1)]
+    if not 1 <= month <= 12 or not 1900 <= year <= 2200:
+        return None
+    return year * 12 + month - 1
+
+
+def current_month(today=None):
+    today = today or datetime.date.today()
+    return today.year * 12 + today.month - 1
+
+
+def compute_timeline(data, now=None):
+    """Frise d'un document CV (dict ou CVModel) au mois now (clé).
+
+    Retourne un dict: entries [(section, index, début, fin)],
+    experience_months, has_current, current_position, current_company,
+    first_start, last_end, gap_months, largest_gap_months, education_end,
+    unparsed_dates. Les périodes d'expérience sont des intervalles de mois
+    inclus; une expérience en cours se termine au mois now.
+    """
+    now = current_month() if now is None else now
+    get = data.get
+    entries = []
+    intervals = []
+    unparsed = 0
+    current = None
+    for index, exp in enumerate(get('experience') or []):
+        start = month_key(exp.get('start_date'), 1)
+        end = month_key(exp.get('end_date'), 12)
+        if start is None or start is Present:
+            unparsed += bool(exp.get('start_date'))
+            entries.append(('experience', index, None, None if end is Present else end))
+            continue
+        is_current = end is Present or (end is None and exp.get('current'))
+        if end is None and not is_current:
+            unparsed += bool(exp.get('end_date'))
+            end = start
+        if is_current:
+            end = None
+            if current is None or start > current[0]:
+                current = (start, exp.get('position', ''), exp.get('company', ''))
+        entries.append(('experience', index, start, end))
+        stop = now if end is None else end
+        if stop >= start:
+            intervals.append((start, min(stop, now)))
+
+    education_end = None
+    for index, ed in enumerate(get('education') or []):
+        start = month_key(ed.get('start_year'), 1)
+        end = month_key(ed.get('end_year'), 12)
+        if start is None or start is Present:
+            unparsed += bool(ed.get('start_year'))
+            start = None
+        if end is Present:
+            end = None
+        elif end is None:
+            unparsed += bool(ed.get('end_year'))
+        entries.append(('education', index, start, end))
+        if end is not None and (education_end is None or end > education_end):
+            education_end = end
+
+    # union des périodes: mois cumulés et interruptions entre périodes
+    months = gap_total = largest_gap = 0
+    merged_end = None
+    for start, end in sorted(intervals):
+        if merged_end is None or start > merged_end + 1:
+            if merged_end is not None:
+                gap = start - merged_end - 1
+                gap_total += gap
+                largest_gap = max(largest_gap, gap)
+            months += end - start + 1
+            merged_end = end
+        elif end > merged_end:
+            months += end - merged_end
+            merged_end = end
+
+    return {
+        'entries': entries,
+        'experience_months': months,
+        'has_current': current is not None,
+        'current_position': current[1] if current else None,
+        'current_company': current[2] if current else None,
+        'first_start': min(i[0] for i in intervals) if intervals else None,
+        'last_end': merged_end,
+        'gap_months': gap_total,
+        'largest_gap_months': largest_gap,
+        'education_end': education_end,
+        'unparsed_dates': unparsed,
+        'as_of': now,
+    }
+
+
+def timeline_row(cv_id, timeline):
+    """Ligne de la table cv_timeline (ordre des colonnes)"""
+    return (cv_id, timeline['experience_months'], int(timeline['has_current']),
+            timeline['current_position'], timeline['current_company'],
+            timeline['first_start'], timeline['last_end'], timeline['gap_months'],
+            timeline['largest_gap_months'], timeline['education_end'], timeline['unparsed_dates'],
+            json.dumps(timeline['entries'], separators=(',', ':')), timeline['as_of'])
+
+
+def main():
+    from cv_db import ConnectionManager
+    from cv_services import CVService
+
+    parser = argparse.ArgumentParser(description="Frise de carrière des CVs (table cv_timeline)")
+    parser.add_argument("command", choices=("rebuild", "query"))
+    parser.add_argument("--db", default="cv_platform.db")
+    parser.add_argument("--min-years", type=float, default=5)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    db = ConnectionManager(args.db)
+    service = CVService(db)
+    service.init_schema()
+    try:
+        if args.command == "rebuild":
+            start = time.perf_counter()
+            count = service.rebuild_cv_index(
+                progress=lambda n: print(f"{n} CVs", file=sys.stderr))
+            result = {'cvs': count, 'seconds': round(time.perf_counter() - start, 2)}
+        else:
+            service.refresh_timelines()
+            start = time.perf_counter()
+            rows = service.cvs_with_experience(int(args.min_years * 12), args.limit)
+            result = {'ms': round((time.perf_counter() - start) * 1000, 3),
+                      'cvs': [{'cv_id': r[0], 'title': r[1], 'experience_months': r[3], 'current_position': r[4]}
+                              for r in rows]}
+    finally:
+        db.close()
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
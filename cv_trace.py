@@ -0,0 +1,283 @@
+import os
+import sys
+import time
+import json
+import functools
+import threading
+import traceback
+
+from cv_metrics import RollingHistogram
+
+
+# -----------------------
+# Traçage des handlers UI
+# -----------------------
+class UITracer:
+    """Mesure la durée des callbacks Tk (mode opt-in).
+
+    Activé via la variable d'environnement CV_TRACE=<fichier>:
+    - extension .prom: export au format texte Prometheus à la fermeture
+    - sinon: un événement JSON par ligne (JSONL) + résumé à la fermeture
+    """
+
+    def __init__(self, path=None, window_s=300):
+        self.path = path
+        self.enabled = bool(path)
+        self.window_s = window_s
+        self.histograms = {}
+        self._lock = threading.Lock()
+        self._events = []
+        self._jsonl = None
+        if self.enabled and not self.is_prometheus:
+            self._jsonl = open(path, 'a', encoding='utf-8')
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.environ.get('CV_TRACE'))
+
+    @property
+    def is_prometheus(self):
+        return bool(self.path) and self.path.endswith('.prom')
+
+    # -----------------------
+    # Enregistrement
+    # -----------------------
+    def observe(self, name, elapsed_ms):
+        """Enregistre une durée pour un handler ou un span"""
+        hist = self.histograms.get(name)
+        if hist is None:
+            with self._lock:
+                hist = self.histograms.setdefault(name, RollingHistogram(self.window_s))
+        hist.observe(elapsed_ms)
+        if self._jsonl is not None:
+            with self._lock:
+                self._events.append({'ts': round(time.time(), 3), 'name': name, 'ms': round(elapsed_ms, 3)})
+                if len(self._events) >= 100:
+                    self._flush_events()
+
+    def wrap(self, name, func):
+        """Retourne func enveloppée par une mesure de durée"""
+        if not self.enabled:
+            return func
+
+        @functools.wraps(func)
+        def traced(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.observe(name, (time.perf_counter() - start) * 1000)
+        return traced
+
+    def instrument(self, obj, method_names):
+        """Remplace les méthodes de l'instance par leurs versions tracées.
+
+        À appeler avant la création des widgets, pour que les commandes
+        et bindings référencent les méthodes enveloppées.
+        """
+        if not self.enabled:
+            return
+        for name in method_names:
+            setattr(obj, name, self.wrap(name, getattr(obj, name)))
+
+    def start_span(self, name):
+        """Démarre une mesure de bout en bout (ex: clic CV -> éditeur prêt)"""
+        if not self.enabled:
+            return None
+        return (name, time.perf_counter())
+
+    def end_span(self, span):
+        if span is None:
+            return
+        name, start = span
+        self.observe(name, (time.perf_counter() - start) * 1000)
+
+    # -----------------------
+    # Export
+    # -----------------------
+    def summary(self):
+        """Résumé par handler: cumul total et fenêtre glissante"""
+        return {name: {'total': hist.total.summary(), 'window': hist.window().summary()}
+                for name, hist in sorted(self.histograms.items())}
+
+    def to_prometheus(self):
+        """Sérialise les histogrammes au format texte Prometheus"""
+        lines = [
+            '# HELP cv_ui_handler_duration_ms Durée des handlers UI (ms)',
+            '# TYPE cv_ui_handler_duration_ms histogram',
+        ]
+        for name, hist in sorted(self.histograms.items()):
+            total = hist.total
+            cumulative = 0
+            for bound, n in zip(total.bounds, total.counts):
+                cumulative += n
+                lines.append(f'cv_ui_handler_duration_ms_bucket{{handler="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'cv_ui_handler_duration_ms_bucket{{handler="{name}",le="+Inf"}} {total.count}')
+            lines.append(f'cv_ui_handler_duration_ms_sum{{handler="{name}"}} {total.total:.3f}')
+            lines.append(f'cv_ui_handler_duration_ms_count{{handler="{name}"}} {total.count}')
+        lines.append('# HELP cv_ui_handler_window_ms Quantiles sur la fenêtre glissante (ms)')
+        lines.append('# TYPE cv_ui_handler_window_ms gauge')
+        for name, hist in sorted(self.histograms.items()):
+            window = hist.window()
+            for q in (50, 95, 99):
+                lines.append(f'cv_ui_handler_window_ms{{handler="{name}",quantile="0.{q}"}} {window.percentile(q):.3f}')
+        return "\n".join(lines) + "\n"
+
+    def _flush_events(self):
+        if self._jsonl is not None and self._events:
+            self._jsonl.write("".join(json.dumps(e) + "\n" for e in self._events))
+            self._jsonl.flush()
+            self._events = []
+
+    def close(self):
+        """Écrit les résultats (appelé à la fermeture de l'application)"""
+        if not self.enabled:
+            return
+        if self.is_prometheus:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                f.write(self.to_prometheus())
+            return
+        with self._lock:
+            self._flush_events()
+            self._jsonl.write(json.dumps({'ts': round(time.time(), 3), 'summary': self.summary()}) + "\n")
+            self._jsonl.close()
+            self._jsonl = None
+
+
+# -----------------------
+# Watchdog de la boucle Tk
+# -----------------------
+class MainloopWatchdog:
+    """Détecte les blocages de root.mainloop et échantillonne la pile du thread principal.
+
+    Un battement est programmé via root.after; un thread de surveillance
+    considère la boucle bloquée quand le dernier battement date de plus de
+    threshold_ms. Pendant le blocage, la pile du thread principal est
+    capturée (sys._current_frames) toutes les sample_ms; les blocages sont
+    agrégés par méthode de l'application et écrits dans un rapport JSON.
+    """
+
+    HEARTBEAT_MS = 100
+    MAX_STACKS_PER_SITE = 5
+
+    def __init__(self, root, threshold_ms=500, sample_ms=50, report_path="stall_report.json"):
+        self.root = root
+        self.threshold_ms = threshold_ms
+        self.sample_ms = sample_ms
+        self.report_path = report_path
+        self.app_dir = os.path.dirname(os.path.abspath(__file__))
+        self.sites = {}
+        self._main_id = None
+        self._last_beat = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stall = None  # {'start': t, 'samples': {site: n}, 'stacks': {...}}
+
+    @classmethod
+    def from_env(cls, root):
+        """Crée le watchdog à partir de CV_STALL_MS (opt-in, ex: 500) et CV_STALL_REPORT"""
+        threshold = float(os.environ.get("CV_STALL_MS") or 0)
+        if threshold <= 0:
+            return None
+        return cls(root, threshold_ms=threshold,
+                   report_path=os.environ.get("CV_STALL_REPORT", "stall_report.json"))
+
+    def start(self):
+        self._main_id = threading.get_ident()
+        self._beat()
+        self._thread = threading.Thread(target=self._run, name="mainloop-watchdog", daemon=True)
+        self._thread.start()
+
+    def _beat(self):
+        self._last_beat = time.monotonic()
+        if not self._stop.is_set():
+            self.root.after(self.HEARTBEAT_MS, self._beat)
+
+    # -----------------------
+    # Échantillonnage
+    # -----------------------
+    def _run(self):
+        while not self._stop.wait(self.sample_ms / 1000.0):
+            lag_ms = (time.monotonic() - self._last_beat) * 1000
+            if lag_ms > self.threshold_ms:
+                self._sample()
+            elif self._stall is not None:
+                self._end_stall()
+
+    def _site_of(self, stack):
+        """Méthode de l'application la plus profonde dans la pile"""
+        for frame in reversed(stack):
+            filename = os.path.abspath(frame.filename)
+            if filename == os.path.abspath(__file__):
+                continue  # enveloppes de traçage / watchdog
+            if filename.startswith(self.app_dir):
+                return f"{os.path.basename(filename)}:{frame.name}"
+        frame = stack[-1]
+        return f"{os.path.basename(frame.filename)}:{frame.name}"
+
+    def _sample(self):
+        frame = sys._current_frames().get(self._main_id)
+        if frame is None:
+            return
+        stack = traceback.extract_stack(frame)
+        site = self._site_of(stack)
+        trace = " <- ".join(f"{os.path.basename(f.filename)}:{f.name}:{f.lineno}"
+                            for f in reversed(stack[-8:]))
+        with self._lock:
+            if self._stall is None:
+                # le blocage a commencé au dernier battement
+                self._stall = {'start': self._last_beat, 'samples': {}, 'stacks': {}}
+            self._stall['samples'][site] = self._stall['samples'].get(site, 0) + 1
+            stacks = self._stall['stacks'].setdefault(site, {})
+            stacks[trace] = stacks.get(trace, 0) + 1
+
+    def _end_stall(self, now=None):
+        with self._lock:
+            stall, self._stall = self._stall, None
+        if stall is None:
+            return
+        duration_ms = ((now or self._last_beat) - stall['start']) * 1000
+        # attribuer le blocage au site le plus échantillonné
+        site = max(stall['samples'], key=stall['samples'].get)
+        with self._lock:
+            entry = self.sites.setdefault(site, {'stalls': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                                                 'samples': 0, 'stacks': {}})
+            entry['stalls'] += 1
+            entry['total_ms'] += duration_ms
+            entry['max_ms'] = max(entry['max_ms'], duration_ms)
+            for s, stacks in stall['stacks'].items():
+                entry['samples'] += stall['samples'][s]
+                for trace, n in stacks.items():
+                    entry['stacks'][trace] = entry['stacks'].get(trace, 0) + n
+
+    # -----------------------
+    # Rapport
+    # -----------------------
+    def report(self):
+        """Rapport des blocages, trié par durée cumulée décroissante"""
+        with self._lock:
+            sites = sorted(self.sites.items(), key=lambda kv: kv[1]['total_ms'], reverse=True)
+            result = []
+            for site, entry in sites:
+                top = sorted(entry['stacks'].items(), key=lambda kv: kv[1], reverse=True)
+                result.append({
+                    'site': site,
+                    'stalls': entry['stalls'],
+                    'total_ms': round(entry['total_ms'], 1),
+                    'max_ms': round(entry['max_ms'], 1),
+                    'samples': entry['samples'],
+                    'top_stacks': [{'stack': t, 'samples': n} for t, n in top[:self.MAX_STACKS_PER_SITE]],
+                })
+        return {'threshold_ms': self.threshold_ms, 'sites': result}
+
+    def stop(self):
+        """Arrête la surveillance et écrit le rapport s'il y a eu des blocages"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        if self._stall is not None:
+            self._end_stall(now=time.monotonic())
+        if self.sites and self.report_path:
+            with open(self.report_path, 'w', encoding='utf-8') as f:
+                json.dump(self.report(), f, ensure_ascii=False, indent=2)
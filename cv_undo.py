@@ -0,0 +1,186 @@
+"""Historique annuler/rétablir de l'éditeur, à partage structurel.
+
+Un état du CV est un dict {section: tuple d'entrées, 'personal': dict}.
+Une opération (format de cv_journal) ne recopie que la section qu'elle
+touche: les autres tuples, les entrées et les chaînes sont partagés avec
+l'état précédent. Une étape coûte donc la taille de la section modifiée,
+pas celle du CV.
+
+Benchmark mémoire: python cv_undo.py --steps 10000
+"""
+import argparse
+import copy
+import time
+import tracemalloc
+
+from cv_journal import SECTIONS, apply_op
+
+# saisies successives d'un même champ regroupées en une seule étape
+COALESCE_SECONDS = 1.0
+
+
+def freeze(data):
+    """Document CV -> état (sections en tuples)"""
+    state = {section: tuple(data.get(section, [])) for section in SECTIONS}
+    state['personal'] = dict(data.get('personal', {}))
+    return state
+
+
+def next_state(state, op):
+    """Nouvel état après op; seule la partie modifiée est recopiée"""
+    new = dict(state)
+    if op['op'] == 'set':
+        new['personal'] = dict(state['personal'])
+        new['personal'][op['field']] = op['value']
+    else:
+        section = op['section']
+        items = list(state[section])
+        apply_op({section: items}, op)
+        new[section] = tuple(items)
+    return new
+
+
+def diff_ops(current, target):
+    """Opérations qui font passer de current à target (sections comparées par identité)"""
+    ops = []
+    for section in SECTIONS:
+        if current[section] is not target[section]:
+            ops.append({'op': 'load', 'section': section, 'value': list(target[section])})
+    if current['personal'] is not target['personal']:
+        for field in sorted(set(current['personal']) | set(target['personal'])):
+            value = target['personal'].get(field, '')
+            if current['personal'].get(field, '') != value:
+                ops.append({'op': 'set', 'field': field, 'value': value})
+    return ops
+
+
+class UndoHistory:
+    """Piles annuler/rétablir d'états partagés, bornées à limit étapes"""
+
+    def __init__(self, limit=500):
+        self.limit = limit
+        self.present = freeze({})
+        self._past = []
+        self._future = []
+        self._last_field = None
+        self._last_time = 0.0
+
+    def reset(self, data):
+        self.present = freeze(data)
+        self._past = []
+        self._future = []
+        self._last_field = None
+
+    def push(self, op, now=None):
+        """Enregistre une opération déjà appliquée au document"""
+        now = time.monotonic() if now is None else now
+        field = op['field'] if op['op'] == 'set' else None
+        coalesce = (field is not None and field == self._last_field
+                    and now - self._last_time < COALESCE_SECONDS and self._past)
+        if not coalesce:
+            self._past.append(self.present)
+            if self.limit and len(self._past) > self.limit:
+                del self._past[0]
+        self.present = next_state(self.present, op)
+        self._future = []
+        self._last_field = field
+        self._last_time = now
+
+    def can_undo(self):
+        return bool(self._past)
+
+    def can_redo(self):
+        return bool(self._future)
+
+    def undo(self):
+        """Retourne les opérations qui annulent la dernière étape ([] si rien à annuler)"""
+        if not self._past:
+            return []
+        target = self._past.pop()
+        self._future.append(self.present)
+        return self._move(target)
+
+    def redo(self):
+        if not self._future:
+            return []
+        target = self._future.pop()
+        self._past.append(self.present)
+        return self._move(target)
+
+    def _move(self, target):
+        ops = diff_ops(self.present, target)
+        self.present = target
+        self._last_field = None
+        return ops
+
+
+# -----------------------
+# Benchmark mémoire
+# -----------------------
+def sample_cv(entries=40, description_size=2000):
+    """CV volumineux: entries expériences/formations avec de longues descriptions"""
+    text = ("Conception et maintenance de services, encadrement d'équipe, "
+            "revues de code et suivi de la qualité. ") * (description_size // 100 + 1)
+    return {
+        'personal': {'first_name': 'Ana', 'last_name': 'B', 'title': 'Ingénieure',
+                     'description': text[:description_size]},
+        'experience': [{'position': f'Poste {i}', 'company': f'Entreprise {i}', 'start_date': '01/2015',
+                        'description': text[:description_size]} for i in range(entries)],
+        'education': [{'degree': f'Diplôme {i}', 'school': f'École {i}', 'start_year': '2010',
+                       'description': text[:description_size]} for i in range(entries)],
+        'skills': [],
+        'languages': [{'name': f'Langue {i}', 'level': 'Courant'} for i in range(10)],
+    }
+
+
+def sample_ops(steps):
+    """Mélange réaliste: saisie de champs, ajouts, remplacements et suppressions"""
+    for i in range(steps):
+        kind = i % 4
+        if kind == 0:
+            yield {'op': 'set', 'field': 'title', 'value': f'Ingénieure {i}'}
+        elif kind == 1:
+            yield {'op': 'replace', 'section': 'experience', 'index': i % 40,
+                   'value': {'position': f'Poste {i}', 'company': 'ACME', 'start_date': '01/2020'}}
+        elif kind == 2:
+            yield {'op': 'insert', 'section': 'languages', 'index': 0, 'value': {'name': f'L{i}', 'level': 'Avancé'}}
+        else:
+            yield {'op': 'delete', 'section': 'languages', 'index': 0}
+
+
+def measure(steps, structural):
+    """Mémoire retenue par l'historique après steps étapes (tracemalloc)"""
+    data = sample_cv()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    if structural:
+        history = UndoHistory(limit=None)
+        history.reset(data)
+        for n, op in enumerate(sample_ops(steps)):
+            apply_op(data, op)
+            history.push(op, now=n * COALESCE_SECONDS)
+    else:
+        snapshots = []
+        for op in sample_ops(steps):
+            snapshots.append(copy.deepcopy(data))
+            apply_op(data, op)
+    elapsed = time.perf_counter() - start
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return {'steps': steps, 'mb': round(used / 2**20, 1), 'kb_per_step': round(used / steps / 1024, 2),
+            'us_per_step': round(elapsed / steps * 1e6, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mémoire de l'historique annuler/rétablir")
+    parser.add_argument("--steps", type=int, default=10000)
+    parser.add_argument("--copy-steps", type=int, default=500,
+                        help="étapes pour la référence par copie complète (très gourmande)")
+    args = parser.parse_args()
+    print("partage structurel:", measure(args.steps, True))
+    print("copie complète    :", measure(args.copy_steps, False))
+
+
+if __name__ == "__main__":
+    main()